@@ -0,0 +1,136 @@
+from benchmarks.compare import compareResults
+from benchmarks.datasets import MIXES
+from benchmarks.runner import STAGES, runSuite
+
+import sys
+import json
+from argparse import ArgumentParser
+
+
+def parseStageThreshold(arg: str) -> tuple[str, float]:
+    stage, _, value = arg.partition("=")
+    if stage not in STAGES:
+        raise ValueError(f"'{stage}' is not a valid stage")
+    return stage, float(value)
+
+
+def getArguments():
+    parser = ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks itermv on synthetic directories.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Runs the suite and stores the results.")
+    run.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1_000, 10_000, 100_000],
+        metavar="N",
+        help="Number of entries of each directory (10^3 to 10^6).",
+    )
+    run.add_argument(
+        "--mixes", nargs="+", choices=MIXES, default=MIXES, metavar="MIX"
+    )
+    run.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=STAGES, metavar="STAGE"
+    )
+    run.add_argument("--repeat", type=int, default=3, metavar="N")
+    run.add_argument(
+        "--root",
+        default=None,
+        metavar="DIR",
+        help="Where directories are generated (/dev/shm when available).",
+    )
+    run.add_argument(
+        "--memory",
+        action="store_true",
+        help="Generates directories in an in-memory file system (skips cli).",
+    )
+    run.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        metavar="MS",
+        help="Latency added to every file system call, e.g. to mimic NFS.",
+    )
+    run.add_argument("-o", "--output", default=None, metavar="FILE")
+    run.add_argument(
+        "--baseline",
+        default=None,
+        metavar="FILE",
+        help="Compares the results against a previous run.",
+    )
+
+    comp = commands.add_parser("compare", help="Compares two stored results.")
+    comp.add_argument("baseline", metavar="BASELINE")
+    comp.add_argument("current", metavar="CURRENT")
+
+    for sub in (run, comp):
+        sub.add_argument(
+            "--threshold",
+            type=float,
+            default=10.0,
+            metavar="PERCENT",
+            help="Slowdown allowed before a stage is reported as a regression.",
+        )
+        sub.add_argument(
+            "--stage-threshold",
+            nargs="+",
+            type=parseStageThreshold,
+            default=[],
+            metavar="STAGE=PERCENT",
+        )
+
+    return parser.parse_args()
+
+
+def loadReport(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(baseline: dict, current: dict, args) -> int:
+    lines, regressions = compareResults(
+        baseline, current, args.threshold, dict(args.stage_threshold)
+    )
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regressions found:")
+        print("\n".join(f"    {r}" for r in regressions))
+        return 1
+    return 0
+
+
+def main() -> int:
+    args = getArguments()
+
+    if args.command == "compare":
+        return compare(loadReport(args.baseline), loadReport(args.current), args)
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    report = runSuite(
+        args.sizes,
+        args.mixes,
+        args.stages,
+        args.repeat,
+        args.root,
+        log,
+        args.memory,
+        args.latency / 1000,
+    )
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline is not None:
+        return compare(loadReport(args.baseline), report, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
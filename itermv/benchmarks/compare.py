@@ -0,0 +1,33 @@
+def indexResults(report: dict) -> dict[tuple[str, str], float]:
+    return {(r["case"], r["stage"]): r["seconds"] for r in report["results"]}
+
+
+def compareResults(
+    baseline: dict,
+    current: dict,
+    threshold: float,
+    stageThresholds: dict[str, float] | None = None,
+) -> tuple[list[str], list[str]]:
+    # thresholds are percentages of slowdown relative to the baseline
+    stageThresholds = {} if stageThresholds is None else stageThresholds
+    base = indexResults(baseline)
+    lines: list[str] = []
+    regressions: list[str] = []
+
+    for (case, stage), seconds in sorted(indexResults(current).items()):
+        if (case, stage) not in base:
+            lines.append(f"{case:>16} {stage:>9} {seconds:>10.4f}s (new)")
+            continue
+        before = base[(case, stage)]
+        change = (seconds - before) / before * 100 if before > 0 else 0.0
+        limit = stageThresholds.get(stage, threshold)
+        mark = ""
+        if change > limit:
+            mark = " REGRESSION"
+            regressions.append(f"{case} {stage} {change:+.1f}% (limit {limit}%)")
+        lines.append(
+            f"{case:>16} {stage:>9} {before:>10.4f}s -> {seconds:>10.4f}s "
+            f"{change:+7.1f}%{mark}"
+        )
+
+    return lines, regressions
@@ -0,0 +1,133 @@
+from itermv.components import MemoryFileSystem
+
+import os
+import shutil
+import tempfile
+
+MIXES = ["plain", "chains", "cycles", "swaps", "mixed"]
+GROUP_SIZE = 10
+
+
+def getScratchRoot(root: str | None = None) -> str:
+    # tmpfs keeps the disk out of the measurements when it is available
+    if root is not None:
+        return root
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def fileName(i: int) -> str:
+    return f"f{i:07d}.dat"
+
+
+def chainPairs(names: list[str], start: int, count: int) -> list[tuple[str, str]]:
+    # f0 -> f1 -> ... -> fn where the tail is a brand new name
+    pairs = []
+    for g in range(start, start + count, GROUP_SIZE):
+        size = min(GROUP_SIZE, start + count - g)
+        for i in range(g, g + size - 1):
+            pairs.append((names[i], names[i + 1]))
+        pairs.append((names[g + size - 1], f"new-{names[g + size - 1]}"))
+    return pairs
+
+
+def cyclePairs(
+    names: list[str], start: int, count: int, size: int = GROUP_SIZE
+) -> list[tuple[str, str]]:
+    pairs = []
+    for g in range(start, start + count, size):
+        group = names[g : min(g + size, start + count)]
+        pairs.extend(zip(group, group[1:] + group[:1]))
+    return pairs
+
+
+def plainPairs(names: list[str], start: int, count: int) -> list[tuple[str, str]]:
+    return [(n, f"new-{n}") for n in names[start : start + count]]
+
+
+def getPairs(mix: str, count: int) -> list[tuple[str, str]]:
+    names = [fileName(i) for i in range(count)]
+    match mix:
+        case "plain":
+            return plainPairs(names, 0, count)
+        case "chains":
+            return chainPairs(names, 0, count)
+        case "cycles":
+            return cyclePairs(names, 0, count)
+        case "swaps":
+            return cyclePairs(names, 0, count, 2)
+        case "mixed":
+            third = count // 3
+            return (
+                plainPairs(names, 0, third)
+                + chainPairs(names, third, third)
+                + cyclePairs(names, 2 * third, count - 2 * third)
+            )
+        case _:
+            raise ValueError(f"'{mix}' is not a valid mix")
+
+
+class SyntheticDirectory:
+    def __init__(
+        self,
+        count: int,
+        mix: str,
+        root: str | None = None,
+        memory: MemoryFileSystem | None = None,
+    ) -> None:
+        if mix not in MIXES:
+            raise ValueError(f"'{mix}' is not a valid mix")
+        self.__count = count
+        self.__mix = mix
+        self.__memory = memory
+        self.__root = getScratchRoot(root) if memory is None else os.sep
+        self.__path: str | None = None
+        self.__runs = 0
+
+    def __enter__(self):
+        return self.create()
+
+    def __exit__(self, *exc):
+        self.remove()
+        return False
+
+    def create(self):
+        self.remove()
+        if self.__memory is not None:
+            return self.createInMemory()
+        self.__path = tempfile.mkdtemp(prefix="itermv-bench-", dir=self.__root)
+        for i in range(self.__count):
+            # O_CREAT without writing keeps generation cheap at 10^6 entries
+            fpath = os.path.join(self.__path, fileName(i))
+            os.close(os.open(fpath, os.O_CREAT | os.O_WRONLY))
+        return self
+
+    def createInMemory(self):
+        # a fresh directory per run, the tree lives as long as the backend
+        self.__runs += 1
+        self.__path = os.path.join(self.__root, f"itermv-bench-{self.__runs}")
+        self.__memory.makedirs(self.__path)
+        for i in range(self.__count):
+            self.__memory.createFile(os.path.join(self.__path, fileName(i)))
+        return self
+
+    def remove(self):
+        if self.__path is not None and self.__memory is None:
+            shutil.rmtree(self.__path, ignore_errors=True)
+        self.__path = None
+
+    def pairs(self) -> list[tuple[str, str]]:
+        return getPairs(self.__mix, self.__count)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def mix(self) -> str:
+        return self.__mix
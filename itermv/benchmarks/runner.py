@@ -0,0 +1,175 @@
+from benchmarks.datasets import SyntheticDirectory
+from itermv.components import (
+    AlphaCounter,
+    FaultyFileSystem,
+    MemoryFileSystem,
+    OsFileSystem,
+    RadixCounter,
+    fileSystem,
+)
+from itermv.helpers import (
+    createValidSchedule,
+    createValidTasklist,
+    expandPatterns,
+    getArguments,
+    getFileNames,
+    renameBySchedule,
+)
+
+import os
+import sys
+import time
+import platform
+import subprocess as subp
+from collections.abc import Callable
+
+STAGES = ["arguments", "scan", "names", "expand", "schedule", "rename", "counters", "cli"]
+CLI_SCRIPT = "from itermv.main import main; main()"
+
+
+def timeCall(func: Callable, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def getCliArgs(data: SyntheticDirectory) -> list[str]:
+    if data.mix == "plain":
+        return ["-i", data.path, "-p", "new-{name}{ext}", "-q"]
+    return ["-i", data.path, "-f", "-", "--use-stdin", "-O", "-q"]
+
+
+def getScanArgs(data: SyntheticDirectory):
+    # lists given with -f are stat'ed while parsing, so scans list the directory
+    return getArguments("-i", data.path, "-p", "new-{name}{ext}", "-q")
+
+
+def getArgs(data: SyntheticDirectory):
+    if data.mix == "plain":
+        return getArguments(*getCliArgs(data))
+    flat = [name for pair in data.pairs() for name in pair]
+    return getArguments("-i", data.path, "-f", *flat, "-O", "-q")
+
+
+def runCase(
+    data: SyntheticDirectory, stages: list[str], memory: bool = False
+) -> dict[str, float]:
+    timings: dict[str, float] = {}
+
+    data.create()
+    if "scan" in stages:
+        # every mix times the same listing and stat of the whole directory
+        timings["scan"], _ = timeCall(getScanArgs(data).get_sources)
+
+    # explicit lists are stat'ed while the arguments are parsed
+    seconds, args = timeCall(getArgs, data)
+    if "arguments" in stages:
+        timings["arguments"] = seconds
+
+    if "names" in stages:
+        timings["names"], (included, _, _) = timeCall(getFileNames, args)
+    else:
+        included, _, _ = getFileNames(args)
+    if "expand" in stages:
+        pattern = getArguments("-i", data.path, "-p", "x{n0}-{a}{ext}").rename_replace
+        entries = [(f, pattern) for f, _ in included]
+        timings["expand"], _ = timeCall(expandPatterns, entries, None, args, False)
+
+    planner = createValidSchedule if args.overlap else createValidTasklist
+    seconds, schedule = timeCall(planner, included)
+    if "schedule" in stages:
+        timings["schedule"] = seconds
+    if "rename" in stages:
+        timings["rename"], (success, _) = timeCall(renameBySchedule, schedule)
+        if not success:
+            raise RuntimeError(f"rename failed in {data.path}")
+
+    if "counters" in stages:
+        timings["counters"], _ = timeCall(countTo, data.count)
+
+    if "cli" in stages and not memory:
+        data.create()
+        timings["cli"], _ = timeCall(runCli, data)
+
+    data.remove()
+    return timings
+
+
+def countTo(count: int):
+    radix = RadixCounter(10)
+    alpha = AlphaCounter()
+    for _ in range(count):
+        radix.increase().str()
+        alpha.increase().str()
+
+
+def runCli(data: SyntheticDirectory):
+    stdin = None
+    if data.mix != "plain":
+        stdin = "\n".join(f"{a} {b}" for a, b in data.pairs())
+    env = dict(os.environ)
+    package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package, env.get("PYTHONPATH")]))
+    subp.run(
+        [sys.executable, "-c", CLI_SCRIPT, *getCliArgs(data)],
+        input=stdin,
+        text=True,
+        env=env,
+        check=True,
+        stdout=subp.DEVNULL,
+    )
+
+
+def runSuite(
+    sizes: list[int],
+    mixes: list[str],
+    stages: list[str],
+    repeat: int = 3,
+    root: str | None = None,
+    log: Callable[[str], None] = lambda msg: None,
+    memory: bool = False,
+    latency: float = 0.0,
+) -> dict:
+    results = []
+    for size in sizes:
+        for mix in mixes:
+            best: dict[str, float] = {}
+            # the minimum of several runs is the least noisy estimate
+            for _ in range(repeat):
+                # the cli runs in a separate process that only sees the disk
+                backend = MemoryFileSystem() if memory else OsFileSystem()
+                data = SyntheticDirectory(size, mix, root, backend if memory else None)
+                if latency > 0:
+                    backend = FaultyFileSystem(backend, latency)
+                fileSystem.use(backend)
+                try:
+                    timings = runCase(data, stages, memory)
+                finally:
+                    data.remove()
+                    fileSystem.use(OsFileSystem())
+                for stage, seconds in timings.items():
+                    best[stage] = min(seconds, best.get(stage, seconds))
+            for stage, seconds in best.items():
+                log(f"{mix:>7} {size:>8} {stage:>9} {seconds:>10.4f}s")
+                results.append(
+                    {
+                        "case": f"{mix}-{size}",
+                        "mix": mix,
+                        "size": size,
+                        "stage": stage,
+                        "seconds": seconds,
+                        "per_entry": seconds / size if size else 0.0,
+                    }
+                )
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "backend": "memory" if memory else "disk",
+            "latency": latency,
+        },
+        "results": results,
+    }
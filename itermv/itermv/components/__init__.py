@@ -1,4 +1,11 @@
-# argobjects depends on fileobjects keep it at the top
+# argobjects depends on fileobjects and hashobjects keep them at the top
+from .profiler import *
+from .progress import *
+from .statx import *
+from .filesystem import *
+from .throttle import *
 from .fileobjects import *
+from .hashobjects import *
+from .scanindex import *
 from .argobjects import *
 from .counters import *
@@ -1,4 +1,13 @@
-from itermv.components import FileEntry, NewFile, InputPath
+from itermv.components import (
+    FileEntry,
+    NewFile,
+    InputPath,
+    HashCache,
+    fileSystem,
+    profiler,
+    progress,
+    scanIndex,
+)
 from argparse import (
     Action as ArgAction,
     ArgumentParser,
@@ -9,6 +18,7 @@ from typing import Any, Sequence, NoReturn
 from collections.abc import Callable
 import os
 import re
+from string import Formatter
 
 
 # https://stackoverflow.com/a/29485128
@@ -44,10 +54,11 @@ class PairifyAction(ArgAction):
 
 
 class TimeStampType:
-    OPTIONS = {"atime", "mtime", "ctime"}
+    OPTIONS = {"atime", "mtime", "ctime", "btime"}
     BY_ACCESS_DATE = "atime"
     BY_MODIFY_DATE = "mtime"
     BY_META_DATE = "ctime"
+    BY_BIRTH_DATE = "btime"
     DEFAULT = BY_MODIFY_DATE
 
     def __init__(self, opt: str) -> None:
@@ -68,24 +79,106 @@ class TimeStampType:
     def byMetaDate(self) -> bool:
         return self.__options[TimeStampType.BY_META_DATE]
 
+    def byBirthDate(self) -> bool:
+        return self.__options[TimeStampType.BY_BIRTH_DATE]
+
 
 class NamePattern:
     def __init__(self, pattern: str) -> None:
+        # the pattern is parsed once and reused for every file
+        parts = list(Formatter().parse(pattern))
         self.__pattern = pattern
+        self.__format = pattern.format
+        self.__fields = {
+            re.split(r"[.\[]", field, 1)[0]
+            for _, field, _, _ in parts
+            if field is not None
+        }
+        self.__template = NamePattern.toGroupTemplate(parts)
 
     def __repr__(self) -> str:
         return self.__pattern
 
+    @staticmethod
+    def toGroupTemplate(parts: list[tuple]) -> str | None:
+        # patterns made only of capture groups map to a native re template
+        template = []
+        for literal, field, spec, conversion in parts:
+            template.append(literal.replace("\\", "\\\\"))
+            if field is None:
+                continue
+            if spec or conversion or not field.isdigit():
+                return None
+            template.append(f"\\g<{int(field)}>")
+        return "".join(template)
+
+    @property
+    def fields(self) -> set[str]:
+        return self.__fields
+
+    @property
+    def template(self) -> str | None:
+        return self.__template
+
     def evalPattern(self, *matches, **options) -> str:
-        return self.__pattern.format(*matches, **options)
+        return self.__format(*matches, **options)
+
+
+class RuleSet:
+    # numbered backreferences would point to other rules once combined
+    BACKREFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+    # named groups, their references and conditionals on them
+    GROUP_NAME = re.compile(r"(?<!\\)((?:\\\\)*)\(\?(P<|P=|\()([^\W\d]\w*)")
+
+    def __init__(self, rules: list[tuple[str, str]]) -> None:
+        self.__regexes = [re.compile(regex) for regex, _ in rules]
+        self.__patterns = [NamePattern(pattern) for _, pattern in rules]
+        # every alternative searches the whole name before the next is tried,
+        # so the first rule that matches wins and not the leftmost match
+        alternatives = [
+            f"{RuleSet.getPrefix(r)}(?P<_r{i}>{RuleSet.localizeGroups(r, i)})"
+            for i, (r, _) in enumerate(rules)
+        ]
+        self.__dispatcher = re.compile(f"^(?:{'|'.join(alternatives)})")
+        groups = self.__dispatcher.groupindex
+        self.__rules = {groups[f"_r{i}"]: i for i in range(len(rules))}
+
+    @staticmethod
+    def localizeGroups(regex: str, index: int) -> str:
+        # rules may reuse group names, which only the original regexes expand
+        rename = lambda m: f"{m[1]}(?{m[2]}_r{index}_{m[3]}"
+        return RuleSet.GROUP_NAME.sub(rename, regex)
+
+    @staticmethod
+    def getPrefix(regex: str) -> str:
+        # anchored rules are only tried at the start instead of at every position
+        if regex.startswith(("^", "\\A")) and "|" not in regex:
+            return ""
+        return "(?s:.*?)"
+
+    def __len__(self) -> int:
+        return len(self.__patterns)
+
+    def __iter__(self):
+        return iter(zip(self.__regexes, self.__patterns))
+
+    def dispatch(self, name: str) -> int | None:
+        match = self.__dispatcher.match(name)
+        # the group of a rule closes after every group nested in it
+        return None if match is None else self.__rules[match.lastindex]
+
+    @property
+    def patterns(self) -> list[NamePattern]:
+        return self.__patterns
 
 
 class SortingOptions:
-    OPTIONS = {"name", "atime", "mtime", "ctime", "size"}
+    OPTIONS = {"name", "atime", "mtime", "ctime", "btime", "size"}
     BY_NAME = "name"
     BY_ACCESS_DATE = "atime"
     BY_MODIFY_DATE = "mtime"
     BY_META_DATE = "ctime"
+    BY_BIRTH_DATE = "btime"
     BY_SIZE = "size"
     DEFAULT = BY_NAME
 
@@ -110,6 +203,9 @@ class SortingOptions:
     def byMetaDate(self) -> bool:
         return self.__options[SortingOptions.BY_META_DATE]
 
+    def byBirthDate(self) -> bool:
+        return self.__options[SortingOptions.BY_BIRTH_DATE]
+
     def bySize(self) -> bool:
         return self.__options[SortingOptions.BY_SIZE]
 
@@ -124,18 +220,29 @@ class ArgsWrapper:
     OUT_REGEX_INLINE = 12
     OUT_PAIR_LIST = 13
     OUT_FILE_LIST = 14
+    OUT_RULES = 15
+    DEDUPE_REPORT = "report"
+    DEDUPE_EXCLUDE = "exclude"
+    STAGE_PREFIX = ".itermv-stage-"
 
     def __init__(self, args) -> None:
         self.__arg_error = args.arg_error
         self.__rename_replace = args.rename_replace
         self.__rename_each = args.rename_each
+        self.__max_replacements = args.max_replacements
         self.__rename_list = args.rename_list
         self.__rename_pairs = args.rename_pairs
+        self.__apply_plan = args.apply_plan
+        self.__rules = args.rules
         self.__regex = args.regex
         self.__file_list = args.file_list
+        self.__dedupe = args.dedupe
 
         self.__sort = args.sort
         self.__reverse_sort = args.reverse_sort
+        self.__limit = args.limit
+        self.__skip = args.skip
+        self.__shard = args.shard
         self.__verbose = args.verbose
         self.__verbose_summary = args.verbose_summary
         self.__verbose_export = args.verbose_export
@@ -143,14 +250,34 @@ class ArgsWrapper:
         self.__start_number = args.start_number
         self.__dry_run = args.dry_run
         self.__overlap = args.overlap
+        self.__copy = args.copy
+        self.__reflink = args.reflink
+        self.__fan_out = args.fan_out
+        self.__fan_in = args.fan_in
+        self.__bucket_depth = args.bucket_depth
+        self.__bucket_width = args.bucket_width
         self.__include_self = args.include_self
         self.__exclude_dir = args.exclude_dir
         self.__time_stamp_type = args.time_stamp_type
         self.__time_separator = args.time_separator
         self.__radix = args.radix
+        self.__io_jobs = args.io_jobs
+        self.__hash_cache = args.hash_cache
+        self.__no_hash_cache = args.no_hash_cache
         self.__no_plain_text = args.no_plain_text
         self.__use_stdin = args.use_stdin
         self.__quiet = args.quiet
+        self.__save_plan = args.save_plan
+        self.__profile = args.profile
+        self.__profile_dump = args.profile_dump
+        self.__progress = args.progress
+        self.__cpu_jobs = args.cpu_jobs
+        self.__max_ops_per_sec = args.max_ops_per_sec
+        self.__target_latency = args.target_latency
+        self.__strategy = args.strategy
+        self.__recover = args.recover
+        self.__stages: list[str] = []
+        self.__cached_stat = args.cached_stat
 
     def is_source_ordered(self):
         return self.rename_pairs is not None or self.file_list is not None
@@ -166,29 +293,75 @@ class ArgsWrapper:
             return ArgsWrapper.IN_ALL
 
     def get_sources(self):
-        includeDir = lambda f: not (self.exclude_dir and os.path.isdir(f))
         spath = self.source_dir
 
         match self.get_source_type():
-            case ArgsWrapper.IN_REGEX:
-                return [
-                    FileEntry(f, spath.path)
-                    for f in os.listdir(spath.path)
-                    if includeDir(f) and re.search(self.regex, f)
-                ]
             case ArgsWrapper.IN_FILE_LIST:
                 return self.file_list
             case ArgsWrapper.IN_PAIR_LIST:
                 return [s for s, _ in self.rename_pairs]
-            case ArgsWrapper.IN_ALL:
-                return [
-                    FileEntry(f, spath.path)
-                    for f in os.listdir(spath.path)
-                    if includeDir(f)
-                ]
+            case ArgsWrapper.IN_REGEX | ArgsWrapper.IN_ALL:
+                with profiler.phase("scan") as phase:
+                    names = self.scan_names()
+                    phase.items = len(names)
+                sources: list[FileEntry] = []
+                with profiler.phase("stat", len(names)):
+                    with progress.task("scan", len(names)) as scanning:
+                        for f in names:
+                            sources.append(FileEntry(f, spath.path))
+                            scanning.advance()
+                return sources
             case _:
                 return None
 
+    def scan_names(self) -> list[str]:
+        spath = self.source_dir.path
+        if self.fan_in:
+            return self.scan_tree()
+        names = scanIndex.listdir(spath)
+        # files of an interrupted staged run wait in a hidden directory
+        isStage = lambda f: f.startswith(ArgsWrapper.STAGE_PREFIX)
+        self.__stages = [f for f in names if isStage(f)]
+        if self.__stages:
+            names = [f for f in names if not isStage(f)]
+
+        if self.regex is not None:
+            search = re.compile(self.regex).search
+            names = [f for f in names if search(f)]
+        if self.rules is not None:
+            dispatch = self.rules.dispatch
+            names = [f for f in names if dispatch(f) is not None]
+        # bucket directories must never be moved into other buckets
+        if self.exclude_dir or self.fan_out:
+            isdir = fileSystem.isdir
+            names = [f for f in names if not isdir(os.path.join(spath, f))]
+
+        return names
+
+    def scan_tree(self) -> list[str]:
+        # names are relative to the source so files in buckets keep their parent
+        spath = self.source_dir.path
+        search = re.compile(self.regex).search if self.regex is not None else None
+        dispatch = self.rules.dispatch if self.rules is not None else None
+        names: list[str] = []
+
+        for dirpath, folders, files in fileSystem.walk(spath):
+            reldir = os.path.relpath(dirpath, spath)
+            if reldir == ".":
+                self.__stages = [
+                    f for f in folders if f.startswith(ArgsWrapper.STAGE_PREFIX)
+                ]
+                # the walk skips the folders removed from the list
+                folders[:] = [f for f in folders if f not in self.__stages]
+                continue
+            for f in files:
+                if search is not None and not search(f):
+                    continue
+                if dispatch is None or dispatch(f) is not None:
+                    names.append(os.path.join(reldir, f))
+
+        return names
+
     def get_dest_type(self):
         if self.rename_replace is not None:
             return ArgsWrapper.OUT_PATTERN
@@ -198,6 +371,8 @@ class ArgsWrapper:
             return ArgsWrapper.OUT_FILE_LIST
         elif self.rename_pairs is not None:
             return ArgsWrapper.OUT_PAIR_LIST
+        elif self.rules is not None:
+            return ArgsWrapper.OUT_RULES
         else:
             return ArgsWrapper.OUT_MISSING
 
@@ -211,6 +386,8 @@ class ArgsWrapper:
                 return self.rename_list
             case ArgsWrapper.OUT_PAIR_LIST:
                 return [d for _, d in self.rename_pairs]
+            case ArgsWrapper.OUT_RULES:
+                return self.rules
             case ArgsWrapper.OUT_MISSING:
                 self.arg_error("Destination names cannot be ommited.")
             case _:
@@ -225,9 +402,13 @@ class ArgsWrapper:
         return self.__rename_replace
 
     @property
-    def rename_each(self) -> tuple[str, NamePattern] | None:
+    def rename_each(self) -> tuple[re.Pattern, NamePattern] | None:
         return self.__rename_each
 
+    @property
+    def max_replacements(self) -> int:
+        return self.__max_replacements
+
     @property
     def rename_list(self) -> list[NewFile | NamePattern] | None:
         return self.__rename_list
@@ -236,6 +417,14 @@ class ArgsWrapper:
     def rename_pairs(self) -> list[tuple[FileEntry, NewFile | NamePattern]] | None:
         return self.__rename_pairs
 
+    @property
+    def apply_plan(self) -> str | None:
+        return self.__apply_plan
+
+    @property
+    def rules(self) -> RuleSet | None:
+        return self.__rules
+
     @property
     def regex(self) -> str | None:
         return self.__regex
@@ -244,6 +433,10 @@ class ArgsWrapper:
     def file_list(self) -> list[FileEntry] | None:
         return self.__file_list
 
+    @property
+    def dedupe(self) -> str | None:
+        return self.__dedupe
+
     @property
     def sort(self) -> SortingOptions:
         return self.__sort
@@ -252,6 +445,18 @@ class ArgsWrapper:
     def reverse_sort(self) -> bool:
         return self.__reverse_sort
 
+    @property
+    def limit(self) -> int | None:
+        return self.__limit
+
+    @property
+    def shard(self) -> tuple[int, int] | None:
+        return self.__shard
+
+    @property
+    def skip(self) -> int:
+        return self.__skip
+
     @property
     def verbose(self) -> bool:
         return self.__verbose
@@ -280,6 +485,30 @@ class ArgsWrapper:
     def overlap(self) -> bool:
         return self.__overlap
 
+    @property
+    def copy(self) -> bool:
+        return self.__copy
+
+    @property
+    def reflink(self) -> str:
+        return self.__reflink
+
+    @property
+    def fan_out(self) -> bool:
+        return self.__fan_out
+
+    @property
+    def fan_in(self) -> bool:
+        return self.__fan_in
+
+    @property
+    def bucket_depth(self) -> int:
+        return self.__bucket_depth
+
+    @property
+    def bucket_width(self) -> int:
+        return self.__bucket_width
+
     @property
     def include_self(self) -> bool:
         return self.__include_self
@@ -300,6 +529,18 @@ class ArgsWrapper:
     def radix(self) -> int:
         return self.__radix
 
+    @property
+    def io_jobs(self) -> int:
+        return self.__io_jobs
+
+    @property
+    def hash_cache(self) -> HashCache:
+        return self.__hash_cache
+
+    @property
+    def no_hash_cache(self) -> bool:
+        return self.__no_hash_cache
+
     @property
     def no_plain_text(self) -> bool:
         return self.__no_plain_text
@@ -311,3 +552,47 @@ class ArgsWrapper:
     @property
     def quiet(self) -> bool:
         return self.__quiet
+
+    @property
+    def save_plan(self) -> str | None:
+        return self.__save_plan
+
+    @property
+    def profile(self) -> str | None:
+        return self.__profile
+
+    @property
+    def profile_dump(self) -> str | None:
+        return self.__profile_dump
+
+    @property
+    def progress(self) -> str | None:
+        return self.__progress
+
+    @property
+    def cpu_jobs(self) -> int:
+        return self.__cpu_jobs
+
+    @property
+    def max_ops_per_sec(self) -> int | None:
+        return self.__max_ops_per_sec
+
+    @property
+    def target_latency(self) -> int | None:
+        return self.__target_latency
+
+    @property
+    def cached_stat(self) -> bool:
+        return self.__cached_stat
+
+    @property
+    def strategy(self) -> str:
+        return self.__strategy
+
+    @property
+    def recover(self) -> bool:
+        return self.__recover
+
+    @property
+    def stages(self) -> list[str]:
+        return self.__stages
@@ -1,3 +1,5 @@
+from itermv.components.filesystem import fileSystem
+from itermv.components.statx import STAT_FIELDS, FileStat
 from itermv.utils import validateFilename
 
 import os
@@ -33,18 +35,38 @@ class FileEntry:
         self.__path = os.path.join(path, name)
         fullpath = self.__path
         fdir, fname = os.path.split(fullpath)
-        if not os.path.exists(fullpath):
+        try:
+            # only the fields needed by the run are requested
+            stat = fileSystem.stat(fullpath)
+        except FileNotFoundError:
             raise FileNotFoundError(f"file does not exist: {fullpath}")
         noxname, ext = os.path.splitext(fname)
         self.__name = fname
         self.__noextname = noxname
         self.__extension = ext
         self.__parent = fdir
-        self.__mtime = os.path.getmtime(fullpath)
-        self.__atime = os.path.getatime(fullpath)
+        self.__complete = False
+        self.__setStat(stat)
+
+    def __setStat(self, stat: FileStat):
+        self.__mtime = stat.st_mtime
+        self.__mtime_ns = stat.st_mtime_ns
+        self.__atime = stat.st_atime
         # ctime is not consistent across platforms.
-        self.__ctime = os.path.getctime(fullpath)
-        self.__size = os.path.getsize(fullpath)
+        self.__ctime = stat.st_ctime
+        self.__btime = stat.st_birthtime
+        self.__size = stat.st_size
+        self.__device = stat.st_dev
+        self.__inode = stat.st_ino
+
+    def __fetch(self, value):
+        # fields left out of the mask are fetched together on first use
+        if value is None and not self.__complete:
+            self.__complete = True
+            try:
+                self.__setStat(fileSystem.stat(self.__path, set(STAT_FIELDS)))
+            except FileNotFoundError:
+                raise FileNotFoundError(f"file does not exist: {self.__path}")
 
     def __repr__(self) -> str:
         return f"'{self.__path}'"
@@ -71,26 +93,50 @@ class FileEntry:
 
     @property
     def mtime(self) -> float:
+        self.__fetch(self.__mtime)
         return self.__mtime
 
     @property
     def atime(self) -> float:
+        self.__fetch(self.__atime)
         return self.__atime
 
     @property
     def ctime(self) -> float:
+        self.__fetch(self.__ctime)
         return self.__ctime
 
+    @property
+    def btime(self) -> float | None:
+        # None when the file system does not record birth times
+        self.__fetch(self.__btime)
+        return self.__btime
+
     @property
     def size(self) -> int:
+        self.__fetch(self.__size)
         return self.__size
 
+    @property
+    def mtime_ns(self) -> int:
+        self.__fetch(self.__mtime_ns)
+        return self.__mtime_ns
+
+    @property
+    def device(self) -> int:
+        return self.__device
+
+    @property
+    def inode(self) -> int:
+        self.__fetch(self.__inode)
+        return self.__inode
+
 
 class InputPath:
     def __init__(self, path: str) -> None:
-        if not os.path.exists(path):
+        if not fileSystem.exists(path):
             raise ValueError(f"Directory was not found: {path}")
-        if not os.path.isdir(path):
+        if not fileSystem.isdir(path):
             raise ValueError(f"Provided file is not a directory: {path}")
 
         self.__path = os.path.abspath(path)
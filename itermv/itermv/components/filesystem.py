@@ -0,0 +1,451 @@
+from itermv.components.profiler import profiler
+from itermv.components.statx import AT_FDCWD, FileStat, statFetcher
+
+import os
+import sys
+import time
+import errno
+import ctypes
+import ctypes.util
+import random
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+RENAME_EXCHANGE = 2
+OPERATIONS = [
+    "listdir",
+    "scandir",
+    "stat",
+    "exists",
+    "isdir",
+    "islink",
+    "rename",
+    "exchange",
+    "mkdir",
+    "rmdir",
+]
+
+
+def fsError(code: int, path: str) -> OSError:
+    # OSError picks the matching subclass (FileNotFoundError and so on)
+    return OSError(code, os.strerror(code), path)
+
+
+def loadRenameat2():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+class FileSystem(ABC):
+    # every access of the planner and the executor goes through these calls
+    @abstractmethod
+    def listdir(self, path: str) -> list[str]: ...
+
+    @abstractmethod
+    def scandir(self, path: str) -> list[os.DirEntry]:
+        # entries answer name, is_dir() and stat() like os.DirEntry
+        ...
+
+    @abstractmethod
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat: ...
+
+    @abstractmethod
+    def exists(self, path: str) -> bool: ...
+
+    @abstractmethod
+    def isdir(self, path: str) -> bool: ...
+
+    @abstractmethod
+    def islink(self, path: str) -> bool: ...
+
+    @abstractmethod
+    def rename(self, source: str, target: str): ...
+
+    @abstractmethod
+    def exchange(self, first: str, second: str): ...
+
+    @abstractmethod
+    def mkdir(self, path: str): ...
+
+    @abstractmethod
+    def rmdir(self, path: str): ...
+
+    def walk(self, path: str) -> Iterator[tuple[str, list[str], list[str]]]:
+        # top down, like os.walk
+        folders, files = [], []
+        for name in self.listdir(path):
+            child = os.path.join(path, name)
+            (folders if self.isdir(child) else files).append(name)
+        yield path, folders, files
+        for name in folders:
+            yield from self.walk(os.path.join(path, name))
+
+
+class OsFileSystem(FileSystem):
+    def __init__(self) -> None:
+        self.__renameat2 = loadRenameat2()
+
+    def listdir(self, path: str) -> list[str]:
+        return os.listdir(path)
+
+    def scandir(self, path: str) -> list[os.DirEntry]:
+        with os.scandir(path) as entries:
+            return list(entries)
+
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat:
+        return statFetcher.stat(path, fields)
+
+    def exists(self, path: str) -> bool:
+        # a dangling link still takes the name
+        return os.path.lexists(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def islink(self, path: str) -> bool:
+        return os.path.islink(path)
+
+    def rename(self, source: str, target: str):
+        os.rename(source, target)
+
+    def exchange(self, first: str, second: str):
+        if self.__renameat2 is None:
+            raise fsError(errno.ENOSYS, first)
+        src, dst = os.fsencode(first), os.fsencode(second)
+        if self.__renameat2(AT_FDCWD, src, AT_FDCWD, dst, RENAME_EXCHANGE) != 0:
+            raise fsError(ctypes.get_errno(), first)
+
+    def mkdir(self, path: str):
+        os.mkdir(path)
+
+    def rmdir(self, path: str):
+        os.rmdir(path)
+
+    def walk(self, path: str) -> Iterator[tuple[str, list[str], list[str]]]:
+        return os.walk(path)
+
+
+class MemoryNode:
+    __slots__ = ("ino", "size", "mtime_ns", "atime_ns", "ctime_ns", "btime_ns")
+
+    def __init__(self, ino: int, size: int, stamp_ns: int) -> None:
+        self.ino = ino
+        self.size = size
+        self.mtime_ns = stamp_ns
+        self.atime_ns = stamp_ns
+        self.ctime_ns = stamp_ns
+        self.btime_ns = stamp_ns
+
+    def toStat(self) -> FileStat:
+        stat = FileStat()
+        stat.st_ino = self.ino
+        stat.st_size = self.size
+        stat.st_mtime_ns = self.mtime_ns
+        stat.st_mtime = self.mtime_ns / 1e9
+        stat.st_atime = self.atime_ns / 1e9
+        stat.st_ctime = self.ctime_ns / 1e9
+        stat.st_birthtime = self.btime_ns / 1e9
+        return stat
+
+
+class MemoryEntry:
+    __slots__ = ("name", "node", "folder")
+
+    def __init__(self, name: str, node: MemoryNode, folder: bool) -> None:
+        self.name = name
+        self.node = node
+        self.folder = folder
+
+    def is_dir(self) -> bool:
+        return self.folder
+
+    def stat(self) -> FileStat:
+        return self.node.toStat()
+
+
+class MemoryFileSystem(FileSystem):
+    # a flat map of directories keeps lookups cheap at millions of entries
+    def __init__(self) -> None:
+        self.__nodes: dict[str, dict[str, MemoryNode]] = {}
+        self.__dirs: dict[str, MemoryNode] = {}
+        self.__inodes = 0
+        self.makedirs(os.sep)
+
+    def __newNode(self, size: int = 0, stamp_ns: int | None = None) -> MemoryNode:
+        self.__inodes += 1
+        stamp_ns = time.time_ns() if stamp_ns is None else stamp_ns
+        return MemoryNode(self.__inodes, size, stamp_ns)
+
+    def __split(self, path: str) -> tuple[str, str]:
+        parent, name = os.path.split(os.path.abspath(path))
+        if parent not in self.__nodes:
+            raise fsError(errno.ENOENT, path)
+        return parent, name
+
+    def __touch(self, parent: str):
+        self.__dirs[parent].mtime_ns = self.__dirs[parent].ctime_ns = time.time_ns()
+
+    def createFile(self, path: str, size: int = 0, mtime_ns: int | None = None):
+        parent, name = self.__split(path)
+        if name in self.__nodes[parent]:
+            raise fsError(errno.EEXIST, path)
+        self.__nodes[parent][name] = self.__newNode(size, mtime_ns)
+        self.__touch(parent)
+
+    def makedirs(self, path: str):
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        if path in self.__nodes:
+            return
+        if parent != path:
+            self.makedirs(parent)
+        self.__dirs[path] = self.__newNode()
+        self.__nodes[path] = {}
+        if name:
+            self.__nodes[parent][name] = self.__dirs[path]
+
+    def listdir(self, path: str) -> list[str]:
+        children = self.__nodes.get(os.path.abspath(path))
+        if children is None:
+            raise fsError(errno.ENOENT, path)
+        return list(children)
+
+    def scandir(self, path: str) -> list[MemoryEntry]:
+        path = os.path.abspath(path)
+        children = self.__nodes.get(path)
+        if children is None:
+            raise fsError(errno.ENOENT, path)
+        isFolder = lambda name: os.path.join(path, name) in self.__nodes
+        return [MemoryEntry(n, c, isFolder(n)) for n, c in children.items()]
+
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat:
+        path = os.path.abspath(path)
+        if path in self.__dirs:
+            return self.__dirs[path].toStat()
+        parent, name = self.__split(path)
+        node = self.__nodes[parent].get(name)
+        if node is None:
+            raise fsError(errno.ENOENT, path)
+        return node.toStat()
+
+    def exists(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        return path in self.__nodes or name in self.__nodes.get(parent, {})
+
+    def isdir(self, path: str) -> bool:
+        return os.path.abspath(path) in self.__nodes
+
+    def islink(self, path: str) -> bool:
+        # links cannot be created in memory
+        return False
+
+    def rename(self, source: str, target: str):
+        sparent, sname = self.__split(source)
+        tparent, tname = self.__split(target)
+        node = self.__nodes[sparent].get(sname)
+        if node is None:
+            raise fsError(errno.ENOENT, source)
+        if self.isdir(target) and not self.isdir(source):
+            raise fsError(errno.EISDIR, target)
+        if self.isdir(source):
+            self.__moveTree(os.path.abspath(source), os.path.abspath(target))
+        # like rename(2) an existing file at the target is replaced
+        del self.__nodes[sparent][sname]
+        self.__nodes[tparent][tname] = node
+        self.__touch(sparent)
+        self.__touch(tparent)
+
+    def __moveTree(self, source: str, target: str):
+        if self.__nodes.get(target):
+            raise fsError(errno.ENOTEMPTY, target)
+        prefix = source + os.sep
+        moved = [d for d in self.__nodes if d == source or d.startswith(prefix)]
+        for folder in moved:
+            renamed = target + folder[len(source) :]
+            self.__nodes[renamed] = self.__nodes.pop(folder)
+            self.__dirs[renamed] = self.__dirs.pop(folder)
+
+    def exchange(self, first: str, second: str):
+        fparent, fname = self.__split(first)
+        sparent, sname = self.__split(second)
+        if fname not in self.__nodes[fparent]:
+            raise fsError(errno.ENOENT, first)
+        if sname not in self.__nodes[sparent]:
+            raise fsError(errno.ENOENT, second)
+        if self.isdir(first) or self.isdir(second):
+            raise fsError(errno.EINVAL, first)
+        fnodes, snodes = self.__nodes[fparent], self.__nodes[sparent]
+        fnodes[fname], snodes[sname] = snodes[sname], fnodes[fname]
+        self.__touch(fparent)
+        self.__touch(sparent)
+
+    def mkdir(self, path: str):
+        parent, name = self.__split(path)
+        if name in self.__nodes[parent]:
+            raise fsError(errno.EEXIST, path)
+        self.makedirs(path)
+        self.__touch(parent)
+
+    def rmdir(self, path: str):
+        path = os.path.abspath(path)
+        if path not in self.__nodes:
+            raise fsError(errno.ENOTDIR if self.exists(path) else errno.ENOENT, path)
+        if self.__nodes[path]:
+            raise fsError(errno.ENOTEMPTY, path)
+        parent, name = os.path.split(path)
+        del self.__nodes[path], self.__dirs[path], self.__nodes[parent][name]
+        self.__touch(parent)
+
+
+class FaultyFileSystem(FileSystem):
+    # wraps another backend to reproduce slow or unreliable storage locally
+    def __init__(
+        self,
+        inner: FileSystem,
+        latency: dict[str, float] | float = 0.0,
+        failures: dict[str, float] | float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        getRates = lambda x: x if type(x) == dict else dict.fromkeys(OPERATIONS, x)
+        self.__inner = inner
+        self.__latency = getRates(latency)
+        self.__failures = getRates(failures)
+        self.__random = random.Random(seed)
+
+    def __inject(self, operation: str, path: str):
+        delay = self.__latency.get(operation, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.__random.random() < self.__failures.get(operation, 0.0):
+            raise fsError(errno.EIO, path)
+
+    def listdir(self, path: str) -> list[str]:
+        self.__inject("listdir", path)
+        return self.__inner.listdir(path)
+
+    def scandir(self, path: str) -> list[os.DirEntry]:
+        self.__inject("scandir", path)
+        return self.__inner.scandir(path)
+
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat:
+        self.__inject("stat", path)
+        return self.__inner.stat(path, fields)
+
+    def exists(self, path: str) -> bool:
+        self.__inject("exists", path)
+        return self.__inner.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        self.__inject("isdir", path)
+        return self.__inner.isdir(path)
+
+    def islink(self, path: str) -> bool:
+        self.__inject("islink", path)
+        return self.__inner.islink(path)
+
+    def rename(self, source: str, target: str):
+        self.__inject("rename", source)
+        self.__inner.rename(source, target)
+
+    def exchange(self, first: str, second: str):
+        self.__inject("exchange", first)
+        self.__inner.exchange(first, second)
+
+    def mkdir(self, path: str):
+        self.__inject("mkdir", path)
+        self.__inner.mkdir(path)
+
+    def rmdir(self, path: str):
+        self.__inject("rmdir", path)
+        self.__inner.rmdir(path)
+
+
+class CountingFileSystem(FileSystem):
+    # the backend in use can be swapped, the counters stay in one place
+    def __init__(self, backend: FileSystem) -> None:
+        self.__backend = backend
+        self.__counts: dict[str, int] = {}
+
+    def use(self, backend: FileSystem):
+        self.__backend = backend
+        return self
+
+    def __count(self, operation: str):
+        self.__counts[operation] = self.__counts.get(operation, 0) + 1
+        profiler.count(operation)
+
+    def listdir(self, path: str) -> list[str]:
+        self.__count("listdir")
+        return self.__backend.listdir(path)
+
+    def scandir(self, path: str) -> list[os.DirEntry]:
+        self.__count("scandir")
+        return self.__backend.scandir(path)
+
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat:
+        self.__count("stat")
+        return self.__backend.stat(path, fields)
+
+    def exists(self, path: str) -> bool:
+        self.__count("exists")
+        return self.__backend.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        self.__count("isdir")
+        return self.__backend.isdir(path)
+
+    def islink(self, path: str) -> bool:
+        self.__count("islink")
+        return self.__backend.islink(path)
+
+    def rename(self, source: str, target: str):
+        self.__count("rename")
+        self.__backend.rename(source, target)
+
+    def exchange(self, first: str, second: str):
+        self.__count("exchange")
+        self.__backend.exchange(first, second)
+
+    def mkdir(self, path: str):
+        self.__count("mkdir")
+        self.__backend.mkdir(path)
+
+    def rmdir(self, path: str):
+        self.__count("rmdir")
+        self.__backend.rmdir(path)
+
+    def walk(self, path: str) -> Iterator[tuple[str, list[str], list[str]]]:
+        # a walk is counted as one listing per directory
+        for entry in self.__backend.walk(path):
+            self.__count("listdir")
+            yield entry
+
+    def reset(self):
+        self.__counts = {}
+
+    @property
+    def backend(self) -> FileSystem:
+        return self.__backend
+
+    @property
+    def counts(self) -> dict[str, int]:
+        return dict(self.__counts)
+
+
+# shared instance so every module reaches the same backend and counters
+fileSystem = CountingFileSystem(OsFileSystem())
@@ -0,0 +1,73 @@
+from itermv.components import FileEntry, fileSystem
+
+import os
+import json
+from sys import stderr
+
+
+class HashDigest(str):
+    # format spec is a truncation length, e.g. {sha256:8}
+    def __format__(self, spec: str) -> str:
+        if spec.isdigit():
+            return str(self[: int(spec)])
+        return super().__format__(spec)
+
+
+class HashCache:
+    def __init__(self, path: str | None) -> None:
+        self.__path = None if path is None else os.path.abspath(path)
+        self.__entries: dict[str, dict[str, str]] | None = None
+        self.__dirty = False
+
+    def __load(self) -> dict[str, dict[str, str]]:
+        # the cache is only read once a hash is actually requested
+        if self.__entries is not None:
+            return self.__entries
+        self.__entries = {}
+        if self.__path is None or not fileSystem.exists(self.__path):
+            return self.__entries
+        try:
+            with open(self.__path, "r", encoding="utf-8") as cache:
+                entries = json.load(cache)
+            if type(entries) == dict:
+                self.__entries = entries
+        except (OSError, ValueError):
+            # a corrupt cache is rebuilt from scratch
+            pass
+        return self.__entries
+
+    def __repr__(self) -> str:
+        return f"'{self.__path}'"
+
+    @staticmethod
+    def getKey(file: FileEntry) -> str:
+        return f"{file.device}:{file.inode}:{file.size}:{file.mtime_ns}"
+
+    def get(self, file: FileEntry, algo: str) -> str | None:
+        return self.__load().get(HashCache.getKey(file), {}).get(algo)
+
+    def put(self, file: FileEntry, algo: str, digest: str):
+        key = HashCache.getKey(file)
+        entry = self.__load().setdefault(key, {})
+        if entry.get(algo) != digest:
+            entry[algo] = digest
+            self.__dirty = True
+
+    def save(self):
+        if self.__path is None or not self.__dirty:
+            return
+        temppath = f"{self.__path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.__path), exist_ok=True)
+            with open(temppath, "w", encoding="utf-8") as cache:
+                json.dump(self.__entries, cache, separators=(",", ":"))
+            os.replace(temppath, self.__path)
+        except OSError as err:
+            # the cache is an optimization so a failure is not fatal
+            print(f"Warning: hash cache was not saved ({err})", file=stderr)
+            return
+        self.__dirty = False
+
+    @property
+    def path(self) -> str | None:
+        return self.__path
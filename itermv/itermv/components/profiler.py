@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import cProfile
+import tracemalloc
+from sys import stderr
+from contextlib import nullcontext
+
+
+class ProfilePhase:
+    def __init__(self, profiler: "PhaseProfiler", name: str, items: int) -> None:
+        self.__profiler = profiler
+        self.__name = name
+        self.__cprofile: cProfile.Profile | None = None
+        self.items = items
+
+    def __enter__(self):
+        if self.__profiler.dump_dir is not None:
+            self.__cprofile = cProfile.Profile()
+            self.__cprofile.enable()
+        self.__wall = time.perf_counter()
+        self.__cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.__wall
+        cpu = time.process_time() - self.__cpu
+        if self.__cprofile is not None:
+            self.__cprofile.disable()
+            dumpfile = os.path.join(self.__profiler.dump_dir, f"{self.__name}.prof")
+            self.__cprofile.dump_stats(dumpfile)
+        self.__profiler.record(self.__name, wall, cpu, self.items)
+        return False
+
+
+class PhaseProfiler:
+    FORMAT_TEXT = "text"
+    FORMAT_JSON = "json"
+    OPTIONS = [FORMAT_TEXT, FORMAT_JSON]
+
+    def __init__(self) -> None:
+        self.__enabled = False
+        self.__format = PhaseProfiler.FORMAT_TEXT
+        self.__dump_dir: str | None = None
+        self.__phases: dict[str, dict[str, float]] = {}
+        self.__counts: dict[str, int] = {}
+        # a single shared context keeps disabled phases allocation free
+        self.__null = nullcontext(ProfilePhase(self, "", 0))
+
+    def enable(self, fmt: str = FORMAT_TEXT, dump_dir: str | None = None):
+        if fmt not in PhaseProfiler.OPTIONS:
+            raise ValueError(f"'{fmt}' is not a valid profile format")
+        self.__enabled = True
+        self.__format = fmt
+        self.__dump_dir = dump_dir
+        if dump_dir is not None:
+            os.makedirs(dump_dir, exist_ok=True)
+        tracemalloc.start()
+        return self
+
+    def phase(self, name: str, items: int = 0):
+        if not self.__enabled:
+            return self.__null
+        return ProfilePhase(self, name, items)
+
+    def count(self, operation: str, amount: int = 1):
+        if self.__enabled:
+            self.__counts[operation] = self.__counts.get(operation, 0) + amount
+
+    def record(self, name: str, wall: float, cpu: float, items: int = 0):
+        if not self.__enabled:
+            return
+        phase = self.__phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "items": 0})
+        phase["wall"] += wall
+        phase["cpu"] += cpu
+        phase["items"] += items
+
+    def summary(self) -> dict:
+        phases = {}
+        for name, phase in self.__phases.items():
+            rate = phase["items"] / phase["wall"] if phase["wall"] > 0 else 0.0
+            phases[name] = {**phase, "items_per_sec": rate}
+        _, peak = tracemalloc.get_traced_memory()
+        return {
+            "phases": phases,
+            "counts": dict(self.__counts),
+            "peak_memory": peak,
+        }
+
+    def report(self, file=stderr):
+        if not self.__enabled:
+            return
+        summary = self.summary()
+        tracemalloc.stop()
+
+        if self.__format == PhaseProfiler.FORMAT_JSON:
+            print(json.dumps(summary), file=file)
+            return
+
+        print("\nProfile:", file=file)
+        print(
+            f"    {'phase':<10} {'wall (s)':>10} {'cpu (s)':>10} "
+            f"{'items':>10} {'items/s':>12}",
+            file=file,
+        )
+        for name, phase in summary["phases"].items():
+            print(
+                f"    {name:<10} {phase['wall']:>10.4f} {phase['cpu']:>10.4f} "
+                f"{phase['items']:>10} {phase['items_per_sec']:>12.1f}",
+                file=file,
+            )
+        counts = ", ".join(f"{k}={v}" for k, v in summary["counts"].items())
+        print(f"    calls: {counts if counts else 'none'}", file=file)
+        print(f"    peak memory: {summary['peak_memory'] / 1024:.1f} KiB", file=file)
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def dump_dir(self) -> str | None:
+        return self.__dump_dir
+
+
+# shared instance so phases can be measured without threading state around
+profiler = PhaseProfiler()
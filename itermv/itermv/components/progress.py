@@ -0,0 +1,152 @@
+import json
+import time
+from sys import stderr
+
+
+class ProgressTask:
+    def __init__(
+        self, reporter: "ProgressReporter", name: str, total: int, done: int = 0
+    ) -> None:
+        self.__reporter = reporter
+        self.__name = name
+        self.__total = total
+        self.__start = time.monotonic()
+        self.__last = self.__start
+        # items done before the task started do not count towards its rate
+        self.__initial = done
+        # the clock is only read once done reaches the checkpoint
+        self.__checkpoint = done + 1
+        self.done = done
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.__reporter.emit(self, time.monotonic(), True)
+        return False
+
+    def advance(self, amount: int = 1):
+        self.done += amount
+        if self.done >= self.__checkpoint:
+            self.__poll()
+
+    def __poll(self):
+        now = time.monotonic()
+        interval = self.__reporter.interval
+        if now - self.__last >= interval:
+            self.__reporter.emit(self, now, False)
+            self.__last = now
+        # aim the next checkpoint at roughly the next refresh
+        rate = self.rate(now)
+        self.__checkpoint = self.done + max(1, int(rate * interval / 4))
+
+    def rate(self, now: float) -> float:
+        elapsed = now - self.__start
+        return (self.done - self.__initial) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, now: float) -> float | None:
+        rate = self.rate(now)
+        if rate <= 0 or self.__total <= 0:
+            return None
+        return max(0, self.__total - self.done) / rate
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def total(self) -> int:
+        return self.__total
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.__start
+
+
+class NullTask:
+    # shared by every phase while progress is disabled
+    done = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def advance(self, amount: int = 1):
+        pass
+
+
+class ProgressReporter:
+    FORMAT_TEXT = "text"
+    FORMAT_JSON = "json"
+    OPTIONS = [FORMAT_TEXT, FORMAT_JSON]
+    DEFAULT_INTERVAL = 0.5
+
+    def __init__(self) -> None:
+        self.__enabled = False
+        self.__format = ProgressReporter.FORMAT_TEXT
+        self.__interval = ProgressReporter.DEFAULT_INTERVAL
+        self.__file = stderr
+        self.__null = NullTask()
+
+    def enable(
+        self, fmt: str = FORMAT_TEXT, interval: float = DEFAULT_INTERVAL, file=stderr
+    ):
+        if fmt not in ProgressReporter.OPTIONS:
+            raise ValueError(f"'{fmt}' is not a valid progress format")
+        # text progress redraws a line, which is only useful on a terminal
+        istty = hasattr(file, "isatty") and file.isatty()
+        self.__enabled = fmt == ProgressReporter.FORMAT_JSON or istty
+        self.__format = fmt
+        self.__interval = interval
+        self.__file = file
+        return self
+
+    def task(self, name: str, total: int = 0, done: int = 0):
+        if not self.__enabled:
+            return self.__null
+        return ProgressTask(self, name, total, done)
+
+    def emit(self, task: ProgressTask, now: float, final: bool):
+        rate = task.rate(now)
+        eta = task.eta(now)
+
+        if self.__format == ProgressReporter.FORMAT_JSON:
+            line = {
+                "phase": task.name,
+                "done": task.done,
+                "total": task.total,
+                "items_per_sec": rate,
+                "eta": 0.0 if final else eta,
+                "final": final,
+            }
+            print(json.dumps(line), file=self.__file, flush=True)
+            return
+
+        count = f"{task.done}/{task.total}" if task.total else f"{task.done}"
+        remaining = "done" if final else f"ETA {formatSeconds(eta)}"
+        line = f"\r{task.name}: {count} ({rate:.0f} items/s, {remaining})"
+        print(f"{line}\033[K", end="\n" if final else "", file=self.__file, flush=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+
+def formatSeconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes:02}:{seconds:02}"
+
+
+# shared instance so long loops can report without threading state around
+progress = ProgressReporter()
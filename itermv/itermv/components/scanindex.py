@@ -0,0 +1,87 @@
+from itermv.components.filesystem import fileSystem
+
+import time
+from threading import Lock
+
+
+class DirectoryIndex:
+    # only names are kept, rewriting a file does not touch its directory
+    def __init__(self, mtime_ns: int, names: list[str]) -> None:
+        self.mtime_ns = mtime_ns
+        self.names = names
+
+
+class ScanIndex:
+    # directories modified this recently may still change within the same tick
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self) -> None:
+        self.__enabled = False
+        self.__dirs: dict[str, DirectoryIndex] = {}
+        self.__lock = Lock()
+        # what this process learned, so a worker can hand it to the server
+        self.__changes: dict[str, DirectoryIndex | None] = {}
+        self.__hits = 0
+        self.__misses = 0
+
+    def enable(self):
+        self.__enabled = True
+        return self
+
+    def listdir(self, path: str) -> list[str]:
+        if not self.__enabled:
+            return fileSystem.listdir(path)
+
+        # renames, creations and deletions all bump the mtime of the directory
+        mtime_ns = fileSystem.stat(path, {"mtime"}).st_mtime_ns
+        with self.__lock:
+            index = self.__dirs.get(path)
+            if index is not None and index.mtime_ns == mtime_ns:
+                self.__hits += 1
+                return list(index.names)
+            self.__misses += 1
+            if self.__dirs.pop(path, None) is not None:
+                self.__changes[path] = None
+
+        names = fileSystem.listdir(path)
+        if time.time_ns() - mtime_ns > ScanIndex.RACY_WINDOW_NS:
+            with self.__lock:
+                index = self.__changes[path] = DirectoryIndex(mtime_ns, names)
+                self.__dirs[path] = index
+        return list(names)
+
+    def invalidate(self, path: str):
+        with self.__lock:
+            self.__dirs.pop(path, None)
+            self.__changes[path] = None
+
+    def changes(self) -> dict[str, tuple[int, list[str]] | None]:
+        with self.__lock:
+            changes = self.__changes
+            self.__changes = {}
+        getValue = lambda i: None if i is None else (i.mtime_ns, i.names)
+        return {path: getValue(index) for path, index in changes.items()}
+
+    def merge(self, changes: dict[str, tuple[int, list[str]] | None]):
+        with self.__lock:
+            for path, value in changes.items():
+                if value is None:
+                    self.__dirs.pop(path, None)
+                else:
+                    self.__dirs[path] = DirectoryIndex(*value)
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+
+# shared instance so scans can reuse warm indexes without threading state around
+scanIndex = ScanIndex()
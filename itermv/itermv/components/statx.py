@@ -0,0 +1,187 @@
+import os
+import sys
+import errno
+import ctypes
+import ctypes.util
+from threading import local
+
+# field masks from linux/stat.h
+STATX_ATIME = 0x20
+STATX_MTIME = 0x40
+STATX_CTIME = 0x80
+STATX_INO = 0x100
+STATX_SIZE = 0x200
+STATX_BTIME = 0x800
+AT_FDCWD = -100
+AT_STATX_DONT_SYNC = 0x4000
+
+STAT_FIELDS = {
+    "atime": STATX_ATIME,
+    "mtime": STATX_MTIME,
+    "ctime": STATX_CTIME,
+    "btime": STATX_BTIME,
+    "size": STATX_SIZE,
+    "ino": STATX_INO,
+}
+# fields that identify a file in plans and caches
+IDENTITY_FIELDS = {"ino", "size", "mtime"}
+
+
+class StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_int64),
+        ("tv_nsec", ctypes.c_uint32),
+        ("__reserved", ctypes.c_int32),
+    ]
+
+
+class StatxBuffer(ctypes.Structure):
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("__spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64),
+        ("stx_size", ctypes.c_uint64),
+        ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", StatxTimestamp),
+        ("stx_btime", StatxTimestamp),
+        ("stx_ctime", StatxTimestamp),
+        ("stx_mtime", StatxTimestamp),
+        ("stx_rdev_major", ctypes.c_uint32),
+        ("stx_rdev_minor", ctypes.c_uint32),
+        ("stx_dev_major", ctypes.c_uint32),
+        ("stx_dev_minor", ctypes.c_uint32),
+        # the kernel may fill newer fields, the structure is 256 bytes long
+        ("__spare3", ctypes.c_uint64 * 14),
+    ]
+
+
+def loadStatx():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        statx = libc.statx
+    except (OSError, AttributeError):
+        # glibc older than 2.28 or a libc without the wrapper
+        return None
+    statx.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_uint,
+        ctypes.POINTER(StatxBuffer),
+    ]
+    statx.restype = ctypes.c_int
+    return statx
+
+
+class FileStat:
+    # fields that were not requested (or not supported) are None
+    def __init__(self) -> None:
+        self.st_dev: int = 0
+        self.st_ino: int | None = None
+        self.st_size: int | None = None
+        self.st_atime: float | None = None
+        self.st_mtime: float | None = None
+        self.st_mtime_ns: int | None = None
+        self.st_ctime: float | None = None
+        self.st_birthtime: float | None = None
+
+    @staticmethod
+    def fromStatx(buffer: StatxBuffer) -> "FileStat":
+        stat = FileStat()
+        mask = buffer.stx_mask
+        getTime = lambda ts: ts.tv_sec + ts.tv_nsec / 1e9
+        stat.st_dev = os.makedev(buffer.stx_dev_major, buffer.stx_dev_minor)
+        if mask & STATX_INO:
+            stat.st_ino = buffer.stx_ino
+        if mask & STATX_SIZE:
+            stat.st_size = buffer.stx_size
+        if mask & STATX_ATIME:
+            stat.st_atime = getTime(buffer.stx_atime)
+        if mask & STATX_MTIME:
+            ts = buffer.stx_mtime
+            stat.st_mtime = getTime(ts)
+            stat.st_mtime_ns = ts.tv_sec * 1_000_000_000 + ts.tv_nsec
+        if mask & STATX_CTIME:
+            stat.st_ctime = getTime(buffer.stx_ctime)
+        if mask & STATX_BTIME:
+            stat.st_birthtime = getTime(buffer.stx_btime)
+        return stat
+
+    @staticmethod
+    def fromStat(result: os.stat_result) -> "FileStat":
+        stat = FileStat()
+        stat.st_dev = result.st_dev
+        stat.st_ino = result.st_ino
+        stat.st_size = result.st_size
+        stat.st_atime = result.st_atime
+        stat.st_mtime = result.st_mtime
+        stat.st_mtime_ns = result.st_mtime_ns
+        stat.st_ctime = result.st_ctime
+        # only some platforms report the birth time through os.stat
+        stat.st_birthtime = getattr(result, "st_birthtime", None)
+        return stat
+
+
+class StatFetcher:
+    def __init__(self) -> None:
+        self.__statx = loadStatx()
+        self.__buffers = local()
+        self.__fields = set(STAT_FIELDS)
+        self.__mask = StatFetcher.getMask(self.__fields)
+        self.__flags = 0
+
+    @staticmethod
+    def getMask(fields: set[str]) -> int:
+        mask = 0
+        for field in fields:
+            mask |= STAT_FIELDS[field]
+        return mask
+
+    def configure(self, fields: set[str], dontSync: bool = False):
+        self.__fields = set(fields)
+        self.__mask = StatFetcher.getMask(self.__fields)
+        # callers only allow cached attributes when no file is identified by them
+        self.__flags = AT_STATX_DONT_SYNC if dontSync else 0
+        return self
+
+    def stat(self, path: str, fields: set[str] | None = None) -> FileStat:
+        if self.__statx is None:
+            return FileStat.fromStat(os.stat(path))
+
+        mask, flags = self.__mask, self.__flags
+        if fields is not None:
+            mask, flags = StatFetcher.getMask(fields), 0
+        buffer = getattr(self.__buffers, "buffer", None)
+        if buffer is None:
+            buffer = self.__buffers.buffer = StatxBuffer()
+
+        result = self.__statx(AT_FDCWD, os.fsencode(path), flags, mask, buffer)
+        if result != 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSYS:
+                # the kernel predates statx or a sandbox blocks it
+                self.__statx = None
+                return FileStat.fromStat(os.stat(path))
+            raise OSError(code, os.strerror(code), path)
+        return FileStat.fromStatx(buffer)
+
+    @property
+    def fields(self) -> set[str]:
+        return self.__fields
+
+    @property
+    def native(self) -> bool:
+        return self.__statx is not None
+
+
+# shared instance so every entry is fetched with the mask chosen for the run
+statFetcher = StatFetcher()
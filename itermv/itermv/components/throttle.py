@@ -0,0 +1,116 @@
+import time
+from threading import Lock
+from contextlib import nullcontext
+
+
+class ThrottledOperation:
+    def __init__(self, throttle: "Throttle") -> None:
+        self.__throttle = throttle
+
+    def __enter__(self):
+        self.__throttle.acquire()
+        self.__start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.__throttle.record(time.monotonic() - self.__start)
+        return False
+
+
+class Throttle:
+    # weight of the newest latency sample in the moving average
+    EWMA_ALPHA = 0.2
+    # operations between two consecutive back offs
+    COOLDOWN = int(1 / EWMA_ALPHA)
+    BACKOFF = 0.5
+    RECOVERY = 1.02
+    MIN_RATE = 1.0
+
+    def __init__(self, rate: float | None = None, target: float | None = None) -> None:
+        # rate is in operations per second, target latency in seconds
+        self.__ceiling = rate
+        self.__rate = rate
+        self.__target = target
+        self.__tokens = 1.0
+        self.__stamp = time.monotonic()
+        self.__start = self.__stamp
+        self.__ewma: float | None = None
+        self.__cooldown = 0
+        self.__backoffs = 0
+        self.__ops = 0
+        self.__lock = Lock()
+        self.__null = nullcontext()
+
+    def operation(self):
+        if not self.enabled:
+            return self.__null
+        return ThrottledOperation(self)
+
+    def acquire(self):
+        with self.__lock:
+            now = time.monotonic()
+            if self.__ops == 0:
+                self.__start = now
+            self.__ops += 1
+            if self.__rate is None:
+                return
+            # tokens may go negative: each caller reserves its own slot
+            burst = max(1.0, self.__rate / 10)
+            elapsed = now - self.__stamp
+            self.__tokens = min(burst, self.__tokens + elapsed * self.__rate)
+            self.__stamp = now
+            self.__tokens -= 1
+            delay = -self.__tokens / self.__rate if self.__tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, latency: float):
+        if self.__target is None:
+            return
+        with self.__lock:
+            if self.__ewma is None:
+                self.__ewma = latency
+            else:
+                alpha = Throttle.EWMA_ALPHA
+                self.__ewma = alpha * latency + (1 - alpha) * self.__ewma
+            self.__cooldown = max(0, self.__cooldown - 1)
+
+            if self.__ewma > self.__target and self.__cooldown == 0:
+                # unlimited runs start backing off from what they achieved
+                current = self.__rate if self.__rate is not None else self.achieved
+                self.__rate = max(Throttle.MIN_RATE, current * Throttle.BACKOFF)
+                self.__cooldown = Throttle.COOLDOWN
+                self.__backoffs += 1
+            elif self.__ewma <= self.__target and self.__rate is not None:
+                rate = self.__rate * Throttle.RECOVERY
+                ceiling = self.__ceiling
+                self.__rate = rate if ceiling is None else min(ceiling, rate)
+
+    @property
+    def enabled(self) -> bool:
+        return self.__ceiling is not None or self.__target is not None
+
+    @property
+    def adaptive(self) -> bool:
+        return self.__target is not None
+
+    @property
+    def ops(self) -> int:
+        return self.__ops
+
+    @property
+    def achieved(self) -> float:
+        elapsed = time.monotonic() - self.__start
+        return self.__ops / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def rate(self) -> float | None:
+        return self.__rate
+
+    @property
+    def latency(self) -> float | None:
+        return self.__ewma
+
+    @property
+    def backoffs(self) -> int:
+        return self.__backoffs
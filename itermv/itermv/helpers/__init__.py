@@ -1,3 +1,11 @@
 from .argparsing import *
+from .hashoperations import *
+from .metaoperations import *
 from .dataoperations import *
 from .fileoperations import *
+from .copyoperations import *
+from .planoperations import *
+from .changeoperations import *
+from .stageoperations import *
+from .runoperations import *
+from .serveoperations import *
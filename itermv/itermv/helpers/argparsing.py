@@ -1,6 +1,9 @@
 from itermv.components import (
     ArgsWrapper,
     BlankLinesHelpFormatter,
+    HashCache,
+    PhaseProfiler,
+    ProgressReporter,
     InputPath,
     NamePattern,
     SortingOptions,
@@ -8,15 +11,32 @@ from itermv.components import (
     FileEntry,
     PairifyAction,
     NewFile,
+    RuleSet,
+    IDENTITY_FIELDS,
+    STAT_FIELDS,
+    statFetcher,
+)
+from itermv.helpers.copyoperations import REFLINK_AUTO, REFLINK_OPTIONS
+from itermv.helpers.dataoperations import TIME_FIELDS
+from itermv.helpers.hashoperations import HASH_FIELDS
+from itermv.helpers.stageoperations import STRATEGY_AUTO, STRATEGY_OPTIONS
+from itermv.utils import (
+    nonNegativeNumber,
+    positiveNumber,
+    positiveRadix,
+    shardSpec,
+    isTopLevelPath,
 )
-from itermv.utils import nonNegativeNumber, positiveRadix, isTopLevelPath
 from itermv.version import __version__
 
 import os
+import re
 import sys
 from shlex import split as shsplit
 import textwrap
 from argparse import ArgumentParser
+from functools import cache
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import NoReturn, TypeAlias
 from collections.abc import Callable
@@ -24,13 +44,42 @@ from collections.abc import Callable
 
 Err_Callback: TypeAlias = Callable[[str], NoReturn]
 
+DEFAULT_IO_JOBS = 8
+# hexadecimal digits available in the digest behind {bucket}
+MAX_BUCKET_DIGITS = 32
+
+
+def statEntries(
+    names: list[str], path: str, jobs: int, err_cb: Err_Callback
+) -> list[FileEntry]:
+    def statEntry(name: str):
+        try:
+            return FileEntry(name, path)
+        except FileNotFoundError as err:
+            return err
+
+    # stat calls release the GIL, so threads hide per-file round trips
+    if jobs > 1 and len(names) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            entries = list(pool.map(statEntry, names))
+    else:
+        entries = [statEntry(name) for name in names]
 
-def getInputList(path: str, flist: list[str] | None, err_cb: Err_Callback):
+    missing = [str(e) for e in entries if isinstance(e, FileNotFoundError)]
+    if missing:
+        err_cb(f"{len(missing)} files were not found:\n" + "\n".join(missing))
+
+    return entries
+
+
+def getInputList(
+    path: str, flist: list[str] | None, jobs: int, err_cb: Err_Callback
+):
     if flist is None:
         return None
     if len(flist) == 1 and flist[0] == "-":
         flist = shsplit(sys.stdin.read())
-    name_list: list[FileEntry] = []
+    name_list: list[str] = []
     name_set = set()
 
     for file in flist:
@@ -43,23 +92,23 @@ def getInputList(path: str, flist: list[str] | None, err_cb: Err_Callback):
             err_cb(f"{file} is a duplicate destination name")
 
         name_set.add(file)
-        try:
-            name_list.append(FileEntry(file, path))
-        except FileNotFoundError as err:
-            err_cb(str(err))
-        except Exception as err:
-            raise err
+        name_list.append(file)
 
-    return name_list
+    return statEntries(name_list, path, jobs, err_cb)
 
 
-def formatRgxRplTuple(input: list[str] | None):
+def formatRgxRplTuple(input: list[str] | None, err_cb: Err_Callback):
     if input is None:
         return None
     if len(input) != 2:
         raise NotImplementedError("Implementation does not match expected pairs")
 
     rgx, rpl = input
+    # both halves are compiled once instead of once per file
+    try:
+        rgx = re.compile(rgx)
+    except re.error as err:
+        err_cb(f"invalid REGEX for --rename-each: {err}")
     rpl = NamePattern(rpl)
 
     return rgx, rpl
@@ -111,6 +160,7 @@ def formatSrcDestList(
     root: str,
     input: list[tuple[str, str]] | None,
     use_plain: bool,
+    jobs: int,
     err_cb: Err_Callback,
 ):
     if input is None:
@@ -119,7 +169,8 @@ def formatSrcDestList(
         if not use_plain:
             err_cb(f"For --rename-pairs arguments must come in pairs.")
         input = parify(shsplit(sys.stdin.read()), err_cb)
-    out_list: list[tuple[FileEntry, NewFile | NamePattern]] = []
+    src_list: list[str] = []
+    dest_list: list[NewFile | NamePattern] = []
     if use_plain:
         src_set = set()
         dest_set = set()
@@ -139,14 +190,8 @@ def formatSrcDestList(
 
             src_set.add(src)
             dest_set.add(dest)
-            try:
-                out_list.append(
-                    (FileEntry(src, root), NewFile(os.path.join(root, dest)))
-                )
-            except FileNotFoundError as err:
-                err_cb(str(err))
-            except Exception as err:
-                raise err
+            src_list.append(src)
+            dest_list.append(NewFile(os.path.join(root, dest)))
     else:
         src_set = set()
         for src, dest in input:
@@ -159,17 +204,100 @@ def formatSrcDestList(
                 err_cb(f"{src} is a duplicate source name")
 
             src_set.add(src)
-            try:
-                out_list.append((FileEntry(src, root), NamePattern(dest)))
-            except FileNotFoundError as err:
-                err_cb(str(err))
-            except Exception as err:
-                raise err
+            src_list.append(src)
+            dest_list.append(NamePattern(dest))
 
-    return out_list
+    return list(zip(statEntries(src_list, root, jobs, err_cb), dest_list))
 
 
-def getArguments(*args: str) -> ArgsWrapper:
+def formatRules(input: list[str] | None, err_cb: Err_Callback):
+    if input is None:
+        return None
+    path = input[0]
+    try:
+        if path == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(path, "r", encoding="utf-8") as file:
+                lines = file.read().splitlines()
+    except OSError as err:
+        err_cb(f"could not read --rules: {err}")
+
+    rules: list[tuple[str, str]] = []
+    for number, line in enumerate(lines, 1):
+        try:
+            fields = shsplit(line, comments=True)
+        except ValueError as err:
+            err_cb(f"invalid rule in line {number}: {err}")
+        if not fields:
+            continue
+        if len(fields) != 2:
+            err_cb(f"line {number} must have a REGEX and a PATTERN: {line}")
+        rgx, rpl = fields
+        try:
+            re.compile(rgx)
+        except re.error as err:
+            err_cb(f"invalid REGEX in line {number}: {err}")
+        if RuleSet.BACKREFERENCE.search(rgx):
+            err_cb(f"line {number} must use named groups for backreferences: {rgx}")
+        rules.append((rgx, rpl))
+
+    if not rules:
+        err_cb("--rules does not define any rule")
+    try:
+        return RuleSet(rules)
+    except re.error as err:
+        # e.g. global flags such as (?i) that are not at the start of a rule
+        err_cb(f"rules cannot be combined: {err}")
+
+
+def getPatterns(pArgs, use_plain: bool) -> list[NamePattern] | None:
+    patterns: list[NamePattern] = []
+    if pArgs.rename_replace is not None:
+        patterns.append(pArgs.rename_replace)
+    if pArgs.rename_each is not None:
+        patterns.append(pArgs.rename_each[1])
+    if pArgs.rename_list is not None and not use_plain:
+        patterns.extend(pArgs.rename_list)
+    if pArgs.rules is not None:
+        patterns.extend(pArgs.rules.patterns)
+    if pArgs.rename_pairs is not None and not use_plain:
+        if pArgs.rename_pairs == [("-", None)]:
+            # pairs read from stdin are only known once the sources are stat'ed
+            return None
+        patterns.extend(NamePattern(dest) for _, dest in pArgs.rename_pairs)
+    return patterns
+
+
+def getStatFields(
+    sort: str, ttype: str, patterns: list[NamePattern] | None, identity: bool
+) -> tuple[set[str], bool]:
+    # returns the fields to fetch and whether they must identify files
+    # patterns of None are not known yet, so every field may be needed
+    if patterns is None:
+        return set(STAT_FIELDS), True
+    # inodes tell replaced sources apart before the schedule is executed;
+    # that check stats the sources again, so cached inodes are good enough
+    fields = {"ino", sort} & set(STAT_FIELDS)
+    if any(p.fields & TIME_FIELDS for p in patterns):
+        fields.add(ttype)
+    identity = identity or any(p.fields & HASH_FIELDS for p in patterns)
+    if identity:
+        # content digests are cached by inode, size and modification time
+        fields |= IDENTITY_FIELDS
+    return fields, identity
+
+
+def defaultHashCache():
+    cachedir = os.environ.get("XDG_CACHE_HOME")
+    if not cachedir:
+        cachedir = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cachedir, "itermv", "hashes.json")
+
+
+@cache
+def buildParser() -> ArgumentParser:
+    # the parser does not depend on the arguments so it is only built once
     parser = ArgumentParser(
         prog="itermv",
         description="Provides tools to easily rename files within a given directory.",
@@ -181,7 +309,9 @@ def getArguments(*args: str) -> ArgsWrapper:
 
     parser.register("type", "positive radix", positiveRadix)
     parser.register("type", "zero or greater", nonNegativeNumber)
+    parser.register("type", "greater than zero", positiveNumber)
     parser.register("type", "existing directory", InputPath)
+    parser.register("type", "shard", shardSpec)
 
     # DEFINE GROUPS ===========================================================
 
@@ -222,6 +352,23 @@ def getArguments(*args: str) -> ArgsWrapper:
                   any subsequent number identifies a capturing group.
 
                 - {unixt} unix time of the last modification.
+
+                - {sha1}, {sha256}, {blake2} or {crc32} hexadecimal digest of the contents of the
+                  file. Use {sha256:K} to keep only the first K characters. Digests are
+                  only computed when the pattern uses them.
+
+                - {xd} and {xt} capture date and time read from the file header (EXIF
+                  DateTimeOriginal, PNG tIME or MP4/MOV mvhd). If the header has no date
+                  the time stamp selected by --time-stamp-type is used instead.
+
+                - {w} and {h} width and height read from the file header (JPEG, TIFF, PNG,
+                  MP4/MOV). Empty when unknown.
+
+                - {dup} number of the group of duplicates the file belongs to when used
+                  with --dedupe. Empty for unique files.
+
+                - {bucket} subdirectories derived from a hash of the name of the file
+                  (see --bucket-depth and --bucket-width). Requires --fan-out.
             """
         ),
     )
@@ -269,6 +416,7 @@ def getArguments(*args: str) -> ArgsWrapper:
     )
 
     comm_exc_plain = comm_group.add_mutually_exclusive_group(required=False)
+    comm_exc_shard = comm_group.add_mutually_exclusive_group(required=False)
 
     # DEFINE FLAGS ============================================================
 
@@ -324,6 +472,55 @@ def getArguments(*args: str) -> ArgsWrapper:
         ),
         action=PairifyAction,
     )
+    repl_exc_group.add_argument(
+        "--rules",
+        nargs=1,
+        metavar="FILE",
+        help=textwrap.dedent(
+            """\
+            Renames with the ordered rules of FILE, one REGEX and PATTERN per line (quoted
+            like in a shell, # starts a comment). Each file is renamed by the first rule
+            whose REGEX it matches, every rule numbers its own files, and files that match
+            no rule are not selected. Use - to read the rules from stdin.
+            """
+        ),
+    )
+    repl_exc_group.add_argument(
+        "--apply-plan",
+        nargs=1,
+        metavar="FILE",
+        help=textwrap.dedent(
+            """\
+            Executes a plan written by --save-plan. Every source is verified against the
+            fingerprint taken when the plan was made, and selection, sorting and pattern
+            expansion are skipped entirely.
+            """
+        ),
+    )
+    repl_exc_group.add_argument(
+        "--recover",
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Finishes the staged runs that were interrupted in SOURCE directory. Runs that
+            staged every file are rolled forward and the rest are rolled back.
+            """
+        ),
+    )
+
+    repl_group.add_argument(
+        "--max-replacements",
+        nargs=1,
+        default=0,
+        metavar="NUMBER",
+        help=textwrap.dedent(
+            """\
+            Maximum number of matches replaced in each name by --rename-each (0 is default
+            and replaces every match).
+            """
+        ),
+        type="zero or greater",
+    )
 
     slct_exc_group.add_argument(
         "-R",
@@ -345,6 +542,20 @@ def getArguments(*args: str) -> ArgsWrapper:
         ),
     )
 
+    slct_group.add_argument(
+        "--dedupe",
+        nargs=1,
+        default=None,
+        choices=[ArgsWrapper.DEDUPE_REPORT, ArgsWrapper.DEDUPE_EXCLUDE],
+        help=textwrap.dedent(
+            """\
+            Detects selected files with identical contents and prints a report of them.
+            If exclude is used, only the first file of each group (after sorting) is
+            renamed. Files are compared by size first, then by a small prefix and only
+            then by their full contents.
+            """
+        ),
+    )
     sort_group.add_argument(
         "-s",
         "--sort",
@@ -359,6 +570,42 @@ def getArguments(*args: str) -> ArgsWrapper:
         action="store_true",
         help="If present sorting is reversed.",
     )
+    sort_group.add_argument(
+        "--limit",
+        nargs=1,
+        default=None,
+        metavar="K",
+        help=textwrap.dedent(
+            """\
+            Only the first K files after sorting are renamed. Only the selected files are
+            expanded and validated, so {n0} is padded according to K.
+            """
+        ),
+        type="zero or greater",
+    )
+    sort_group.add_argument(
+        "--skip",
+        nargs=1,
+        default=0,
+        metavar="M",
+        help="Skips the first M files after sorting (0 is default).",
+        type="zero or greater",
+    )
+    sort_group.add_argument(
+        "--shard",
+        nargs=1,
+        default=None,
+        metavar="I/N",
+        help=textwrap.dedent(
+            """\
+            Splits the sorted selection into N contiguous shards and only renames shard I
+            (starting at 1). Every shard numbers its files as if the whole selection was
+            renamed at once, and collisions between shards are reported by all of them
+            before anything is renamed.
+            """
+        ),
+        type="shard",
+    )
 
     verb_group.add_argument(
         "-v",
@@ -392,7 +639,8 @@ def getArguments(*args: str) -> ArgsWrapper:
         "-i",
         "--source-dir",
         nargs=1,
-        default=os.getcwd(),
+        # resolved when parsing so that a cached parser follows the working directory
+        default=os.curdir,
         metavar="SOURCE_DIR",
         help="source directory. If ommited the current working directory will be used.",
         type="existing directory",
@@ -418,6 +666,66 @@ def getArguments(*args: str) -> ArgsWrapper:
         action="store_true",
         help="Allow and automatically resolve collisions with existing names.",
     )
+    comm_group.add_argument(
+        "--copy",
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Copies every file to its new name and keeps the original. Files are copied in
+            parallel (see --io-jobs) and their metadata is preserved.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--reflink",
+        nargs=1,
+        default=REFLINK_AUTO,
+        choices=REFLINK_OPTIONS,
+        help=textwrap.dedent(
+            """\
+            Whether --copy clones files with reflinks (auto is default). auto falls back to
+            a kernel side copy when the file system does not support them, always fails
+            instead and never skips them.
+            """
+        ),
+    )
+    comm_exc_shard.add_argument(
+        "--fan-out",
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Allows destinations to include subdirectories of SOURCE_DIR such as
+            {d}/{name}{ext} or {sha1:2}/{sha1:4}/{name}{ext}. Missing directories are
+            created before files are moved into them.
+            """
+        ),
+    )
+    comm_exc_shard.add_argument(
+        "--fan-in",
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Selects files from every subdirectory of SOURCE_DIR and moves them back into
+            it. Directories left empty are removed afterwards.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--bucket-depth",
+        nargs=1,
+        default=2,
+        metavar="NUMBER",
+        help="Number of directory levels produced by {bucket} (2 is default).",
+        type="greater than zero",
+    )
+    comm_group.add_argument(
+        "--bucket-width",
+        nargs=1,
+        default=2,
+        metavar="NUMBER",
+        help="Number of hexadecimal digits per {bucket} level (2 is default).",
+        type="greater than zero",
+    )
     comm_group.add_argument(
         "-F",
         "--include-self",
@@ -455,6 +763,105 @@ def getArguments(*args: str) -> ArgsWrapper:
         help="Specifies the radix of the counting (10 is default).",
         type="positive radix",
     )
+    comm_group.add_argument(
+        "--io-jobs",
+        nargs=1,
+        default=DEFAULT_IO_JOBS,
+        metavar="NUMBER",
+        help=textwrap.dedent(
+            f"""\
+            Maximum number of files read or stat'ed concurrently ({DEFAULT_IO_JOBS} is
+            default). Applies to --file-list, --rename-pairs, content digests, header
+            fields, --dedupe and staged renames (see --strategy).
+            """
+        ),
+        type="greater than zero",
+    )
+    comm_group.add_argument(
+        "--strategy",
+        nargs=1,
+        default=STRATEGY_AUTO,
+        choices=STRATEGY_OPTIONS,
+        help=textwrap.dedent(
+            """\
+            How renames are executed (auto is default). serial follows the schedule in
+            order. staged moves every file into a hidden staging directory and then to
+            its new name, both phases with --io-jobs renames in flight and journaled so
+            that --recover can finish an interrupted run. auto times the first renames
+            and stages the rest when the storage is slow, unless --io-jobs is 1.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--cpu-jobs",
+        nargs=1,
+        default=1,
+        metavar="NUMBER",
+        help=textwrap.dedent(
+            """\
+            Number of processes that evaluate patterns (1 is default). The sorted files
+            are split into contiguous chunks that are expanded in parallel and merged
+            back in order, which pays off for large selections and complex patterns.
+            """
+        ),
+        type="greater than zero",
+    )
+    comm_group.add_argument(
+        "--max-ops-per-sec",
+        nargs=1,
+        default=None,
+        metavar="NUMBER",
+        help=textwrap.dedent(
+            """\
+            Limits renames or copies to NUMBER operations per second, whether they run
+            one at a time or in parallel.
+            """
+        ),
+        type="greater than zero",
+    )
+    comm_group.add_argument(
+        "--target-latency",
+        nargs=1,
+        default=None,
+        metavar="MS",
+        help=textwrap.dedent(
+            """\
+            Adapts the rate of operations to the storage: the rate is halved while the
+            average latency of an operation exceeds MS milliseconds and slowly recovers
+            (up to --max-ops-per-sec if present) once it drops below it.
+            """
+        ),
+        type="greater than zero",
+    )
+    comm_group.add_argument(
+        "--cached-stat",
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Lets network and FUSE file systems answer metadata requests from cached
+            attributes (AT_STATX_DONT_SYNC) instead of revalidating every file. Ignored
+            when inodes, sizes and modification times must identify files (content
+            fields, --dedupe and --save-plan).
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--hash-cache",
+        nargs=1,
+        default=defaultHashCache(),
+        metavar="FILE",
+        help=textwrap.dedent(
+            """\
+            File where content digests are cached between runs. Entries are keyed by the
+            device, inode, size and modification time of each file.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--no-hash-cache",
+        action="store_true",
+        help="Content digests are neither read from nor written to the cache.",
+    )
     comm_exc_plain.add_argument(
         "-N",
         "--no-plain-text",
@@ -472,6 +879,84 @@ def getArguments(*args: str) -> ArgsWrapper:
         action="store_true",
         help="If present all prompts are skipped.",
     )
+    comm_group.add_argument(
+        "--client",
+        nargs=1,
+        default=None,
+        metavar="SOCKET",
+        help=textwrap.dedent(
+            """\
+            Sends the job to a daemon started with itermv serve --socket SOCKET, which
+            keeps directory scans warm between jobs. Prompts are still answered here.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--save-plan",
+        nargs=1,
+        default=None,
+        metavar="FILE",
+        help=textwrap.dedent(
+            """\
+            Writes the computed schedule and a fingerprint (inode, size and modification
+            time) of every source into FILE. Combine it with --dry-run to review a plan
+            before running it with --apply-plan.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--progress",
+        nargs="?",
+        default=None,
+        const=ProgressReporter.FORMAT_TEXT,
+        choices=ProgressReporter.OPTIONS,
+        help=textwrap.dedent(
+            """\
+            Reports items done, items per second and an ETA while scanning, expanding
+            and renaming or copying. Text progress is only drawn when stderr is a
+            terminal. Use --progress=json for periodic lines of JSON instead.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--profile",
+        nargs="?",
+        default=None,
+        const=PhaseProfiler.FORMAT_TEXT,
+        choices=PhaseProfiler.OPTIONS,
+        help=textwrap.dedent(
+            """\
+            Prints wall and CPU time per phase, the number of calls of each file system
+            operation, entries per second and peak memory to stderr. Use --profile=json for a
+            single line of JSON.
+            """
+        ),
+    )
+    comm_group.add_argument(
+        "--profile-dump",
+        nargs=1,
+        default=None,
+        metavar="DIR",
+        help="Writes a cProfile dump of each phase into DIR (requires --profile).",
+    )
+
+    return parser
+
+
+def readsStdin(*args: str) -> bool:
+    # the same values that make the options below read stdin
+    pArgs = buildParser().parse_args(list(args))
+    use_plain = not pArgs.no_plain_text
+    return (
+        pArgs.file_list == ["-"]
+        or (use_plain and pArgs.rename_list == ["-"])
+        or pArgs.rename_pairs == [("-", None)]
+        or pArgs.rules == ["-"]
+    )
+
+
+def getArguments(*args: str) -> ArgsWrapper:
+    parser = buildParser()
 
     # WRAP NAMESPACES =========================================================
 
@@ -482,6 +967,8 @@ def getArguments(*args: str) -> ArgsWrapper:
 
     opt_none = lambda x: x[0] if x is not None else None
     opt_def = lambda x: x[0] if type(x) == list else x
+    # paths are made absolute so they do not depend on the working directory later
+    opt_abspath = lambda x: os.path.abspath(x[0]) if x is not None else None
 
     src_dir: InputPath = opt_def(pArgs.source_dir)
     use_plain: bool = not pArgs.no_plain_text
@@ -489,20 +976,38 @@ def getArguments(*args: str) -> ArgsWrapper:
     setattr(pArgs, "arg_error", parser.error)
     pArgs.rename_replace = opt_none(pArgs.rename_replace)  # -> NamePattern | None
     pArgs.rename_each = formatRgxRplTuple(
-        pArgs.rename_each
-    )  # -> tuple[str, str] | None
+        pArgs.rename_each, parser.error
+    )  # -> tuple[re.Pattern, NamePattern] | None
+    pArgs.max_replacements = opt_def(pArgs.max_replacements)  # -> int >= 0
     pArgs.rename_list = formatDestList(
         src_dir.path, pArgs.rename_list, use_plain, parser.error
     )
+    pArgs.io_jobs = opt_def(pArgs.io_jobs)  # -> int > 0
+    pArgs.rules = formatRules(pArgs.rules, parser.error)  # -> RuleSet | None
+    if pArgs.rules is not None and pArgs.shard is not None:
+        parser.error("--shard cannot number the files of each rule on its own")
+    # cached_stat   # -> bool
+    fields, identity = getStatFields(
+        opt_def(pArgs.sort),
+        opt_def(pArgs.time_stamp_type),
+        getPatterns(pArgs, use_plain),
+        pArgs.dedupe is not None or pArgs.save_plan is not None,
+    )
+    statFetcher.configure(fields, pArgs.cached_stat and not identity)
     pArgs.rename_pairs = formatSrcDestList(
-        src_dir.path, pArgs.rename_pairs, use_plain, parser.error
+        src_dir.path, pArgs.rename_pairs, use_plain, pArgs.io_jobs, parser.error
     )
+    pArgs.apply_plan = opt_abspath(pArgs.apply_plan)  # -> str | None
     pArgs.regex = opt_none(pArgs.regex)  # -> str | None
     pArgs.file_list = getInputList(
-        src_dir.path, pArgs.file_list, parser.error
+        src_dir.path, pArgs.file_list, pArgs.io_jobs, parser.error
     )  # -> list[FileEntry] | None
+    pArgs.dedupe = opt_none(pArgs.dedupe)  # -> str | None
     pArgs.sort = SortingOptions(opt_def(pArgs.sort))
     # reverse_sort    # -> bool
+    pArgs.limit = opt_none(pArgs.limit)  # -> int >= 0 | None
+    pArgs.skip = opt_def(pArgs.skip)  # -> int >= 0
+    pArgs.shard = opt_none(pArgs.shard)  # -> tuple[int, int] | None
     # verbose         # -> bool
     # verbose_summary # -> bool
     # verbose_export  # -> bool
@@ -510,13 +1015,38 @@ def getArguments(*args: str) -> ArgsWrapper:
     pArgs.start_number = opt_def(pArgs.start_number)  # -> int >= 0
     # dry_run      # -> bool
     # overlap      # -> bool
+    # copy         # -> bool
+    pArgs.reflink = opt_def(pArgs.reflink)  # -> str
+    if pArgs.copy and pArgs.overlap:
+        parser.error("--copy keeps every source so it cannot be used with --overlap")
+    # fan_out      # -> bool
+    # fan_in       # -> bool
+    pArgs.bucket_depth = opt_def(pArgs.bucket_depth)  # -> int > 0
+    pArgs.bucket_width = opt_def(pArgs.bucket_width)  # -> int > 0
+    if pArgs.bucket_depth * pArgs.bucket_width > MAX_BUCKET_DIGITS:
+        parser.error(f"--bucket-depth times --bucket-width exceeds {MAX_BUCKET_DIGITS}")
     # include_self # -> bool
     # exclude_dir  # -> bool
     pArgs.time_stamp_type = TimeStampType(opt_def(pArgs.time_stamp_type))
     pArgs.time_separator = opt_def(pArgs.time_separator)  # -> str
     pArgs.radix = opt_def(pArgs.radix)  # -> int > 0
+    pArgs.cpu_jobs = opt_def(pArgs.cpu_jobs)  # -> int > 0
+    pArgs.strategy = opt_def(pArgs.strategy)  # -> str
+    # recover       # -> bool
+    pArgs.max_ops_per_sec = opt_none(pArgs.max_ops_per_sec)  # -> int > 0 | None
+    pArgs.target_latency = opt_none(pArgs.target_latency)  # -> int > 0 | None
+    pArgs.hash_cache = HashCache(
+        None if pArgs.no_hash_cache else opt_def(pArgs.hash_cache)
+    )  # -> HashCache
+    # no_hash_cache # -> bool
     # no_plain_text # -> bool
     # use_stdin     # -> bool
     # quiet         # -> bool
+    pArgs.save_plan = opt_abspath(pArgs.save_plan)  # -> str | None
+    # progress      # -> str | None
+    # profile       # -> str | None
+    pArgs.profile_dump = opt_abspath(pArgs.profile_dump)  # -> str | None
+    if pArgs.profile_dump is not None and pArgs.profile is None:
+        parser.error("--profile-dump requires --profile")
 
     return ArgsWrapper(pArgs)
@@ -0,0 +1,203 @@
+from itermv.components import (
+    ArgsWrapper,
+    FileEntry,
+    NewFile,
+    ScanIndex,
+    fileSystem,
+)
+
+import os
+from collections.abc import Callable
+
+TaskList = list[tuple[FileEntry, NewFile]]
+Planner = Callable[[TaskList], list[tuple[str, str]] | None]
+
+
+class PlanSnapshot:
+    # what the schedule assumed about every directory it touches
+    def __init__(
+        self, included: TaskList, schedule: list[tuple[str, str]], started_ns: int
+    ) -> None:
+        self.included = included
+        self.inodes = {f.path: f.inode for f, _ in included}
+        self.targets = {o.path for _, o in included}
+        names = self.inodes.keys() | self.targets
+        # names only used by the schedule are temporary names of cycles
+        self.temps = {p for step in schedule for p in step if p not in names}
+        self.directories: dict[str, int | None] = {}
+        self.racy: set[str] = set()
+        racy_ns = started_ns - ScanIndex.RACY_WINDOW_NS
+
+        for path in names | self.temps:
+            folder = os.path.dirname(path)
+            if folder in self.directories:
+                continue
+            try:
+                mtime_ns = fileSystem.stat(folder, {"mtime"}).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            # a directory modified while planning may change again in the same tick
+            if mtime_ns is not None and mtime_ns >= racy_ns:
+                self.racy.add(folder)
+            self.directories[folder] = mtime_ns
+
+
+class PlanChanges:
+    def __init__(self) -> None:
+        self.removed: set[str] = set()
+        self.replaced: set[str] = set()
+        self.occupied: set[str] = set()
+
+    def __bool__(self) -> bool:
+        return bool(self.removed or self.replaced or self.occupied)
+
+
+def detectChanges(snapshot: PlanSnapshot) -> PlanChanges:
+    changes = PlanChanges()
+    changed: set[str] = set()
+    modified: set[str] = set()
+    # folders that cannot hold files anymore, e.g. replaced by a regular file
+    blocked: set[str] = set()
+    for folder, mtime_ns in snapshot.directories.items():
+        try:
+            current = fileSystem.stat(folder, {"mtime"}).st_mtime_ns
+        except FileNotFoundError:
+            current = None
+        except OSError:
+            current = None
+            blocked.add(folder)
+        # renames, creations and deletions all bump the mtime of the directory
+        if current != mtime_ns:
+            modified.add(folder)
+        if current != mtime_ns or folder in snapshot.racy or folder in blocked:
+            changed.add(folder)
+    if not changed:
+        return changes
+
+    listings: dict[str, set[str]] = {}
+    for folder in changed - blocked:
+        try:
+            listings[folder] = set(fileSystem.listdir(folder))
+        except FileNotFoundError:
+            listings[folder] = set()
+        except OSError:
+            blocked.add(folder)
+    for folder in blocked:
+        listings[folder] = set()
+    isListed = lambda path: os.path.basename(path) in listings[os.path.dirname(path)]
+    isChanged = lambda path: os.path.dirname(path) in changed
+
+    for source, inode in snapshot.inodes.items():
+        if not isChanged(source):
+            continue
+        if not isListed(source):
+            changes.removed.add(source)
+            continue
+        # racy directories are listed again but files are only stat'ed
+        # when the directory really changed
+        if os.path.dirname(source) not in modified:
+            continue
+        try:
+            if fileSystem.stat(source, {"ino"}).st_ino != inode:
+                changes.replaced.add(source)
+        except OSError:
+            changes.removed.add(source)
+
+    for target in snapshot.targets | snapshot.temps:
+        if target in snapshot.inodes or not isChanged(target):
+            continue
+        if isListed(target) or os.path.dirname(target) in blocked:
+            changes.occupied.add(target)
+
+    return changes
+
+
+def getComponents(
+    included: TaskList, schedule: list[tuple[str, str]]
+) -> dict[str, str]:
+    # renames that share a name belong to the same chain or cycle, and a
+    # cycle that borrows the freed name of a chain as its temporary name
+    # belongs to the same component as that chain
+    parents: dict[str, str] = {}
+
+    def find(name: str) -> str:
+        root = parents.setdefault(name, name)
+        while root != parents[root]:
+            root = parents[root]
+        while parents[name] != root:
+            parents[name], name = root, parents[name]
+        return root
+
+    for f, o in included:
+        parents[find(f.path)] = find(o.path)
+    for source, target in schedule:
+        parents[find(source)] = find(target)
+    return {name: find(name) for name in parents}
+
+
+def replanSchedule(
+    snapshot: PlanSnapshot,
+    schedule: list[tuple[str, str]],
+    changes: PlanChanges,
+    planner: Planner,
+) -> tuple[list[tuple[str, str]], list[tuple[FileEntry, NewFile]], int, int]:
+    included = snapshot.included
+    sourceOf = {o.path: f.path for f, o in included}
+    targetOf = {f.path: o.path for f, o in included}
+
+    # a source stays in place when its target is taken, which in turn
+    # keeps the source that was going to take its name
+    staying: set[str] = set()
+    pending = list(changes.replaced)
+    pending += [s for s, t in targetOf.items() if t in changes.occupied]
+    while pending:
+        source = pending.pop()
+        if source in staying or source in changes.removed:
+            continue
+        staying.add(source)
+        if source in sourceOf:
+            pending.append(sourceOf[source])
+
+    dropped = staying | changes.removed
+    components = getComponents(included, schedule)
+    affected = {components[s] for s in dropped}
+    # a taken temporary name breaks every cycle that goes through it
+    affected.update(components[p] for p in changes.occupied if p in components)
+
+    kept = [step for step in schedule if components[step[0]] not in affected]
+    survivors = [
+        (f, o)
+        for f, o in included
+        if components[f.path] in affected and f.path not in dropped
+    ]
+    replanned = (planner(survivors) or []) if survivors else []
+    skipped = [(f, o) for f, o in included if f.path in dropped]
+    # chains left without a single survivor are dropped instead of re-planned
+    chains = len({components[f.path] for f, _ in survivors})
+    return kept + replanned, skipped, chains, len(affected) - chains
+
+
+def printChanges(
+    changes: PlanChanges,
+    skipped: list[tuple[FileEntry, NewFile]],
+    replanned: int,
+    dropped: int,
+    args: ArgsWrapper,
+):
+    if args.verbose_export:
+        return
+    print("Files changed since the schedule was made:")
+    if changes.removed:
+        print(f"    {len(changes.removed)} sources no longer exist")
+    if changes.replaced:
+        print(f"    {len(changes.replaced)} sources were replaced by other files")
+    if changes.occupied:
+        print(f"    {len(changes.occupied)} destinations were taken by new files")
+    print(
+        f"{len(skipped)} files are skipped, {replanned} chains were re-planned "
+        f"and {dropped} chains were dropped."
+    )
+    if args.verbose and skipped:
+        spath = args.source_dir.path
+        names = [(os.path.relpath(f.path, spath), o.name) for f, o in skipped]
+        print("\n".join(f"    skipped {a} -> {b}" for a, b in names))
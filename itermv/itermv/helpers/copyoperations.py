@@ -0,0 +1,178 @@
+from itermv.components import Throttle, fileSystem, profiler, progress
+
+import os
+import sys
+import time
+import errno
+import shutil
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+REFLINK_AUTO = "auto"
+REFLINK_ALWAYS = "always"
+REFLINK_NEVER = "never"
+REFLINK_OPTIONS = [REFLINK_AUTO, REFLINK_ALWAYS, REFLINK_NEVER]
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1 << 30
+# errors that mean the kernel cannot do this copy, not that it failed
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+}
+
+
+class CopyStats:
+    def __init__(self) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.reflinks = 0
+        self.seconds = 0.0
+        self.__lock = Lock()
+
+    def add(self, size: int, reflinked: bool):
+        with self.__lock:
+            self.files += 1
+            self.bytes += size
+            self.reflinks += reflinked
+
+    @property
+    def throughput(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+def cloneFile(srcfd: int, dstfd: int) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        fcntl.ioctl(dstfd, FICLONE, srcfd)
+        return True
+    except OSError as err:
+        if err.errno in UNSUPPORTED_ERRNOS:
+            return False
+        raise err
+
+
+def kernelCopy(srcfd: int, dstfd: int, size: int):
+    # copy_file_range and sendfile keep the data inside the kernel
+    offset = 0
+    for copier in ("copy_file_range", "sendfile"):
+        if not hasattr(os, copier):
+            continue
+        try:
+            while offset < size:
+                if copier == "copy_file_range":
+                    count = os.copy_file_range(srcfd, dstfd, COPY_CHUNK_SIZE)
+                else:
+                    count = os.sendfile(dstfd, srcfd, offset, COPY_CHUNK_SIZE)
+                if count == 0:
+                    break
+                offset += count
+        except OSError as err:
+            if err.errno not in UNSUPPORTED_ERRNOS or offset > 0:
+                raise err
+            continue
+        if offset >= size:
+            return
+        # some file systems return 0 before the end, the rest is read here
+        break
+
+    os.lseek(srcfd, offset, os.SEEK_SET)
+    os.lseek(dstfd, offset, os.SEEK_SET)
+    with os.fdopen(srcfd, "rb", closefd=False) as src:
+        with os.fdopen(dstfd, "wb", closefd=False) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def copyFile(source: str, target: str, reflink: str, stats: CopyStats) -> str:
+    with open(source, "rb") as src:
+        srcfd = src.fileno()
+        size = os.fstat(srcfd).st_size
+        # O_EXCL guarantees an existing file is never overwritten
+        dstfd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            reflinked = reflink != REFLINK_NEVER and cloneFile(srcfd, dstfd)
+            if not reflinked and reflink == REFLINK_ALWAYS:
+                raise OSError(errno.EOPNOTSUPP, "reflinks are not supported", source)
+            if not reflinked:
+                kernelCopy(srcfd, dstfd, size)
+        except BaseException as err:
+            os.close(dstfd)
+            os.remove(target)
+            raise err
+        os.close(dstfd)
+
+    shutil.copystat(source, target)
+    stats.add(size, reflinked)
+    return target
+
+
+def copyEntry(
+    source: str, target: str, reflink: str, stats: CopyStats, throttle: Throttle
+):
+    profiler.count("copy")
+    with throttle.operation():
+        if fileSystem.isdir(source):
+            copier = lambda src, dst: copyFile(src, dst, reflink, stats)
+            shutil.copytree(source, target, copy_function=copier)
+        else:
+            copyFile(source, target, reflink, stats)
+
+
+def copyBySchedule(
+    schedule: list[tuple[str, str]],
+    reflink: str = REFLINK_AUTO,
+    jobs: int = 1,
+    throttle: Throttle | None = None,
+):
+    tasklog: list[tuple[str, str]] = []
+    stats = CopyStats()
+    start = time.perf_counter()
+    throttle = Throttle() if throttle is None else throttle
+    copy = lambda source, target: copyEntry(source, target, reflink, stats, throttle)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        tasks = {
+            pool.submit(copy, source, target): (source, target)
+            for source, target in schedule
+        }
+        # completions are counted here so workers never share the reporter
+        with progress.task("copy", len(tasks)) as copying:
+            for task in as_completed(tasks):
+                copying.advance()
+                if task.exception() is not None:
+                    for pending in tasks:
+                        pending.cancel()
+                    break
+        wait(tasks)
+        failed = False
+        for task in tasks:
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                failed = True
+                print(f"Copy failed: {task.exception()}", file=sys.stderr)
+            else:
+                tasklog.append(tasks[task])
+
+    stats.seconds = time.perf_counter() - start
+    return (not failed, tasklog, stats)
+
+
+def undoCopies(tasklog: list[tuple[str, str]]):
+    try:
+        for _, target in reversed(tasklog):
+            if fileSystem.isdir(target) and not fileSystem.islink(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+    except Exception as ex:
+        print("Fatal error: undo failed.", file=sys.stderr)
+        raise ex
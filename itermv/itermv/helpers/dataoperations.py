@@ -4,14 +4,33 @@ from itermv.components import (
     FileEntry,
     NewFile,
     RadixCounter,
+    RuleSet,
+    SortingOptions,
+    fileSystem,
+    profiler,
+    progress,
+    Throttle,
     TimeStampType,
     NamePattern,
 )
-from itermv.utils import isTopLevelPath
+from itermv.helpers.copyoperations import CopyStats
+from itermv.helpers.hashoperations import (
+    HASH_FIELDS,
+    findDuplicates,
+    getHashEntries,
+)
+from itermv.helpers.metaoperations import META_FIELDS, getMetaEntries
+from itermv.utils import isTopLevelPath, isWithinPath, validateFilename
 
 import os
 import re
+import heapq
+import bisect
+import hashlib
 import datetime
+from array import array
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any
 from collections.abc import Callable
 
@@ -40,12 +59,15 @@ def printSchedule(
     schedule: list[tuple[str, str]],
     ignored: list[tuple[str, str]],
     args: ArgsWrapper,
+    root: str | None = None,
 ):
-    schedule = [(os.path.basename(a), os.path.basename(b)) for a, b in schedule]
-    ignored = [(os.path.basename(a), os.path.basename(b)) for a, b in ignored]
+    root = args.source_dir.path if root is None else root
+    relpaths = lambda a, b: (os.path.relpath(a, root), os.path.relpath(b, root))
+    schedule = [relpaths(a, b) for a, b in schedule]
+    ignored = [relpaths(a, b) for a, b in ignored]
     if args.verbose or args.verbose_summary:
         rowLimit = 10 if args.verbose_summary else 0
-        print(f"Common directory is: {args.source_dir.path}\n")
+        print(f"Common directory is: {root}\n")
         if ignored:
             print("These files will be ignored:")
             print("\n".join(f"    {r}" for r in getRows(ignored, rowLimit)))
@@ -54,12 +76,29 @@ def printSchedule(
     elif args.verbose_export:
         print("\n".join(f"{a} {b}" for a, b in schedule))
     else:
-        msg = f"{len(schedule)} files will be changed"
+        action = "copied" if args.copy else "changed"
+        msg = f"{len(schedule)} files will be {action}"
         if ignored:
             msg += f" and {len(ignored)} files will be ignored."
         print(msg)
 
 
+def printDuplicates(duplicates: list[list[FileEntry]], args: ArgsWrapper):
+    if args.dedupe is None or args.verbose_export:
+        return
+    if not duplicates:
+        print("No duplicate files were found.")
+        return
+
+    count = sum(len(group) - 1 for group in duplicates)
+    print(f"{len(duplicates)} groups of duplicate files were found:")
+    for i, group in enumerate(duplicates, 1):
+        print(f"    [{i}] " + " = ".join(f.name for f in group))
+    if args.dedupe == ArgsWrapper.DEDUPE_EXCLUDE:
+        print(f"{count} duplicates will be excluded from the schedule.")
+    print()
+
+
 def getRows(items: list[tuple[str, str]], rowLimit=0):
     lines = []
     colSize = [0, 0]
@@ -75,6 +114,29 @@ def getRows(items: list[tuple[str, str]], rowLimit=0):
     return lines
 
 
+def printCopyStats(stats: CopyStats, args: ArgsWrapper):
+    if args.verbose_export:
+        return
+    mib = stats.bytes / (1 << 20)
+    rate = stats.throughput / (1 << 20)
+    msg = f"Copied {stats.files} files ({mib:.1f} MiB) in {stats.seconds:.2f}s"
+    msg += f" at {rate:.1f} MiB/s"
+    if stats.reflinks:
+        msg += f", {stats.reflinks} of them as reflinks"
+    print(msg + ".")
+
+
+def printThrottleStats(throttle: Throttle, args: ArgsWrapper):
+    if args.verbose_export or not throttle.enabled:
+        return
+    msg = f"Achieved {throttle.achieved:.1f} operations/s"
+    msg += f" over {throttle.ops} operations"
+    if throttle.adaptive and throttle.latency is not None:
+        msg += f", average latency {throttle.latency * 1000:.1f} ms"
+        msg += f", backed off {throttle.backoffs} times"
+    print(msg + ".")
+
+
 def printOutro(
     schedule: list[tuple[str, str]],
     ignored: list[tuple[str, str]],
@@ -96,10 +158,13 @@ def printOutro(
         print("Dry Run END --")
 
 
-def getTimeFormats(file: FileEntry, ttype: TimeStampType, separator: str):
-    entries = {}
-    sep = separator
+# entries per chunk handed to a worker process
+MIN_CHUNK_SIZE = 2048
+CHUNKS_PER_JOB = 4
+TIME_FIELDS = {"unixt", "d", "t", "tu", "tm", "tc", "xd", "xt"}
 
+
+def getTimeStamp(file: FileEntry, ttype: TimeStampType) -> float:
     unixstamp = None
     if ttype.byAccessDate():
         unixstamp = file.atime
@@ -107,6 +172,16 @@ def getTimeFormats(file: FileEntry, ttype: TimeStampType, separator: str):
         unixstamp = file.mtime
     if ttype.byMetaDate():
         unixstamp = file.ctime
+    if ttype.byBirthDate():
+        unixstamp = file.btime
+        if unixstamp is None:
+            raise ExpansionError(f"birth time is not recorded for {file.path}")
+    return unixstamp
+
+
+def getTimeFormats(unixstamp: float, separator: str):
+    entries = {}
+    sep = separator
 
     filetime = datetime.datetime.fromtimestamp(unixstamp)
     xsec = filetime.microsecond
@@ -133,7 +208,7 @@ def internalCollisions(ifiles: list[str], ofiles: list[str]):
 def externalCollisions(ofiles: list[NewFile], innerset: set[FileEntry]):
     outSet = set()
     for file in ofiles:
-        if os.path.exists(file.path) and file.path not in innerset:
+        if fileSystem.exists(file.path) and file.path not in innerset:
             outSet.add(file.name)
 
     return outSet
@@ -150,34 +225,158 @@ def getRepeats(files: list, getname: Callable[[Any], str]):
     return rset
 
 
-def inlineReplacer(pattern: NamePattern, **options):
-    def inrepl(match: re.Match):
-        matches = [match.group(0)]
-        matches.extend(match.groups())
-        matches = [m if m is not None else "" for m in matches]
-        return pattern.evalPattern(*matches, **options)
+def getBucket(name: str, args: ArgsWrapper) -> str:
+    # buckets depend only on the name so they are stable across runs
+    digest = hashlib.blake2b(name.encode(), digest_size=16).hexdigest()
+    width = args.bucket_width
+    levels = [digest[i * width : (i + 1) * width] for i in range(args.bucket_depth)]
+    return "/".join(levels)
 
-    return inrepl
 
+def getDestination(spath: str, destName: str, args: ArgsWrapper) -> NewFile:
+    if not args.fan_out:
+        if not isTopLevelPath(spath, destName):
+            args.arg_error("Destination must also result in a top level path")
+        return NewFile(os.path.join(spath, os.path.basename(destName)))
 
-def expandPatterns(
-    entries: list[tuple[FileEntry, NamePattern]],
-    regex: str | None,
-    args: ArgsWrapper,
-    useRepl: bool,
+    if not isWithinPath(spath, destName):
+        args.arg_error(f"Destination must remain inside the source path: {destName}")
+    destPath = os.path.normpath(os.path.join(spath, destName))
+    buckets = os.path.relpath(os.path.dirname(destPath), spath)
+    if buckets != ".":
+        for bucket in buckets.split(os.sep):
+            validateFilename(bucket)
+    return NewFile(destPath)
+
+
+class InlineReplacer:
+    # a single callable is reused for every file instead of a new closure
+    def __init__(self, pattern: NamePattern) -> None:
+        self.__pattern = pattern
+        self.options: dict[str, Any] = {}
+
+    def __call__(self, match: re.Match) -> str:
+        return self.__pattern.evalPattern(
+            match.group(0), *match.groups(""), **self.options
+        )
+
+
+def getContentEntries(
+    entries: list[tuple[FileEntry, NamePattern]], args: ArgsWrapper
 ):
+    # contents are only read for files whose pattern references them
+    files = [f for f, _ in entries]
+    algos = [pattern.fields & HASH_FIELDS for _, pattern in entries]
+    metas = [bool(pattern.fields & META_FIELDS) for _, pattern in entries]
+    contents: list[dict[str, Any]] = [{} for _ in entries]
+
+    if any(algos):
+        try:
+            hashes = getHashEntries(files, algos, args.hash_cache, args.io_jobs)
+        except (IsADirectoryError, PermissionError) as err:
+            args.arg_error(str(err))
+        for entry, digests in zip(contents, hashes):
+            entry.update(digests)
+
+    if any(metas):
+        headers = getMetaEntries(files, metas, args.time_separator, args.io_jobs)
+        for entry, header in zip(contents, headers):
+            entry.update(header)
+
+    return contents
+
+
+class ExpansionError(Exception):
+    pass
+
+
+class ExpandOptions:
+    # the subset of the arguments that expansion needs, without the parser
+    def __init__(
+        self, args: ArgsWrapper, regex: re.Pattern | None, useRepl: bool, total: int
+    ) -> None:
+        largestNum = RadixCounter(args.radix, args.start_number + total)
+        self.spath = args.source_dir.path
+        self.radix = args.radix
+        self.padsize = len(largestNum.str())
+        self.max_replacements = args.max_replacements
+        self.time_separator = args.time_separator
+        self.fan_out = args.fan_out
+        self.bucket_depth = args.bucket_depth
+        self.bucket_width = args.bucket_width
+        self.regex = regex
+        self.use_repl = useRepl
+
+    def arg_error(self, message: str):
+        raise ExpansionError(message)
+
+
+class EntryChunk:
+    # compact columns are much cheaper to send to a worker than FileEntry objects
+    def __init__(
+        self,
+        entries: list[tuple[FileEntry, NamePattern]],
+        markers: dict[str, str],
+        contents: list[dict[str, Any]],
+        ttype: TimeStampType,
+    ) -> None:
+        # parents and patterns are stored once and referenced by index
+        parents: dict[str, int] = {}
+        patterns: dict[NamePattern, int] = {}
+        getId = lambda ids, key: ids.setdefault(key, len(ids))
+        self.names = [f.name for f, _ in entries]
+        self.parentIds = array("I", (getId(parents, f.parent) for f, _ in entries))
+        self.patternIds = array("I", (getId(patterns, p) for _, p in entries))
+        self.parents = list(parents)
+        self.patterns = list(patterns)
+        self.stamps = None
+        self.markers = None
+        self.contents = contents if any(contents) else None
+
+        if any(p.fields & TIME_FIELDS for p in self.patterns):
+            self.stamps = array("d", (getTimeStamp(f, ttype) for f, _ in entries))
+        if markers:
+            self.markers = [markers.get(f.path, "") for f, _ in entries]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def slice(self, start: int, end: int) -> "EntryChunk":
+        chunk = object.__new__(EntryChunk)
+        chunk.names = self.names[start:end]
+        chunk.parentIds = self.parentIds[start:end]
+        chunk.patternIds = self.patternIds[start:end]
+        chunk.parents = self.parents
+        chunk.patterns = self.patterns
+        chunk.stamps = None if self.stamps is None else self.stamps[start:end]
+        chunk.markers = None if self.markers is None else self.markers[start:end]
+        chunk.contents = None if self.contents is None else self.contents[start:end]
+        return chunk
+
+
+def expandChunk(options: ExpandOptions, chunk: EntryChunk, first: int) -> list[NewFile]:
+    # first is the counter value of the first entry of the chunk
     outFiles: list[NewFile] = []
-    spath = args.source_dir.path
-    indexStart = args.start_number
-    alpha = AlphaCounter(indexStart)
-    index = RadixCounter(args.radix, indexStart)
-    largestNum = RadixCounter(args.radix, indexStart + len(entries))
-    padsize = len(largestNum.str())
-
-    for file, pattern in entries:
+    spath = options.spath
+    padsize = options.padsize
+    regex = options.regex
+    useRepl = options.use_repl
+    count = options.max_replacements
+    alpha = AlphaCounter(first)
+    index = RadixCounter(options.radix, first)
+    replacers: dict[NamePattern, InlineReplacer] = {}
+
+    for i, name in enumerate(chunk.names):
+        pattern = chunk.patterns[chunk.patternIds[i]]
         idx = index.str(False)
         idxUp = index.str(True)
-        timeEntries = getTimeFormats(file, args.time_stamp_type, args.time_separator)
+        noextname, extension = os.path.splitext(name)
+        timeEntries = {}
+        if pattern.fields & TIME_FIELDS:
+            timeEntries = getTimeFormats(chunk.stamps[i], options.time_separator)
+            # header dates fall back to the file system time stamp
+            timeEntries["xd"] = timeEntries["d"]
+            timeEntries["xt"] = timeEntries["t"]
         matches = []
         rgxMatch = None
 
@@ -188,98 +387,287 @@ def expandPatterns(
             "N0": f"{idxUp:0>{padsize}}",
             "a": alpha.str(upper=False),
             "A": alpha.str(upper=True),
-            "ext": file.extension,
-            "name": file.noextname,
+            "ext": extension,
+            "name": noextname,
+            "dup": chunk.markers[i] if chunk.markers else "",
+            "bucket": getBucket(name, options) if "bucket" in pattern.fields else "",
             **timeEntries,
+            **(chunk.contents[i] if chunk.contents else {}),
         }
 
         if regex is not None and not useRepl:
-            rgxMatch = re.search(regex, file.name)
+            rgxMatch = regex.search(name)
         elif regex is not None:
-            destName = re.sub(regex, inlineReplacer(pattern, **nameopts), file.name)
-            if not isTopLevelPath(spath, destName):
-                args.arg_error("Destination must also result in a top level path")
-            outFiles.append(NewFile(os.path.join(spath, os.path.basename(destName))))
+            if pattern not in replacers:
+                replacers[pattern] = InlineReplacer(pattern)
+            replacer = replacers[pattern]
+            replacer.options = nameopts
+            destName = regex.sub(replacer, name, count)
+            outFiles.append(getDestination(spath, destName, options))
             continue
 
         if rgxMatch is None and regex is not None:
-            outFiles.append(NewFile(os.path.join(spath, file.name)))
+            parent = chunk.parents[chunk.parentIds[i]]
+            outFiles.append(NewFile(os.path.join(parent, name)))
             continue
         elif rgxMatch is not None:
             # get the full match and capture groups
             matches = [rgxMatch.group(0)]
-            matches.extend(rgxMatch.groups())
+            matches.extend(rgxMatch.groups(""))
 
         alpha.increase()
         index.increase()
 
-        matches = [m if m is not None else "" for m in matches]
         destName = pattern.evalPattern(*matches, **nameopts)
-        if not isTopLevelPath(spath, destName):
-            args.arg_error("Destination must also result in a top level path")
-        destName = NewFile(os.path.join(spath, os.path.basename(destName)))
-        outFiles.append(destName)
+        outFiles.append(getDestination(spath, destName, options))
 
     return outFiles
 
 
-def getFileNames(args: ArgsWrapper):
-    inFiles = args.get_sources()
+def expandPatterns(
+    entries: list[tuple[FileEntry, NamePattern]],
+    regex: str | re.Pattern | None,
+    args: ArgsWrapper,
+    useRepl: bool,
+    markers: dict[str, str] | None = None,
+    offset: int = 0,
+    total: int | None = None,
+):
+    # offset and total let a slice be numbered as part of a larger selection
+    outFiles: list[NewFile] = []
+    total = len(entries) if total is None else total
+    markers = {} if markers is None else markers
+    regex = re.compile(regex) if type(regex) == str else regex
+    options = ExpandOptions(args, regex, useRepl, total)
+
+    try:
+        if useRepl and all(p.template is not None for _, p in entries):
+            # capture group only patterns never leave the re module
+            count = args.max_replacements
+            with progress.task("expand", len(entries)) as expanding:
+                for file, pattern in entries:
+                    destName = regex.sub(pattern.template, file.name, count)
+                    outFiles.append(getDestination(options.spath, destName, options))
+                    expanding.advance()
+            return outFiles
+
+        contentEntries = getContentEntries(entries, args)
+        chunk = EntryChunk(entries, markers, contentEntries, args.time_stamp_type)
+        size = len(chunk)
+        jobs = args.cpu_jobs if size > MIN_CHUNK_SIZE else 1
+        step = max(MIN_CHUNK_SIZE, -(-size // (jobs * CHUNKS_PER_JOB)))
+        bounds = [(start, min(size, start + step)) for start in range(0, size, step)]
+        # selected entries always match the regex, so counters follow positions
+        # inline replacements never advance them, in a shard or a single run
+        firsts = [
+            args.start_number + (0 if useRepl else offset + start)
+            for start, _ in bounds
+        ]
+
+        with progress.task("expand", size) as expanding:
+            if jobs == 1:
+                for (start, end), first in zip(bounds, firsts):
+                    result = expandChunk(options, chunk.slice(start, end), first)
+                    outFiles.extend(result)
+                    expanding.advance(len(result))
+            else:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    chunks = (chunk.slice(start, end) for start, end in bounds)
+                    results = pool.map(expandChunk, repeat(options), chunks, firsts)
+                    # map yields in submission order, so the merge keeps the order
+                    for result in results:
+                        outFiles.extend(result)
+                        expanding.advance(len(result))
+    except ExpansionError as err:
+        args.arg_error(str(err))
 
-    if not args.include_self:
-        inFiles = [f for f in inFiles if f.path != __file__]
+    return outFiles
 
-    if inFiles is None:
-        args.arg_error("fatal error: input file list is None")
 
-    if getRepeats(inFiles, lambda f: f.name):
-        args.arg_error("fatal error: input files are guaranteed to be unique.")
+def getSortKey(sort: SortingOptions) -> Callable[[FileEntry], Any]:
+    # ties are broken by name so the order never depends on the listing
+    if sort.byAccessDate():
+        return lambda file: (file.atime, file.name)
+    if sort.byModifyDate():
+        return lambda file: (file.mtime, file.name)
+    if sort.byMetaDate():
+        return lambda file: (file.ctime, file.name)
+    if sort.byBirthDate():
+        return lambda file: (file.btime, file.name)
+    if sort.bySize():
+        return lambda file: (file.size, file.name)
+    return lambda file: file.name
+
+
+def selectEntries(
+    files: list[FileEntry],
+    key: Callable[[FileEntry], Any] | None,
+    reverse: bool,
+    skip: int = 0,
+    limit: int | None = None,
+):
+    # a key of None means the files are already in order
+    if limit is None:
+        if key is not None:
+            files = sorted(files, key=key, reverse=reverse)
+        return files[skip:]
 
-    if not args.is_source_ordered():
-        if args.sort.byName():
-            inFiles = sorted(
-                inFiles, key=lambda file: file.name, reverse=args.reverse_sort
-            )
-        if args.sort.byAccessDate():
-            inFiles = sorted(
-                inFiles, key=lambda file: file.atime, reverse=args.reverse_sort
-            )
-        if args.sort.byModifyDate():
-            inFiles = sorted(
-                inFiles, key=lambda file: file.mtime, reverse=args.reverse_sort
-            )
-        if args.sort.bySize():
-            inFiles = sorted(
-                inFiles, key=lambda file: file.size, reverse=args.reverse_sort
-            )
+    count = skip + limit
+    if key is None:
+        return files[skip:count]
 
-    destGen = args.get_destinations()
-    outFiles: list[NewFile] = []
+    # partial selection is O(n log k) and stable just like sorted
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return select(count, files, key=key)[skip:]
+
+
+def expandRules(
+    inFiles: list[FileEntry],
+    rules: RuleSet,
+    args: ArgsWrapper,
+    markers: dict[str, str] | None = None,
+) -> list[NewFile]:
+    outFiles: list[NewFile | None] = [None] * len(inFiles)
+    positions: list[list[int]] = [[] for _ in range(len(rules))]
+    for i, file in enumerate(inFiles):
+        rule = rules.dispatch(file.name)
+        if rule is None:
+            outFiles[i] = NewFile(file.path)
+        else:
+            positions[rule].append(i)
 
+    # each rule is expanded on its own so that its counter starts over
+    for (regex, pattern), indices in zip(rules, positions):
+        if not indices:
+            continue
+        entries = [(inFiles[i], pattern) for i in indices]
+        result = expandPatterns(entries, regex, args, False, markers)
+        for i, outFile in zip(indices, result):
+            outFiles[i] = outFile
+    return outFiles
+
+
+def expandEntries(
+    inFiles: list[FileEntry],
+    destGen: Any,
+    args: ArgsWrapper,
+    markers: dict[str, str] | None = None,
+    offset: int = 0,
+    total: int | None = None,
+) -> list[NewFile]:
+    counting = (markers, offset, total)
     match args.get_dest_type():
         case ArgsWrapper.OUT_PATTERN:
             # destGen: NamePattern
-            outFiles = expandPatterns(
-                [(f, destGen) for f in inFiles], args.regex, args, False
+            return expandPatterns(
+                [(f, destGen) for f in inFiles], args.regex, args, False, *counting
             )
         case ArgsWrapper.OUT_REGEX_INLINE:
             # destGen: tuple(str, NamePattern)
             rgx, patt = destGen
-            outFiles = expandPatterns([(f, patt) for f in inFiles], rgx, args, True)
+            return expandPatterns(
+                [(f, patt) for f in inFiles], rgx, args, True, *counting
+            )
         case ArgsWrapper.OUT_PAIR_LIST | ArgsWrapper.OUT_FILE_LIST:
             if not args.no_plain_text:
                 # destGen: list[NewFile]
-                outFiles = destGen
+                return destGen
             else:
                 # destGen: list[NamePattern]
-                outFiles = expandPatterns(
-                    [(f, p) for f, p in zip(inFiles, destGen)], None, args, False
+                return expandPatterns(
+                    [(f, p) for f, p in zip(inFiles, destGen)],
+                    None,
+                    args,
+                    False,
+                    *counting,
                 )
+        case ArgsWrapper.OUT_RULES:
+            # destGen: RuleSet
+            return expandRules(inFiles, destGen, args, markers)
+    return []
+
+
+def getShardBounds(size: int, count: int) -> list[int]:
+    # shard i covers [bounds[i - 1], bounds[i]) of the sorted selection
+    return [size * i // count for i in range(count + 1)]
+
 
+def needsContents(destGen: Any, args: ArgsWrapper) -> bool:
+    match args.get_dest_type():
+        case ArgsWrapper.OUT_PATTERN:
+            patterns = [destGen]
+        case ArgsWrapper.OUT_REGEX_INLINE:
+            patterns = [destGen[1]]
+        case ArgsWrapper.OUT_RULES:
+            patterns = destGen.patterns
+        case _ if args.no_plain_text:
+            patterns = destGen
+        case _:
+            return False
+    contentFields = HASH_FIELDS | META_FIELDS
+    return any(p.fields & contentFields for p in patterns)
+
+
+def validateShards(
+    inFiles: list[FileEntry],
+    outFiles: list[NewFile],
+    destGen: Any,
+    args: ArgsWrapper,
+    markers: dict[str, str],
+):
+    # inFiles is the whole selection while outFiles only covers this shard
+    index, count = args.shard
+    bounds = getShardBounds(len(inFiles), count)
+    lo, hi = bounds[index - 1], bounds[index]
+    pairedDest = type(destGen) == list
+    shardOf = lambda pos: bisect.bisect_right(bounds, pos) - 1
+    sources = {f.path: i for i, f in enumerate(inFiles)}
+    targets = [(lo + i, f.path) for i, f in enumerate(outFiles)]
+
+    # names of other shards are only derived when no file has to be read
+    if not needsContents(destGen, args):
+        for start, end in zip(bounds, bounds[1:]):
+            if start == lo or start == end:
+                continue
+            shardDest = destGen[start:end] if pairedDest else destGen
+            shardOut = expandEntries(
+                inFiles[start:end], shardDest, args, markers, start, len(inFiles)
+            )
+            targets.extend((start + i, f.path) for i, f in enumerate(shardOut))
+
+    crossings = set()
+    for pos, target in targets:
+        owner = sources.get(target)
+        if owner is not None and owner != pos and shardOf(owner) != shardOf(pos):
+            crossings.add(target)
+    if crossings:
+        args.arg_error(f"Shards would rename each other's files: {crossings}")
+
+    oreps = getRepeats(targets, lambda t: t[1])
+    if oreps:
+        args.arg_error(f"Generated output files are not unique across shards: {oreps}")
+
+
+def findBlockedParent(path: str, checked: set[str]) -> str | None:
+    # every parent must be a directory or missing, so buckets can be created
+    parent = os.path.dirname(os.path.abspath(path))
+    pending: list[str] = []
+    while parent not in checked:
+        if fileSystem.exists(parent) and not fileSystem.isdir(parent):
+            return parent
+        pending.append(parent)
+        parent = os.path.dirname(parent)
+    checked.update(pending)
+    return None
+
+
+def validateEntries(
+    inFiles: list[FileEntry], outFiles: list[NewFile], args: ArgsWrapper
+):
     if len(inFiles) != len(outFiles):
         args.arg_error("Number of entries in source and destination must match.")
 
-    oreps = getRepeats(outFiles, lambda f: f.name)
+    oreps = getRepeats(outFiles, lambda f: f.path)
     if oreps:
         args.arg_error(f"Generated output files are not unique: {oreps}")
 
@@ -293,8 +681,17 @@ def getFileNames(args: ArgsWrapper):
 
     included: list[tuple[FileEntry, NewFile]] = []
     ignored: list[tuple[FileEntry, NewFile]] = []
+    spath = args.source_dir.path
+    checked: set[str] = {os.path.abspath(spath)}
     for ifile, ofile in zip(inFiles, outFiles):
-        if ifile.parent != ofile.parent:
+        if args.fan_out or args.fan_in:
+            # buckets may only be created or emptied within the source path
+            if not isWithinPath(spath, os.path.relpath(ofile.path, spath)):
+                args.arg_error(f"Output file is outside of {spath}\n{ofile.path}")
+            blocked = findBlockedParent(ofile.path, checked)
+            if blocked is not None:
+                args.arg_error(f"Output folder is not a directory: {blocked}")
+        elif ifile.parent != ofile.parent:
             args.arg_error(
                 f"Cannot change path of output file\n{ifile.path} {ofile.path}"
             )
@@ -304,3 +701,77 @@ def getFileNames(args: ArgsWrapper):
             included.append((ifile, ofile))
 
     return included, ignored
+
+
+def getFileNames(args: ArgsWrapper):
+    inFiles = args.get_sources()
+
+    if not args.include_self:
+        inFiles = [f for f in inFiles if f.path != __file__]
+
+    if inFiles is None:
+        args.arg_error("fatal error: input file list is None")
+
+    if getRepeats(inFiles, lambda f: f.path):
+        args.arg_error("fatal error: input files are guaranteed to be unique.")
+
+    if args.sort.byBirthDate() and not args.is_source_ordered():
+        missing = [f.path for f in inFiles if f.btime is None]
+        if missing:
+            args.arg_error(
+                f"birth time is not recorded for {len(missing)} files:\n"
+                + "\n".join(missing)
+            )
+
+    with profiler.phase("select", len(inFiles)):
+        if args.is_source_ordered():
+            inFiles = selectEntries(inFiles, None, False, args.skip, args.limit)
+        else:
+            inFiles = selectEntries(
+                inFiles, getSortKey(args.sort), args.reverse_sort, args.skip, args.limit
+            )
+
+    destGen = args.get_destinations()
+    pairedDest = args.is_source_ordered() and type(destGen) == list
+
+    if pairedDest:
+        # ordered sources are paired positionally with their destinations
+        end = None if args.limit is None else args.skip + args.limit
+        destGen = destGen[args.skip : end]
+
+    duplicates: list[list[FileEntry]] = []
+    markers: dict[str, str] = {}
+    if args.dedupe is not None:
+        with profiler.phase("dedupe", len(inFiles)):
+            duplicates = findDuplicates(inFiles, args.hash_cache, args.io_jobs)
+        for i, group in enumerate(duplicates, 1):
+            markers.update((f.path, str(i)) for f in group)
+
+    if args.dedupe == ArgsWrapper.DEDUPE_EXCLUDE and duplicates:
+        # the first file of each group is the one that is kept
+        dropped = {f.path for group in duplicates for f in group[1:]}
+        keep = [f.path not in dropped for f in inFiles]
+        if pairedDest:
+            destGen = [d for d, k in zip(destGen, keep) if k]
+        inFiles = [f for f, k in zip(inFiles, keep) if k]
+
+    allFiles, allDest = inFiles, destGen
+    lo, total = 0, len(inFiles)
+    if args.shard is not None:
+        index, count = args.shard
+        bounds = getShardBounds(total, count)
+        lo, hi = bounds[index - 1], bounds[index]
+        inFiles = inFiles[lo:hi]
+        destGen = destGen[lo:hi] if pairedDest else destGen
+
+    with profiler.phase("expand", len(inFiles)):
+        outFiles = expandEntries(inFiles, destGen, args, markers, lo, total)
+
+    if args.shard is not None:
+        with profiler.phase("shards", total):
+            validateShards(allFiles, outFiles, allDest, args, markers)
+
+    with profiler.phase("validate", len(inFiles)):
+        included, ignored = validateEntries(inFiles, outFiles, args)
+
+    return included, ignored, duplicates
@@ -1,4 +1,11 @@
-from itermv.components import RadixCounter, FileEntry, NewFile
+from itermv.components import (
+    RadixCounter,
+    FileEntry,
+    NewFile,
+    Throttle,
+    fileSystem,
+    progress,
+)
 from itermv.utils import identifyCycle
 
 import os
@@ -17,13 +24,13 @@ def genTempName(path: str) -> str:
     # unique name in the current path.
 
     for _ in range(2):
-        if not os.path.exists(tempname):
+        if not fileSystem.exists(tempname):
             return tempname
         num = randint(0xFFF_FFFF_FFFF_FFFF, 0xFFFF_FFFF_FFFF_FFFF)
         alnum = RadixCounter(36, num)
         tempname = os.path.join(path, alnum.str())
 
-    if not os.path.exists(tempname):
+    if not fileSystem.exists(tempname):
         return tempname
 
     raise FileExistsError("Could not find an available name.")
@@ -116,14 +123,81 @@ def createValidSchedule(tasklist: list[tuple[FileEntry, NewFile]]):
     return schedule
 
 
-def renameBySchedule(schedule: list[tuple[str, str]]):
+def ensureParents(schedule: list[tuple[str, str]], root: str) -> list[str]:
+    # every bucket is created once, no matter how many files land in it
+    known: set[str] = {os.path.abspath(root)}
+    created: list[str] = []
+
+    for _, target in schedule:
+        parent = os.path.dirname(os.path.abspath(target))
+        if parent in known:
+            continue
+        missing: list[str] = []
+        while parent not in known and not fileSystem.isdir(parent):
+            missing.append(parent)
+            parent = os.path.dirname(parent)
+        known.add(parent)
+        try:
+            for folder in reversed(missing):
+                fileSystem.mkdir(folder)
+                known.add(folder)
+                created.append(folder)
+        except OSError:
+            # nothing was renamed yet, so no folder is left behind
+            removeDirectories(created)
+            raise
+
+    return created
+
+
+def removeDirectories(created: list[str]) -> list[str]:
+    # folders made by ensureParents, deepest first; those still in use stay
+    removed: list[str] = []
+    for folder in reversed(created):
+        try:
+            fileSystem.rmdir(folder)
+            removed.append(folder)
+        except OSError:
+            pass
+    return removed
+
+
+def pruneEmptyDirectories(schedule: list[tuple[str, str]], root: str) -> list[str]:
+    root = os.path.abspath(root)
+    candidates: set[str] = set()
+    # only directories that held a source (and their parents) are pruned
+    for source, _ in schedule:
+        parent = os.path.dirname(os.path.abspath(source))
+        while parent not in candidates and parent.startswith(root + os.sep):
+            candidates.add(parent)
+            parent = os.path.dirname(parent)
+
+    removed: list[str] = []
+    # deepest first so that emptied buckets also empty their parents
+    for folder in sorted(candidates, key=lambda d: d.count(os.sep), reverse=True):
+        try:
+            fileSystem.rmdir(folder)
+            removed.append(folder)
+        except OSError:
+            pass
+    return removed
+
+
+def renameBySchedule(
+    schedule: list[tuple[str, str]], throttle: Throttle | None = None, done: int = 0
+):
+    # done counts renames that already ran before this part of the schedule
     tasklog: list[tuple[str, str]] = []
+    throttle = Throttle() if throttle is None else throttle
     try:
-        for source, target in schedule:
-            os.rename(source, target)
-            tasklog.append((source, target))
+        with progress.task("rename", done + len(schedule), done) as renaming:
+            for source, target in schedule:
+                with throttle.operation():
+                    fileSystem.rename(source, target)
+                tasklog.append((source, target))
+                renaming.advance()
     except:
-        (False, tasklog)
+        return (False, tasklog)
     return (True, tasklog)
 
 
@@ -131,7 +205,7 @@ def undoSchedule(schedule: list[tuple[str, str]]):
     try:
         for source, target in reversed(schedule):
             # source and target are reversed on purpose
-            os.rename(target, source)
+            fileSystem.rename(target, source)
     except Exception as ex:
         print("Fatal error: undo failed.", file=stderr)
         raise ex
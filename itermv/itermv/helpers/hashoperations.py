@@ -0,0 +1,147 @@
+from itermv.components import FileEntry, HashCache, HashDigest, fileSystem
+
+import os
+import mmap
+import zlib
+import hashlib
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_FIELDS = {"sha1", "sha256", "blake2", "crc32"}
+READ_BUFFER_SIZE = 1 << 20
+PREFIX_SIZE = 1 << 16
+
+
+class Crc32:
+    def __init__(self) -> None:
+        self.__value = 0
+
+    def update(self, data):
+        self.__value = zlib.crc32(data, self.__value)
+
+    def hexdigest(self) -> str:
+        return f"{self.__value:08x}"
+
+
+def newHasher(algo: str):
+    match algo:
+        case "sha1":
+            return hashlib.sha1()
+        case "sha256":
+            return hashlib.sha256()
+        case "blake2":
+            return hashlib.blake2b()
+        case "crc32":
+            return Crc32()
+        case _:
+            raise ValueError(f"'{algo}' is not a valid hash algorithm")
+
+
+def hashFile(path: str, algos: set[str]) -> dict[str, str]:
+    if fileSystem.isdir(path):
+        raise IsADirectoryError(f"cannot hash a directory: {path}")
+
+    hashers = {algo: newHasher(algo) for algo in algos}
+
+    # hashlib and zlib release the GIL on large buffers, so both the
+    # mapped and the buffered paths hash in parallel across threads.
+    with open(path, "rb") as file:
+        try:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for hasher in hashers.values():
+                    hasher.update(view)
+        except (ValueError, OSError):
+            # empty files and special files cannot be mapped
+            file.seek(0)
+            buffer = bytearray(READ_BUFFER_SIZE)
+            chunk = memoryview(buffer)
+            size = file.readinto(buffer)
+            while size:
+                for hasher in hashers.values():
+                    hasher.update(chunk[:size])
+                size = file.readinto(buffer)
+
+    return {algo: hasher.hexdigest() for algo, hasher in hashers.items()}
+
+
+def getHashEntries(
+    files: list[FileEntry],
+    algos: list[set[str]],
+    cache: HashCache,
+    jobs: int | None = None,
+) -> list[dict[str, HashDigest]]:
+    # algos holds the hashes required by each file (may be empty)
+    entries: list[dict[str, HashDigest]] = [{} for _ in files]
+    pending: list[tuple[int, set[str]]] = []
+
+    for i, (file, fileAlgos) in enumerate(zip(files, algos)):
+        missing = set()
+        for algo in fileAlgos:
+            digest = cache.get(file, algo)
+            if digest is None:
+                missing.add(algo)
+            else:
+                entries[i][algo] = HashDigest(digest)
+        if missing:
+            pending.append((i, missing))
+
+    if not pending:
+        return entries
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(lambda p: hashFile(files[p[0]].path, p[1]), pending)
+        for (i, _), digests in zip(pending, results):
+            for algo, digest in digests.items():
+                cache.put(files[i], algo, digest)
+                entries[i][algo] = HashDigest(digest)
+
+    cache.save()
+    return entries
+
+
+def hashPrefix(path: str, size: int = PREFIX_SIZE) -> str:
+    with open(path, "rb") as file:
+        return hashlib.blake2b(file.read(size)).hexdigest()
+
+
+def groupBy(files: list[FileEntry], keys) -> list[list[FileEntry]]:
+    buckets: dict[Any, list[FileEntry]] = {}
+    for file, key in zip(files, keys):
+        buckets.setdefault(key, []).append(file)
+    return [b for b in buckets.values() if len(b) > 1]
+
+
+def findDuplicates(
+    files: list[FileEntry],
+    cache: HashCache,
+    jobs: int | None = None,
+) -> list[list[FileEntry]]:
+    # stage 1: sizes were already collected by the scan
+    candidates = groupBy(files, (f.size for f in files))
+    # directories are only probed when their size collides with others
+    candidates = [[f for f in b if not fileSystem.isdir(f.path)] for b in candidates]
+    candidates = [b for b in candidates if len(b) > 1]
+    if not candidates:
+        return []
+
+    # stage 2: a small prefix is hashed only within size collisions
+    flat = [f for bucket in candidates for f in bucket]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        prefixes = list(pool.map(lambda f: hashPrefix(f.path), flat))
+    groups = groupBy(flat, zip((f.size for f in flat), prefixes))
+
+    # stage 3: full hashes are only needed when files exceed the prefix
+    duplicates = [g for g in groups if g[0].size <= PREFIX_SIZE]
+    large = [f for g in groups if g[0].size > PREFIX_SIZE for f in g]
+    if large:
+        digests = getHashEntries(large, [{"sha256"} for _ in large], cache, jobs)
+        keys = ((f.size, d["sha256"]) for f, d in zip(large, digests))
+        duplicates.extend(groupBy(large, keys))
+
+    # groups follow the order of the selection
+    order = {f.path: i for i, f in enumerate(files)}
+    for group in duplicates:
+        group.sort(key=lambda f: order[f.path])
+    duplicates.sort(key=lambda g: order[g[0].path])
+
+    return duplicates
@@ -0,0 +1,262 @@
+from itermv.components import FileEntry, fileSystem
+
+import os
+import struct
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+META_FIELDS = {"xd", "xt", "w", "h"}
+# no parser reads more than this many bytes from a single file
+MAX_HEADER_SIZE = 1 << 18
+
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+# seconds between 1904-01-01 (QuickTime epoch) and 1970-01-01
+MP4_EPOCH_OFFSET = 2082844800
+
+
+class BoundedReader:
+    def __init__(self, file, budget: int = MAX_HEADER_SIZE) -> None:
+        self.__file = file
+        self.__budget = budget
+
+    def read(self, size: int) -> bytes:
+        size = max(0, min(size, self.__budget))
+        data = self.__file.read(size)
+        self.__budget -= len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.__file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.__file.tell()
+
+
+class HeaderInfo:
+    def __init__(
+        self,
+        date: datetime.datetime | None = None,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> None:
+        self.date = date
+        self.width = width
+        self.height = height
+
+
+def parseTiff(data: bytes, info: HeaderInfo):
+    if len(data) < 8:
+        return
+    match data[:4]:
+        case b"II*\x00":
+            order = "<"
+        case b"MM\x00*":
+            order = ">"
+        case _:
+            return
+
+    def readIfd(offset: int) -> dict[int, tuple[int, int, bytes]]:
+        tags = {}
+        if offset + 2 > len(data):
+            return tags
+        (count,) = struct.unpack_from(f"{order}H", data, offset)
+        for i in range(count):
+            pos = offset + 2 + i * 12
+            if pos + 12 > len(data):
+                break
+            tag, kind, num = struct.unpack_from(f"{order}HHI", data, pos)
+            tags[tag] = (kind, num, data[pos + 8 : pos + 12])
+        return tags
+
+    def getInt(tags, tag: int) -> int | None:
+        if tag not in tags:
+            return None
+        kind, _, raw = tags[tag]
+        if kind == 3:
+            return struct.unpack(f"{order}H", raw[:2])[0]
+        if kind == 4:
+            return struct.unpack(f"{order}I", raw)[0]
+        return None
+
+    def getText(tags, tag: int) -> str | None:
+        if tag not in tags:
+            return None
+        kind, num, raw = tags[tag]
+        if kind != 2:
+            return None
+        if num > 4:
+            (offset,) = struct.unpack(f"{order}I", raw)
+            raw = data[offset : offset + num]
+        return raw.split(b"\x00", 1)[0].decode("ascii", "replace")
+
+    (ifdOffset,) = struct.unpack_from(f"{order}I", data, 4)
+    ifd0 = readIfd(ifdOffset)
+    exifOffset = getInt(ifd0, 0x8769)
+    exif = readIfd(exifOffset) if exifOffset is not None else {}
+
+    # DateTimeOriginal, then DateTime as a fallback
+    for text in (getText(exif, 0x9003), getText(ifd0, 0x0132)):
+        try:
+            info.date = datetime.datetime.strptime(text, EXIF_DATE_FORMAT)
+            break
+        except (TypeError, ValueError):
+            continue
+
+    if info.width is None:
+        info.width = getInt(exif, 0xA002) or getInt(ifd0, 0x0100)
+    if info.height is None:
+        info.height = getInt(exif, 0xA003) or getInt(ifd0, 0x0101)
+
+
+def parseJpeg(reader: BoundedReader, info: HeaderInfo):
+    reader.seek(2)
+    while True:
+        marker = reader.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return
+        code = marker[1]
+        (length,) = struct.unpack(">H", marker[2:])
+        if code == 0xD9 or code == 0xDA:
+            # end of image or start of scan, no more metadata ahead
+            return
+        if code == 0xE1:
+            segment = reader.read(length - 2)
+            if segment.startswith(b"Exif\x00\x00"):
+                parseTiff(segment[6:], info)
+        elif 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            segment = reader.read(length - 2)
+            if len(segment) >= 5:
+                info.height, info.width = struct.unpack(">HH", segment[1:5])
+            return
+        else:
+            reader.seek(length - 2, os.SEEK_CUR)
+
+
+def parsePng(reader: BoundedReader, info: HeaderInfo):
+    reader.seek(8)
+    while True:
+        header = reader.read(8)
+        if len(header) < 8:
+            return
+        length, kind = struct.unpack(">I4s", header)
+        if kind == b"IHDR":
+            info.width, info.height = struct.unpack(">II", reader.read(8))
+            reader.seek(length - 8 + 4, os.SEEK_CUR)
+        elif kind == b"tIME":
+            stamp = reader.read(7)
+            if len(stamp) == 7:
+                # tIME is always stored in UTC
+                utc = datetime.datetime(
+                    *struct.unpack(">HBBBBB", stamp), tzinfo=datetime.timezone.utc
+                )
+                info.date = utc.astimezone().replace(tzinfo=None)
+            return
+        elif kind == b"IEND":
+            return
+        else:
+            reader.seek(length + 4, os.SEEK_CUR)
+
+
+def iterBoxes(data: bytes, start: int = 0, end: int | None = None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1 and pos + 16 <= end:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def parseMp4(reader: BoundedReader, info: HeaderInfo):
+    # top level boxes are skipped by seeking, only moov is read
+    pos = 0
+    while True:
+        reader.seek(pos)
+        header = reader.read(16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header[:8])
+        offset = 8
+        if size == 1 and len(header) == 16:
+            (size,) = struct.unpack(">Q", header[8:])
+            offset = 16
+        if kind == b"moov":
+            reader.seek(pos + offset)
+            moov = reader.read(size - offset if size else MAX_HEADER_SIZE)
+            break
+        if size < offset:
+            return
+        pos += size
+
+    for kind, start, end in iterBoxes(moov):
+        if kind == b"mvhd" and end - start >= 12:
+            if moov[start] == 1:
+                (created,) = struct.unpack_from(">Q", moov, start + 4)
+            else:
+                (created,) = struct.unpack_from(">I", moov, start + 4)
+            if created > MP4_EPOCH_OFFSET:
+                unix = created - MP4_EPOCH_OFFSET
+                info.date = datetime.datetime.fromtimestamp(unix)
+        elif kind == b"trak" and info.width is None:
+            for child, cstart, cend in iterBoxes(moov, start, end):
+                if child == b"tkhd" and cend - cstart >= 84:
+                    # width and height are 16.16 fixed point at the end
+                    width, height = struct.unpack_from(">II", moov, cend - 8)
+                    if width and height:
+                        info.width, info.height = width >> 16, height >> 16
+
+
+def sniffHeader(path: str) -> HeaderInfo:
+    info = HeaderInfo()
+    if fileSystem.isdir(path):
+        return info
+
+    try:
+        with open(path, "rb") as file:
+            reader = BoundedReader(file)
+            magic = reader.read(12)
+            if magic.startswith(b"\xff\xd8"):
+                parseJpeg(reader, info)
+            elif magic.startswith(b"\x89PNG\r\n\x1a\n"):
+                parsePng(reader, info)
+            elif magic[:4] in (b"II*\x00", b"MM\x00*"):
+                reader.seek(0)
+                parseTiff(reader.read(MAX_HEADER_SIZE), info)
+            elif magic[4:8] in (b"ftyp", b"moov", b"wide", b"free", b"mdat"):
+                parseMp4(reader, info)
+    except (OSError, struct.error, ValueError, OverflowError):
+        # malformed headers simply yield no metadata
+        pass
+
+    return info
+
+
+def getMetaEntries(
+    files: list[FileEntry],
+    needed: list[bool],
+    separator: str,
+    jobs: int | None = None,
+) -> list[dict[str, str]]:
+    entries: list[dict[str, str]] = [{} for _ in files]
+    pending = [i for i, need in enumerate(needed) if need]
+    if not pending:
+        return entries
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(lambda i: sniffHeader(files[i].path), pending)
+        for i, info in zip(pending, results):
+            entry = entries[i]
+            entry["w"] = "" if info.width is None else str(info.width)
+            entry["h"] = "" if info.height is None else str(info.height)
+            if info.date is not None:
+                entry["xd"] = str(info.date.date()).replace("-", separator)
+                entry["xt"] = str(info.date.time()).replace(":", separator)
+
+    return entries
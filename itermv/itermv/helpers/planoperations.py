@@ -0,0 +1,143 @@
+from itermv.components import FileEntry, fileSystem
+
+import os
+import struct
+
+PLAN_MAGIC = b"ITMVPLAN"
+PLAN_VERSION = 1
+# version, number of sources, number of schedule entries
+PLAN_HEADER = struct.Struct("<HQQ")
+# inode, size, mtime_ns
+PLAN_FINGERPRINT = struct.Struct("<QQq")
+PLAN_LENGTH = struct.Struct("<I")
+
+Fingerprint = tuple[str, int, int, int]
+
+
+class PlanError(Exception):
+    pass
+
+
+def packString(buffer: bytearray, text: str):
+    raw = os.fsencode(text)
+    buffer += PLAN_LENGTH.pack(len(raw))
+    buffer += raw
+
+
+def unpackString(view: memoryview, offset: int) -> tuple[str, int]:
+    (size,) = PLAN_LENGTH.unpack_from(view, offset)
+    offset += PLAN_LENGTH.size
+    if offset + size > len(view):
+        raise PlanError("plan file is truncated")
+    return os.fsdecode(bytes(view[offset : offset + size])), offset + size
+
+
+def getFingerprints(files: list[FileEntry], root: str) -> list[Fingerprint]:
+    # fingerprints reuse the stat taken by the scan
+    return [
+        (os.path.relpath(f.path, root), f.inode, f.size, f.mtime_ns) for f in files
+    ]
+
+
+def savePlan(
+    path: str,
+    root: str,
+    fingerprints: list[Fingerprint],
+    schedule: list[tuple[str, str]],
+):
+    buffer = bytearray(PLAN_MAGIC)
+    buffer += PLAN_HEADER.pack(PLAN_VERSION, len(fingerprints), len(schedule))
+    packString(buffer, root)
+
+    for name, inode, size, mtime_ns in fingerprints:
+        buffer += PLAN_FINGERPRINT.pack(inode, size, mtime_ns)
+        packString(buffer, name)
+
+    for source, target in schedule:
+        packString(buffer, os.path.relpath(source, root))
+        packString(buffer, os.path.relpath(target, root))
+
+    # a crash while writing must not leave a truncated plan behind
+    temppath = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temppath, "wb") as file:
+            file.write(buffer)
+        os.replace(temppath, path)
+    finally:
+        if os.path.exists(temppath):
+            os.remove(temppath)
+
+
+def loadPlan(path: str) -> tuple[str, list[Fingerprint], list[tuple[str, str]]]:
+    with open(path, "rb") as file:
+        view = memoryview(file.read())
+
+    if bytes(view[: len(PLAN_MAGIC)]) != PLAN_MAGIC:
+        raise PlanError(f"not an itermv plan: {path}")
+    offset = len(PLAN_MAGIC)
+    try:
+        version, nsources, nschedule = PLAN_HEADER.unpack_from(view, offset)
+        if version != PLAN_VERSION:
+            raise PlanError(f"unsupported plan version: {version}")
+        offset += PLAN_HEADER.size
+        root, offset = unpackString(view, offset)
+
+        fingerprints: list[Fingerprint] = []
+        for _ in range(nsources):
+            inode, size, mtime_ns = PLAN_FINGERPRINT.unpack_from(view, offset)
+            name, offset = unpackString(view, offset + PLAN_FINGERPRINT.size)
+            fingerprints.append((name, inode, size, mtime_ns))
+
+        schedule: list[tuple[str, str]] = []
+        for _ in range(nschedule):
+            source, offset = unpackString(view, offset)
+            target, offset = unpackString(view, offset)
+            schedule.append((os.path.join(root, source), os.path.join(root, target)))
+    except struct.error:
+        raise PlanError("plan file is truncated")
+
+    return root, fingerprints, schedule
+
+
+def verifyPlan(
+    root: str, fingerprints: list[Fingerprint], schedule: list[tuple[str, str]]
+) -> list[str]:
+    if not fileSystem.isdir(root):
+        return [f"directory was not found: {root}"]
+
+    # one pass over each directory answers both names and stat data
+    listings: dict[str, dict[str, os.DirEntry]] = {}
+
+    def getEntry(path: str) -> os.DirEntry | None:
+        folder, name = os.path.split(path)
+        if folder not in listings:
+            try:
+                listings[folder] = {e.name: e for e in fileSystem.scandir(folder)}
+            except (FileNotFoundError, NotADirectoryError):
+                listings[folder] = {}
+        return listings[folder].get(name)
+
+    errors: list[str] = []
+    sources = set()
+
+    for name, inode, size, mtime_ns in fingerprints:
+        sources.add(name)
+        entry = getEntry(os.path.join(root, name))
+        try:
+            if entry is None:
+                raise FileNotFoundError
+            stat = entry.stat()
+        except FileNotFoundError:
+            errors.append(f"source no longer exists: {name}")
+            continue
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != (inode, size, mtime_ns):
+            errors.append(f"source changed since the plan was made: {name}")
+
+    for _, target in schedule:
+        name = os.path.relpath(target, root)
+        if name in sources:
+            continue
+        if getEntry(target) is not None:
+            errors.append(f"destination already exists: {name}")
+
+    return errors
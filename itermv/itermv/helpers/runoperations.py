@@ -0,0 +1,173 @@
+from itermv.components import ArgsWrapper, FileEntry, NewFile, Throttle, profiler
+from itermv.helpers.changeoperations import (
+    PlanSnapshot,
+    detectChanges,
+    printChanges,
+    replanSchedule,
+)
+from itermv.helpers.copyoperations import copyBySchedule, undoCopies
+from itermv.helpers.dataoperations import (
+    askUser,
+    getFileNames,
+    printCopyStats,
+    printDuplicates,
+    printIntro,
+    printSchedule,
+    printThrottleStats,
+)
+from itermv.helpers.fileoperations import (
+    createValidSchedule,
+    createValidTasklist,
+    ensureParents,
+    pruneEmptyDirectories,
+    removeDirectories,
+    undoSchedule,
+)
+from itermv.helpers.stageoperations import (
+    discardStages,
+    findStages,
+    renameByStrategy,
+)
+from itermv.helpers.planoperations import (
+    Fingerprint,
+    getFingerprints,
+    loadPlan,
+    PlanError,
+    savePlan,
+    verifyPlan,
+)
+
+import os
+import time
+
+TaskList = list[tuple[FileEntry, NewFile]]
+
+
+def prepareSchedule(
+    args: ArgsWrapper,
+) -> tuple[TaskList, TaskList, list[tuple[str, str]], PlanSnapshot]:
+    started_ns = time.time_ns()
+    included, ignored, duplicates = getFileNames(args)
+    if args.stages:
+        args.arg_error(
+            "An interrupted staged run was found in "
+            f"{os.path.join(args.source_dir.path, args.stages[0])}\n"
+            "Use --recover to finish it first."
+        )
+
+    printIntro(args)
+    printDuplicates(duplicates, args)
+
+    schedule: list[tuple[str, str]] = []
+    if len(included) > 0:
+        with profiler.phase("schedule", len(included)):
+            if args.overlap:
+                schedule = createValidSchedule(included)
+            else:
+                schedule = createValidTasklist(included)
+
+        if args.save_plan is not None:
+            root = args.source_dir.path
+            sources = getFingerprints([f for f, _ in included], root)
+            savePlan(args.save_plan, root, sources, schedule)
+
+        strIgnored = [(a.path, b.path) for a, b in ignored]
+        printSchedule(schedule, strIgnored, args)
+
+    # the prompt may sit for minutes while the directory keeps changing
+    with profiler.phase("snapshot", len(included)):
+        snapshot = PlanSnapshot(included, schedule, started_ns)
+    return included, ignored, schedule, snapshot
+
+
+def prepareAppliedPlan(
+    args: ArgsWrapper,
+) -> tuple[str, list[Fingerprint], list[tuple[str, str]]]:
+    try:
+        with profiler.phase("load") as phase:
+            root, sources, schedule = loadPlan(args.apply_plan)
+            phase.items = len(schedule)
+    except (OSError, PlanError) as err:
+        args.arg_error(f"Could not load plan: {err}")
+
+    with profiler.phase("verify", len(sources)):
+        errors = verifyPlan(root, sources, schedule)
+    if errors:
+        args.arg_error("Plan is no longer valid:\n" + "\n".join(errors))
+
+    printIntro(args)
+    if schedule:
+        printSchedule(schedule, [], args, root)
+
+    return root, sources, schedule
+
+
+def revalidateSchedule(
+    schedule: list[tuple[str, str]], args: ArgsWrapper, snapshot: PlanSnapshot
+) -> list[tuple[str, str]]:
+    with profiler.phase("revalidate", len(snapshot.included)):
+        changes = detectChanges(snapshot)
+    if not changes:
+        return schedule
+
+    planner = createValidSchedule if args.overlap else createValidTasklist
+    with profiler.phase("replan") as phase:
+        schedule, skipped, replanned, dropped = replanSchedule(
+            snapshot, schedule, changes, planner
+        )
+        phase.items = replanned
+    printChanges(changes, skipped, replanned, dropped, args)
+    return schedule
+
+
+def executeSchedule(
+    schedule: list[tuple[str, str]],
+    args: ArgsWrapper,
+    root: str | None = None,
+    snapshot: PlanSnapshot | None = None,
+) -> bool:
+    root = args.source_dir.path if root is None else root
+    # plans may have been made with --fan-out or --fan-in
+    fromPlan = args.apply_plan is not None
+    latency = args.target_latency
+    throttle = Throttle(args.max_ops_per_sec, latency / 1000 if latency else None)
+    success = False
+    if args.dry_run and askUser("Dummy prompt", args):
+        success = True
+    elif askUser("Do you want to proceed? [Y]es/[N]o: ", args):
+        if snapshot is not None:
+            schedule = revalidateSchedule(schedule, args, snapshot)
+        created: list[str] = []
+        if args.fan_out or fromPlan:
+            try:
+                with profiler.phase("mkdir"):
+                    created = ensureParents(schedule, root)
+            except OSError as err:
+                args.arg_error(f"Could not create output folders: {err}")
+        if args.copy:
+            with profiler.phase("copy", len(schedule)) as phase:
+                success, tasklog, stats = copyBySchedule(
+                    schedule, args.reflink, args.io_jobs, throttle
+                )
+                phase.items = len(tasklog)
+            printCopyStats(stats, args)
+            undo = undoCopies
+        else:
+            success, tasklog = renameByStrategy(
+                schedule, root, args.strategy, args.io_jobs, throttle
+            )
+            undo = undoSchedule
+        printThrottleStats(throttle, args)
+        if not success and askUser(
+            "Do you want to undo partial changes? [Y]es/[N]o: ", args
+        ):
+            undo(tasklog)
+            if not args.copy:
+                discardStages(root)
+            removeDirectories(created)
+            success = True
+        elif not success and not args.copy and findStages(root):
+            print(f"Use itermv -i {root} --recover to finish the staged run.")
+        elif success and not args.copy and (args.fan_in or fromPlan):
+            pruneEmptyDirectories(tasklog, root)
+    return success
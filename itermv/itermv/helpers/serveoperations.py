@@ -0,0 +1,266 @@
+from itermv.components import ArgsWrapper, scanIndex
+from itermv.helpers.argparsing import getArguments, readsStdin
+from itermv.helpers.dataoperations import printOutro
+from itermv.helpers.planoperations import getFingerprints, verifyPlan
+from itermv.helpers.stageoperations import recoverRun
+from itermv.helpers.runoperations import (
+    executeSchedule,
+    prepareAppliedPlan,
+    prepareSchedule,
+)
+
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import traceback
+import socketserver
+from threading import Lock
+from argparse import ArgumentParser
+
+CLIENT_FLAG = "--client"
+
+
+class DirectoryLock:
+    # workers are separate processes, so jobs on one directory meet at a flock
+    def __init__(self, path: str) -> None:
+        self.__path = path
+        self.__fd: int | None = None
+
+    def __enter__(self):
+        import fcntl
+
+        self.__fd = os.open(self.__path, os.O_RDONLY | os.O_DIRECTORY)
+        fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        # closing the descriptor releases the lock
+        os.close(self.__fd)
+        self.__fd = None
+        return False
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path, JobHandler)
+        # workers are forked while no thread holds the index
+        self.fork_lock = Lock()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server: JobServer = self.server
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        response = runWorker(server, request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def runWorker(server: JobServer, request: dict) -> dict:
+    # a process per job gives it its own working directory, streams and globals
+    reader, writer = os.pipe()
+    with server.fork_lock:
+        pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.close(reader)
+            with os.fdopen(writer, "w", encoding="utf-8") as pipe:
+                json.dump(runJob(request), pipe)
+            code = 0
+        finally:
+            os._exit(code)
+
+    os.close(writer)
+    with os.fdopen(reader, "r", encoding="utf-8") as pipe:
+        data = pipe.read()
+    os.waitpid(pid, 0)
+    try:
+        response = json.loads(data)
+    except ValueError:
+        message = "itermv: error: the job ended without a response\n"
+        response = {"status": 1, "plan": None, "prompt": False}
+        return {**response, "stdout": "", "stderr": message}
+
+    # directories scanned by the job stay warm for the next ones
+    with server.fork_lock:
+        scanIndex.merge(response.pop("index"))
+    return response
+
+
+def runJob(request: dict) -> dict:
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sys.stdout, sys.stderr = stdout, stderr
+    sys.stdin = io.StringIO(request.get("stdin", ""))
+    response = {"status": 0, "plan": None, "prompt": False}
+    try:
+        os.chdir(request["cwd"])
+        match request.get("op"):
+            case "plan":
+                response.update(planJob(request))
+            case "execute":
+                response.update(executeJob(request))
+            case op:
+                print(f"unknown operation: {op}", file=sys.stderr)
+                response["status"] = 1
+    except SystemExit as ex:
+        code = ex.code
+        response["status"] = code if type(code) == int else int(code is not None)
+    except Exception:
+        traceback.print_exc()
+        response["status"] = 1
+
+    response["stdout"] = stdout.getvalue()
+    response["stderr"] = stderr.getvalue()
+    response["index"] = scanIndex.changes()
+    return response
+
+
+def planJob(request: dict) -> dict:
+    args = getArguments(*request["argv"])
+
+    if args.recover:
+        with DirectoryLock(args.source_dir.path):
+            recoverRun(args)
+        return {}
+
+    if args.apply_plan is not None:
+        # the plan is verified again right before it is executed
+        root, sources, schedule = prepareAppliedPlan(args)
+        included, ignored = schedule, []
+    else:
+        root = args.source_dir.path
+        with DirectoryLock(root):
+            included, ignored, schedule, _ = prepareSchedule(args)
+        sources = getFingerprints([f for f, _ in included], root)
+
+    if args.dry_run or not schedule:
+        success = len(included) > 0 and executeSchedule(schedule, args, root)
+        printOutro(included, ignored, args, success)
+        return {}
+
+    plan = {"root": root, "sources": sources, "schedule": schedule}
+    return {"plan": plan, "prompt": not (args.quiet or args.verbose_export)}
+
+
+def executeJob(request: dict) -> dict:
+    # the client already confirmed the plan so no prompt is shown here
+    args = getArguments(*request["argv"], "-q")
+    plan = request["plan"]
+    root = plan["root"]
+    sources = [tuple(s) for s in plan["sources"]]
+    schedule = [tuple(s) for s in plan["schedule"]]
+
+    with DirectoryLock(root):
+        errors = verifyPlan(root, sources, schedule)
+        if errors:
+            args.arg_error("Plan is no longer valid:\n" + "\n".join(errors))
+        success = executeSchedule(schedule, args, root)
+        scanIndex.invalidate(root)
+
+    printOutro(schedule, [], args, success)
+    return {}
+
+
+def serve(argv: list[str]) -> int:
+    parser = ArgumentParser(
+        prog="itermv serve",
+        description="Runs itermv jobs sent by itermv --client over a Unix socket.",
+    )
+    parser.add_argument(
+        "--socket",
+        nargs=1,
+        required=True,
+        metavar="PATH",
+        help="Path of the Unix domain socket to listen on.",
+    )
+    path = os.path.abspath(parser.parse_args(argv).socket[0])
+
+    if os.path.exists(path):
+        try:
+            with socket.socket(socket.AF_UNIX) as probe:
+                probe.connect(path)
+            parser.error(f"a server is already listening on {path}")
+        except ConnectionRefusedError:
+            # left behind by a server that did not shut down cleanly
+            os.remove(path)
+
+    previous = os.umask(0o177)
+    try:
+        server = JobServer(path)
+    finally:
+        os.umask(previous)
+
+    # termination requests shut the server down the same way as an interrupt
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.default_int_handler)
+
+    scanIndex.enable()
+    # an empty argument list must never fall back to the arguments of the server
+    sys.argv = sys.argv[:1]
+    print(f"itermv is listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+    return 0
+
+
+def splitClientArgs(argv: list[str]) -> tuple[str | None, list[str]]:
+    for i, arg in enumerate(argv):
+        if arg == CLIENT_FLAG and i + 1 < len(argv):
+            return argv[i + 1], argv[:i] + argv[i + 2 :]
+        if arg.startswith(f"{CLIENT_FLAG}="):
+            return arg.partition("=")[2], argv[:i] + argv[i + 1 :]
+    return None, argv
+
+
+def sendRequest(path: str, request: dict) -> dict:
+    with socket.socket(socket.AF_UNIX) as conn:
+        conn.connect(path)
+        conn.sendall(json.dumps(request).encode() + b"\n")
+        conn.shutdown(socket.SHUT_WR)
+        with conn.makefile("rb") as reader:
+            response = json.loads(reader.readline())
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response
+
+
+def runClient(path: str, argv: list[str]) -> int:
+    request = {"op": "plan", "argv": argv, "cwd": os.getcwd()}
+    if readsStdin(*argv):
+        # the server cannot read the stdin of the client
+        request["stdin"] = sys.stdin.read()
+    try:
+        response = sendRequest(path, request)
+        if response["status"] != 0 or response["plan"] is None:
+            return response["status"]
+
+        if response["prompt"]:
+            # prompts are answered here since the server has no terminal
+            msg = "Do you want to proceed? [Y]es/[N]o: "
+            print()
+            userInput = input(msg)
+            while len(userInput) != 1 or userInput not in "YyNn":
+                userInput = input(msg)
+            if userInput not in "Yy":
+                return 0
+
+        request.update(op="execute", plan=response["plan"])
+        return sendRequest(path, request)["status"]
+    except (OSError, ValueError) as err:
+        print(f"itermv: error: could not reach {path}: {err}", file=sys.stderr)
+        return 1
@@ -0,0 +1,255 @@
+from itermv.components import ArgsWrapper, Throttle, fileSystem, profiler, progress
+from itermv.helpers.fileoperations import renameBySchedule
+
+import os
+import json
+import time
+import secrets
+from sys import stderr
+from concurrent.futures import ThreadPoolExecutor
+
+STRATEGY_AUTO = "auto"
+STRATEGY_SERIAL = "serial"
+STRATEGY_STAGED = "staged"
+STRATEGY_OPTIONS = [STRATEGY_AUTO, STRATEGY_SERIAL, STRATEGY_STAGED]
+
+JOURNAL_NAME = "journal.json"
+# written once every source is staged, from then on a run is rolled forward
+STAGED_MARKER = "staged"
+JOURNAL_VERSION = 1
+
+# renames timed before the strategy is chosen
+PROBE_OPS = 16
+# below this latency per rename threads cost more than they save
+STAGED_MIN_LATENCY = 0.001
+# staging adds a directory, a journal and twice the renames
+STAGED_MIN_OPS = 64
+
+
+def composePairs(schedule: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    # follows every file through the schedule, temporary names included
+    origins: dict[str, str] = {}
+    for source, target in schedule:
+        origins[target] = origins.pop(source, source)
+    return [(o, t) for t, o in origins.items() if o != t]
+
+
+def getStageName(index: int) -> str:
+    return f"{index:08x}"
+
+
+def syncFile(path: str, data: bytes):
+    # the journal must reach the disk before any file is moved
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def syncDirectory(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def createStage(root: str, pairs: list[tuple[str, str]]) -> str:
+    name = f"{ArgsWrapper.STAGE_PREFIX}{os.getpid()}-{secrets.token_hex(4)}"
+    stage = os.path.join(root, name)
+    fileSystem.mkdir(stage)
+    journal = {"version": JOURNAL_VERSION, "root": root, "entries": pairs}
+    syncFile(os.path.join(stage, JOURNAL_NAME), json.dumps(journal).encode())
+    syncDirectory(stage)
+    syncDirectory(root)
+    return stage
+
+
+def removeStage(stage: str):
+    for name in (STAGED_MARKER, JOURNAL_NAME):
+        try:
+            os.remove(os.path.join(stage, name))
+        except FileNotFoundError:
+            pass
+    fileSystem.rmdir(stage)
+
+
+def findStages(root: str) -> list[str]:
+    prefix = ArgsWrapper.STAGE_PREFIX
+    names = [n for n in fileSystem.listdir(root) if n.startswith(prefix)]
+    return sorted(os.path.join(root, n) for n in names)
+
+
+def runPhase(
+    name: str,
+    steps: list[tuple[str, str]],
+    jobs: int,
+    throttle: Throttle,
+    done: int = 0,
+) -> tuple[bool, list[tuple[str, str]]]:
+    def move(step: tuple[str, str]):
+        with throttle.operation():
+            fileSystem.rename(*step)
+        return step
+
+    tasklog: list[tuple[str, str]] = []
+    success = True
+    # every step is independent, so all of them are in flight at once
+    with progress.task(name, done + len(steps), done) as moving:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(move, step) for step in steps]
+            for future in futures:
+                try:
+                    tasklog.append(future.result())
+                    moving.advance()
+                except OSError as err:
+                    print(f"Could not move {err.filename}: {err.strerror}", file=stderr)
+                    success = False
+    return success, tasklog
+
+
+def renameStaged(
+    pairs: list[tuple[str, str]],
+    root: str,
+    jobs: int,
+    throttle: Throttle,
+    done: int = 0,
+) -> tuple[bool, list[tuple[str, str]]]:
+    try:
+        stage = createStage(root, pairs)
+    except OSError as err:
+        print(f"Could not create the staging directory: {err}", file=stderr)
+        return False, []
+    staged = [os.path.join(stage, getStageName(i)) for i in range(len(pairs))]
+
+    with profiler.phase("stage", len(pairs)):
+        steps = [(s, p) for (s, _), p in zip(pairs, staged)]
+        success, tasklog = runPhase("stage", steps, jobs, throttle)
+    if not success:
+        return False, tasklog
+
+    syncFile(os.path.join(stage, STAGED_MARKER), b"")
+    syncDirectory(stage)
+
+    with profiler.phase("unstage", len(pairs)):
+        steps = [(p, t) for (_, t), p in zip(pairs, staged)]
+        success, moved = runPhase("rename", steps, jobs, throttle, done)
+        tasklog.extend(moved)
+    if success:
+        removeStage(stage)
+    return success, tasklog
+
+
+def renameSerial(
+    schedule: list[tuple[str, str]], throttle: Throttle
+) -> tuple[bool, list[tuple[str, str]]]:
+    with profiler.phase("rename", len(schedule)) as phase:
+        success, tasklog = renameBySchedule(schedule, throttle)
+        phase.items = len(tasklog)
+    return success, tasklog
+
+
+def renameByStrategy(
+    schedule: list[tuple[str, str]],
+    root: str,
+    strategy: str,
+    jobs: int,
+    throttle: Throttle,
+) -> tuple[bool, list[tuple[str, str]]]:
+    # every path records its own phases, staging records stage and unstage
+    if strategy == STRATEGY_STAGED:
+        # a single job gains no speed but the run can still be recovered
+        return renameStaged(composePairs(schedule), root, jobs, throttle)
+    if strategy == STRATEGY_SERIAL or jobs == 1:
+        return renameSerial(schedule, throttle)
+
+    probe = schedule[:PROBE_OPS]
+    rest = schedule[len(probe) :]
+    tasklog: list[tuple[str, str]] = []
+    with profiler.phase("rename", len(schedule)) as phase:
+        # the first renames run in order and tell how slow the storage is
+        elapsed = 0.0
+        try:
+            for source, target in probe:
+                with throttle.operation():
+                    start = time.perf_counter()
+                    fileSystem.rename(source, target)
+                    elapsed += time.perf_counter() - start
+                tasklog.append((source, target))
+        except OSError:
+            phase.items = len(tasklog)
+            return False, tasklog
+
+        latency = elapsed / len(probe) if probe else 0.0
+        staged = latency >= STAGED_MIN_LATENCY and len(rest) >= STAGED_MIN_OPS
+        success = True
+        # the probe is counted by the progress of the renames that follow it
+        if not staged:
+            success, moved = renameBySchedule(rest, throttle, len(tasklog))
+            tasklog.extend(moved)
+        phase.items = len(tasklog)
+
+    if staged:
+        # what is left of the schedule no longer needs to run in order
+        pairs = composePairs(rest)
+        success, moved = renameStaged(pairs, root, jobs, throttle, len(tasklog))
+        tasklog.extend(moved)
+    return success, tasklog
+
+
+def discardStages(root: str):
+    # stages emptied by an undo only hold their journal
+    for stage in findStages(root):
+        names = set(fileSystem.listdir(stage)) - {JOURNAL_NAME, STAGED_MARKER}
+        if not names:
+            removeStage(stage)
+
+
+def recoverStage(stage: str) -> list[str]:
+    with open(os.path.join(stage, JOURNAL_NAME), "r", encoding="utf-8") as file:
+        journal = json.load(file)
+    if journal.get("version") != JOURNAL_VERSION:
+        return [f"unsupported journal version in {stage}"]
+
+    # a run that staged every file is finished, otherwise it is rolled back
+    forward = fileSystem.exists(os.path.join(stage, STAGED_MARKER))
+    errors: list[str] = []
+    for i, (source, target) in enumerate(journal["entries"]):
+        staged = os.path.join(stage, getStageName(i))
+        if not fileSystem.exists(staged):
+            continue
+        destination = target if forward else source
+        if fileSystem.exists(destination):
+            errors.append(f"{destination} already exists, {staged} was kept")
+            continue
+        fileSystem.rename(staged, destination)
+
+    if not errors:
+        removeStage(stage)
+    return errors
+
+
+def recoverStages(root: str) -> tuple[int, list[str]]:
+    stages = findStages(root)
+    errors: list[str] = []
+    for stage in stages:
+        try:
+            errors.extend(recoverStage(stage))
+        except (OSError, ValueError) as err:
+            errors.append(f"could not recover {stage}: {err}")
+    return len(stages), errors
+
+
+def recoverRun(args: ArgsWrapper) -> bool:
+    root = args.source_dir.path
+    count, errors = recoverStages(root)
+    for error in errors:
+        print(f"Could not recover: {error}", file=stderr)
+    if not args.verbose_export:
+        if count == 0:
+            print("No interrupted runs were found.")
+        elif not errors:
+            print(f"Recovered {count} interrupted runs.")
+    return not errors
@@ -1,41 +1,60 @@
+from itermv.components import ArgsWrapper, profiler, progress
 from itermv.helpers import (
-    askUser,
-    createValidSchedule,
-    createValidTasklist,
+    executeSchedule,
     getArguments,
-    getFileNames,
-    printIntro,
+    prepareAppliedPlan,
+    prepareSchedule,
     printOutro,
-    printSchedule,
-    renameBySchedule,
-    undoSchedule,
+    recoverRun,
+    runClient,
+    serve,
+    splitClientArgs,
 )
 
+import sys
+import time
+
 
 def main():
+    argv = sys.argv[1:]
+    if argv[:1] == ["serve"]:
+        sys.exit(serve(argv[1:]))
+    socketPath, argv = splitClientArgs(argv)
+    if socketPath is not None:
+        sys.exit(runClient(socketPath, argv))
+
     success = False
+    wall, cpu = time.perf_counter(), time.process_time()
     args = getArguments()
-    included, ignored = getFileNames(args)
+    if args.profile is not None:
+        profiler.enable(args.profile, args.profile_dump)
+        # arguments are parsed before profiling can be enabled
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        profiler.record("arguments", wall, cpu)
+    if args.progress is not None:
+        progress.enable(args.progress)
+
+    if args.recover:
+        success = recoverRun(args)
+        profiler.report()
+        sys.exit(0 if success else 1)
 
-    printIntro(args)
+    if args.apply_plan is not None:
+        applyPlan(args)
+        profiler.report()
+        return
 
+    included, ignored, schedule, snapshot = prepareSchedule(args)
     if len(included) > 0:
-        if args.overlap:
-            schedule = createValidSchedule(included)
-        else:
-            schedule = createValidTasklist(included)
-
-        strIgnored = [(a.name, b.name) for a, b in ignored]
-        printSchedule(schedule, strIgnored, args)
-
-        if args.dry_run and askUser("Dummy prompt", args):
-            success = True
-        elif askUser("Do you want to proceed? [Y]es/[N]o: ", args):
-            success, tasklog = renameBySchedule(schedule)
-            if not success and askUser(
-                "Do you want to undo partial changes? [Y]es/[N]o: ", args
-            ):
-                undoSchedule(tasklog)
-                success = True
+        success = executeSchedule(schedule, args, snapshot=snapshot)
 
     printOutro(included, ignored, args, success)
+    profiler.report()
+
+
+def applyPlan(args: ArgsWrapper):
+    root, _, schedule = prepareAppliedPlan(args)
+    success = False
+    if schedule:
+        success = executeSchedule(schedule, args, root)
+    printOutro(schedule, [], args, success)
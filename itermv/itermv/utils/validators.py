@@ -1,3 +1,4 @@
+from os import sep
 from os.path import abspath, join, dirname, relpath
 
 
@@ -8,6 +9,13 @@ def nonNegativeNumber(arg: str):
     return value
 
 
+def positiveNumber(arg: str):
+    value = int(arg)
+    if value <= 0:
+        raise ValueError("Number must be greater than zero")
+    return value
+
+
 def positiveRadix(arg: str):
     value = int(arg)
     if value <= 1:
@@ -15,6 +23,16 @@ def positiveRadix(arg: str):
     return value
 
 
+def shardSpec(arg: str):
+    index, sep, count = arg.partition("/")
+    if not sep:
+        raise ValueError("Shard must be given as i/N")
+    index, count = int(index), int(count)
+    if count <= 0 or not 1 <= index <= count:
+        raise ValueError("Shard index must be between 1 and N")
+    return (index, count)
+
+
 def identifyCycle(
     graph: dict[str, str], visited: set[str], seed: str
 ) -> tuple[str | None, str | None]:
@@ -43,6 +61,15 @@ def isTopLevelPath(dir: str, file: str):
     return relpath(parent_dir, dir_abs) == "."
 
 
+def isWithinPath(dir: str, file: str):
+    dir_abs = abspath(dir)
+    file_abs = abspath(join(dir_abs, file))
+
+    rel = relpath(file_abs, dir_abs)
+
+    return rel != "." and rel != ".." and not rel.startswith(f"..{sep}")
+
+
 def validateFilename(name: str) -> None:
     # this was used as reference
     # https://stackoverflow.com/a/31976060
@@ -8,7 +8,7 @@ with open(os.path.join(os.path.dirname(__file__), "itermv/version.py")) as f:
 setup(
     name="itermv",
     version=version["__version__"],
-    packages=find_packages(exclude="test"),
+    packages=find_packages(exclude=["test", "benchmarks", "benchmarks.*"]),
     install_requires=[],
     entry_points={
         "console_scripts": [
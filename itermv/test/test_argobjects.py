@@ -0,0 +1,31 @@
+import re
+import unittest
+
+from itermv.components import RuleSet
+
+
+class RuleSetTest(unittest.TestCase):
+    def test_rules_share_group_names(self):
+        rules = RuleSet(
+            [
+                (r"^(?P<base>\d+)-(?P=base)$", "{base}"),
+                (r"(?P<base>[a-z]+)(?(base)\.txt|x)$", "{base}"),
+                (r"(?P<base>.+)", "{base}"),
+            ]
+        )
+        self.assertEqual(rules.dispatch("12-12"), 0)
+        self.assertEqual(rules.dispatch("note.txt"), 1)
+        self.assertEqual(rules.dispatch("12-13"), 2)
+        regex, _ = list(rules)[0]
+        self.assertEqual(regex.match("7-7").group("base"), "7")
+
+    def test_escaped_groups_are_kept(self):
+        regex = r"\(?P<base>x\)|\\(?P<base>y)"
+        self.assertEqual(
+            RuleSet.localizeGroups(regex, 2), r"\(?P<base>x\)|\\(?P<_r2_base>y)"
+        )
+        re.compile(RuleSet.localizeGroups(regex, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
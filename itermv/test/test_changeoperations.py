@@ -0,0 +1,87 @@
+import os
+import time
+import tempfile
+import unittest
+
+from itermv.components import FileEntry, NewFile
+from itermv.helpers.changeoperations import PlanSnapshot, detectChanges, replanSchedule
+from itermv.helpers.fileoperations import (
+    createValidSchedule,
+    createValidTasklist,
+    renameBySchedule,
+)
+
+
+class ReplanTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="itermv-test-")
+        self.folder = self.__temp.name
+
+    def tearDown(self):
+        self.__temp.cleanup()
+
+    def getPath(self, *names):
+        return os.path.join(self.folder, *names)
+
+    def writeFiles(self, *names):
+        for name in names:
+            with open(self.getPath(name), "w") as file:
+                file.write(name)
+
+    def readFiles(self):
+        contents = {}
+        for name in os.listdir(self.folder):
+            with open(self.getPath(name)) as file:
+                contents[name] = file.read()
+        return contents
+
+    def plan(self, pairs, planner):
+        included = [
+            (FileEntry(a, self.folder), NewFile(self.getPath(*b.split("/"))))
+            for a, b in pairs
+        ]
+        schedule = planner(included)
+        snapshot = PlanSnapshot(included, schedule, time.time_ns())
+        # later changes must not share the timestamp of the snapshot
+        time.sleep(0.01)
+        return snapshot, schedule
+
+    def test_cycle_borrowing_a_chain_name(self):
+        # the cycle c <-> d uses the name freed by a -> b as its temporary name
+        self.writeFiles("a", "c", "d")
+        pairs = [("a", "b"), ("c", "d"), ("d", "c")]
+        snapshot, schedule = self.plan(pairs, createValidSchedule)
+        self.assertIn((self.getPath("a"), self.getPath("c")), schedule)
+        self.writeFiles("b")
+
+        changes = detectChanges(snapshot)
+        self.assertEqual(changes.occupied, {self.getPath("b")})
+        schedule, skipped, replanned, dropped = replanSchedule(
+            snapshot, schedule, changes, createValidSchedule
+        )
+        self.assertEqual([f.name for f, _ in skipped], ["a"])
+        self.assertEqual((replanned, dropped), (1, 0))
+
+        success, _ = renameBySchedule(schedule)
+        self.assertTrue(success)
+        self.assertEqual(self.readFiles(), {"a": "a", "b": "b", "c": "d", "d": "c"})
+
+    def test_folder_replaced_by_file(self):
+        self.writeFiles("a", "b")
+        pairs = [("a", "sub/a"), ("b", "sub/b")]
+        snapshot, schedule = self.plan(pairs, createValidTasklist)
+        self.writeFiles("sub")
+
+        changes = detectChanges(snapshot)
+        targets = {self.getPath("sub", "a"), self.getPath("sub", "b")}
+        self.assertEqual(changes.occupied, targets)
+        schedule, skipped, replanned, dropped = replanSchedule(
+            snapshot, schedule, changes, createValidTasklist
+        )
+        self.assertEqual(schedule, [])
+        self.assertEqual(len(skipped), 2)
+        self.assertEqual((replanned, dropped), (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
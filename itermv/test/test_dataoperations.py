@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+from itermv.components import FileEntry, SortingOptions
+from itermv.helpers.dataoperations import getSortKey, selectEntries
+
+
+class SelectTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="itermv-test-")
+        self.folder = self.__temp.name
+
+    def tearDown(self):
+        self.__temp.cleanup()
+
+    def test_ties_are_broken_by_name(self):
+        names = ["d", "b", "e", "a", "c"]
+        for name in names:
+            path = os.path.join(self.folder, name)
+            with open(path, "w"):
+                pass
+            os.utime(path, ns=(0, 1_000_000_000))
+        files = [FileEntry(name, self.folder) for name in names]
+        key = getSortKey(SortingOptions("mtime"))
+        ordered = [f.name for f in selectEntries(files, key, False)]
+        self.assertEqual(ordered, sorted(names))
+        limited = [f.name for f in selectEntries(files, key, True, 1, 2)]
+        self.assertEqual(limited, ["d", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+from itermv.helpers.fileoperations import ensureParents, removeDirectories
+
+
+class ParentsTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="itermv-test-")
+        self.folder = self.__temp.name
+
+    def tearDown(self):
+        self.__temp.cleanup()
+
+    def getPath(self, *names):
+        return os.path.join(self.folder, *names)
+
+    def test_created_folders_are_removed(self):
+        schedule = [("a", self.getPath("x", "y", "a")), ("b", self.getPath("x", "b"))]
+        created = ensureParents(schedule, self.folder)
+        self.assertEqual(created, [self.getPath("x"), self.getPath("x", "y")])
+        removeDirectories(created)
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_failed_mkdir_leaves_nothing_behind(self):
+        with open(self.getPath("sub"), "w"):
+            pass
+        schedule = [("a", self.getPath("x", "a")), ("b", self.getPath("sub", "y", "b"))]
+        with self.assertRaises(OSError):
+            ensureParents(schedule, self.folder)
+        self.assertEqual(os.listdir(self.folder), ["sub"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from itermv.main import main
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="itermv-test-")
+        self.folder = self.__temp.name
+
+    def tearDown(self):
+        self.__temp.cleanup()
+
+    def getPath(self, *names):
+        return os.path.join(self.folder, *names)
+
+    def writeFiles(self, *names):
+        for name in names:
+            with open(self.getPath(name), "w") as file:
+                file.write(name)
+
+    def runMain(self, *args):
+        argv = ["itermv", "-q", "-i", self.folder, *args]
+        with mock.patch.object(sys, "argv", argv):
+            with mock.patch("sys.stdout"), mock.patch("sys.stderr") as stderr:
+                main()
+        return stderr
+
+    def test_fan_out_into_a_file(self):
+        self.writeFiles("a", "b", "sub")
+        with self.assertRaises(SystemExit) as caught:
+            self.runMain("-R", "^[ab]$", "--fan-out", "-p", "sub/{name}{ext}")
+        self.assertEqual(caught.exception.code, 2)
+        self.assertEqual(sorted(os.listdir(self.folder)), ["a", "b", "sub"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from benchmarks.datasets import (
+    getRanges,
+    getScratchRoot,
+    writeCompactPdf,
+    writeSyntheticPdf,
+)
+from snipdf.main import (
+    ENGINE_GS,
+    ENGINE_NATIVE,
+    GS_NAME,
+    PDFTK_NAME,
+    Params,
+    expandRange,
+    getGsVersion,
+)
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+from argparse import ArgumentParser
+
+
+def getArguments():
+    parser = ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks the extraction paths of snipdf on a synthetic PDF.",
+    )
+    parser.add_argument("--pages", type=int, default=1_000, metavar="N")
+    parser.add_argument("--ranges", type=int, default=50, metavar="N")
+    parser.add_argument("--repeat", type=int, default=3, metavar="N")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="Concurrent gs processes of the parallel multi-process case.",
+    )
+    parser.add_argument(
+        "--root",
+        default=None,
+        metavar="DIR",
+        help="Where the document is generated (/dev/shm when available).",
+    )
+    return parser.parse_args()
+
+
+def timeBuild(fin, fout, ranges, singlePass, repeat, jobs=1, engine=ENGINE_GS):
+    best = None
+    for _ in range(repeat):
+        pageRanges = [expandRange(r) for r in ranges]
+        params = Params(fin, fout, pageRanges, jobs, engine)
+        start = time.perf_counter()
+        # the progress messages of snipdf are not part of the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            params.buildPDF(singlePass)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        os.remove(fout)
+    return best
+
+
+def benchGs(fin, fout, ranges, args):
+    missing = [n for n in (GS_NAME, PDFTK_NAME) if shutil.which(n) is None]
+    if missing:
+        print(f"    {', '.join(missing)} must be installed to time the gs engine")
+        return
+    multi = timeBuild(fin, fout, ranges, False, args.repeat)
+    print(f"    gs multi-process  {multi:8.3f} s")
+    parallel = timeBuild(fin, fout, ranges, False, args.repeat, args.jobs)
+    speedup = multi / parallel
+    print(f"    gs {args.jobs:2d} jobs        {parallel:8.3f} s  ({speedup:.1f}x)")
+    single = timeBuild(fin, fout, ranges, True, args.repeat)
+    print(f"    gs single pass    {single:8.3f} s  ({multi / single:.1f}x)")
+
+
+def main():
+    args = getArguments()
+    workdir = tempfile.mkdtemp(prefix="snipdf-bench-", dir=getScratchRoot(args.root))
+    try:
+        ranges = getRanges(args.pages, args.ranges)
+        if shutil.which(GS_NAME) is not None:
+            print(f"gs {'.'.join(str(v) for v in getGsVersion() or ('?',))}")
+        fout = os.path.join(workdir, "output.pdf")
+        layouts = [("plain", writeSyntheticPdf), ("compact", writeCompactPdf)]
+        for layout, writePdf in layouts:
+            fin = writePdf(os.path.join(workdir, f"{layout}.pdf"), args.pages)
+            print(f"{layout}: {args.pages} pages, {len(ranges)} ranges")
+            benchGs(fin, fout, ranges, args)
+            native = timeBuild(fin, fout, ranges, True, args.repeat, 1, ENGINE_NATIVE)
+            print(f"    native            {native:8.3f} s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import os
+import zlib
+import tempfile
+
+FONT = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+
+def getScratchRoot(root=None):
+    # tmpfs keeps the disk out of the measurements when it is available
+    if root is not None:
+        return root
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def getPageContent(number):
+    text = f"BT /F1 48 Tf 72 700 Td (Page {number}) Tj ET\n" * 4
+    return text.encode()
+
+
+def writeSyntheticPdf(path, pageCount):
+    # objects 1-3 are the catalog, the page tree and the font, then every
+    # page is followed by its content stream
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        FONT,
+    ]
+    kids = []
+    for number in range(1, pageCount + 1):
+        pageId = len(objects) + 1
+        content = getPageContent(number)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            + b"/Resources << /Font << /F1 3 0 R >> >> "
+            + f"/Contents {pageId + 1} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(content)} >>\nstream\n".encode()
+            + content
+            + b"\nendstream"
+        )
+        kids.append(f"{pageId} 0 R")
+    pageTree = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pageCount} >>"
+    objects[1] = pageTree.encode()
+
+    offsets = []
+    with open(path, "wb") as file:
+        file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for number, body in enumerate(objects, 1):
+            offsets.append(file.tell())
+            file.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref = file.tell()
+        file.write(f"xref\n0 {len(objects) + 1}\n".encode())
+        file.write(b"0000000000 65535 f \n")
+        for offset in offsets:
+            file.write(f"{offset:010d} 00000 n \n".encode())
+        file.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n".encode()
+            + f"startxref\n{xref}\n%%EOF\n".encode()
+        )
+    return path
+
+
+def getRanges(pageCount, rangeCount):
+    # ascending ranges that cover half of the document
+    step = max(2, pageCount // rangeCount)
+    width = max(1, step // 2)
+    starts = range(1, pageCount + 1, step)
+    return [f"{s}-{min(s + width - 1, pageCount)}" for s in starts][:rangeCount]
+
+
+def writeCompactPdf(path, pageCount, fanOut=10):
+    # the layout of modern writers: a nested page tree whose nodes carry the
+    # inherited resources, pages and nodes packed into a compressed object
+    # stream, deflated contents and a predicted cross-reference stream
+    plain = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: FONT}
+    packed = {}
+    nextNum = 4
+
+    def addNode(numbers, parent, num):
+        nonlocal nextNum
+        kids = []
+        if len(numbers) <= fanOut:
+            for number in numbers:
+                pageNum, contentNum = nextNum, nextNum + 1
+                nextNum += 2
+                content = zlib.compress(getPageContent(number))
+                plain[contentNum] = (
+                    f"<< /Length {len(content)} /Filter /FlateDecode >>\n".encode()
+                    + b"stream\n"
+                    + content
+                    + b"\nendstream"
+                )
+                packed[pageNum] = (
+                    f"<< /Type /Page /Parent {num} 0 R /Contents {contentNum} 0 R >>"
+                ).encode()
+                kids.append(pageNum)
+        else:
+            size = -(-len(numbers) // fanOut)
+            for start in range(0, len(numbers), size):
+                kidNum = nextNum
+                nextNum += 1
+                addNode(numbers[start : start + size], num, kidNum)
+                kids.append(kidNum)
+        refs = " ".join(f"{k} 0 R" for k in kids)
+        node = f"<< /Type /Pages /Kids [{refs}] /Count {len(numbers)}"
+        if parent is None:
+            node += " /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >>"
+        else:
+            node += f" /Parent {parent} 0 R"
+        packed[num] = (node + " >>").encode()
+
+    addNode(list(range(1, pageCount + 1)), None, 2)
+
+    stmNum = nextNum
+    xrefNum = nextNum + 1
+    offsets = []
+    body = b""
+    for num, value in packed.items():
+        offsets.append(len(body))
+        body += value + b"\n"
+    header = b" ".join(f"{n} {o}".encode() for n, o in zip(packed, offsets)) + b"\n"
+    data = zlib.compress(header + body)
+    plain[stmNum] = (
+        f"<< /Type /ObjStm /N {len(packed)} /First {len(header)} "
+        + f"/Length {len(data)} /Filter /FlateDecode >>\nstream\n"
+    ).encode() + data + b"\nendstream"
+
+    entries = {0: (0, 0, 65535)}
+    index = {num: i for i, num in enumerate(packed)}
+    with open(path, "wb") as file:
+        file.write(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+        for num, body in sorted(plain.items()):
+            entries[num] = (1, file.tell(), 0)
+            file.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+        for num in packed:
+            entries[num] = (2, stmNum, index[num])
+        entries[xrefNum] = (1, file.tell(), 0)
+
+        # rows use the PNG up predictor, like most writers do
+        rows = []
+        previous = bytes(7)
+        for num in range(xrefNum + 1):
+            kind, field, gen = entries[num]
+            row = bytes([kind]) + field.to_bytes(4, "big") + gen.to_bytes(2, "big")
+            rows.append(b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, previous)))
+            previous = row
+        data = zlib.compress(b"".join(rows))
+        file.write(
+            f"{xrefNum} 0 obj\n<< /Type /XRef /Size {xrefNum + 1} /W [1 4 2] "
+            f"/Root 1 0 R /Length {len(data)} /Filter /FlateDecode "
+            "/DecodeParms << /Predictor 12 /Columns 7 >> >>\nstream\n".encode()
+            + data
+            + f"\nendstream\nendobj\nstartxref\n{entries[xrefNum][1]}\n%%EOF\n".encode()
+        )
+    return path
@@ -1,47 +1,75 @@
 import os
 import re
+import sys
 import platform
 from argparse import ArgumentParser
 import subprocess as subp
 import random
+import shutil
+import tempfile
+from functools import cache
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from snipdf.pdfengine import PdfError, extractPages
 from snipdf.version import __version__
 
 # TODO: add ghostscript and pdftk as dependencies instead of relying on
 # the system installed libraries
 GS_NAME = "gswin64c" if platform.system() == "Windows" else "gs"
 PDFTK_NAME = "pdftk"
+# first release whose pdfwrite device honors -sPageList for PDF input
+PAGELIST_VERSION = (9, 20)
+ENGINE_GS = "gs"
+ENGINE_NATIVE = "native"
+# output name that streams the final pdf to stdout
+STDOUT_NAME = "-"
 
 
 def main():
-    params = Params(*perpareParams(*getParams()))
-    params.buildPDF()
-
-
-def findFreeName(name, ext):
-    nameout = os.path.join(".", f"{name}.{ext}")
-    if not os.path.exists(nameout):
-        return nameout
-
-    i = 1
-    nameout = os.path.join(".", f"{name}-{i}.{ext}")
-    while os.path.exists(nameout) and i <= 10:
-        i += 1
-        nameout = os.path.join(".", f"{name}-{i}.{ext}")
-
-    if i <= 10:
+    try:
+        params = Params(*perpareParams(*getParams()))
+    except ValueError as err:
+        raise SystemExit(f"snipdf: error: {err}")
+    try:
+        params.buildPDF()
+    except PdfError as err:
+        raise SystemExit(f"snipdf: error: {err}")
+    except OSError as err:
+        if err.filename is None:
+            raise SystemExit(f"snipdf: error: {err}")
+        raise SystemExit(f"snipdf: error: {err.filename}: {err.strerror}")
+
+
+def reserveName(name, ext, folder="."):
+    # the name is taken by creating the file, so concurrent runs never pick
+    # the same one and no name is probed twice
+    candidates = [f"{name}.{ext}"]
+    candidates += [f"{name}-{i}.{ext}" for i in range(1, 11)]
+    candidates += [
+        f"{name}-{random.randrange(100_000, 1_000_000)}.{ext}" for _ in range(90)
+    ]
+    for candidate in candidates:
+        nameout = os.path.join(folder, candidate)
+        try:
+            os.close(os.open(nameout, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            continue
         return nameout
 
-    rnum = random.randrange(100_000, 1_000_000)
-    nameout = os.path.join(".", f"{name}-{rnum}.{ext}")
-    while i > 10 and i <= 100 and os.path.exists(nameout):
-        rnum = random.randrange(100_000, 1_000_000)
-        nameout = os.path.join(".", f"{name}-{rnum}.{ext}")
+    raise FileTakenError("Too many attempts to find a filename.", candidates)
 
-    if i > 100:
-        raise FileTakenError("Too many attempts to find a filename.")
 
-    return nameout
+@cache
+def getGsVersion():
+    try:
+        output = subp.check_output([GS_NAME, "--version"], text=True)
+    except (OSError, subp.SubprocessError):
+        return None
+    versionMatch = re.match(r"(\d+)\.(\d+)", output.strip())
+    if versionMatch is None:
+        return None
+    return tuple(int(x) for x in versionMatch.groups())
 
 
 def getParams():
@@ -67,11 +95,47 @@ def getParams():
         "--output",
         nargs=1,
         metavar="OUTPUT",
-        help="filename of the output. If ommited untitled-? is used.",
+        help="filename of the output. If ommited untitled-? is used. Use - to write "
+        + "the pdf to stdout.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        nargs=1,
+        type=int,
+        metavar="N",
+        help="number of ranges extracted at the same time when they cannot be "
+        + "extracted in a single pass (1 is default).",
+    )
+    parser.add_argument(
+        "-t",
+        "--temp-dir",
+        nargs=1,
+        metavar="DIR",
+        help="where intermediate files are kept when ranges are extracted one by "
+        + "one, e.g. a tmpfs such as /dev/shm (the system temporary directory is "
+        + "default).",
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        nargs=1,
+        choices=[ENGINE_GS, ENGINE_NATIVE],
+        help="gs re-renders the pages with Ghostscript (default). native copies "
+        + "the pages and what they use as they are, without external programs.",
     )
     args = parser.parse_args()
-
-    return (args.input, args.output, args.page_ranges)
+    if args.jobs is not None and args.jobs[0] < 1:
+        parser.error("--jobs must be at least 1")
+
+    return (
+        args.input,
+        args.output,
+        args.page_ranges,
+        args.jobs,
+        args.engine,
+        args.temp_dir,
+    )
 
 
 def expandRange(text):
@@ -87,13 +151,62 @@ def expandRange(text):
     return tuple([int(x) for x in (numGroups)])
 
 
-def perpareParams(fin, fout, ranges):
+def perpareParams(fin, fout, ranges, jobs, engine, tempRoot):
     # fin cannot be none since it is required arg
     fin = fin[0]
-    fout = findFreeName("untitled", "pdf") if fout is None else fout[0]
     # ranges cannot be none since it is required arg
     ranges = [expandRange(r) for r in ranges]
-    return (fin, fout, ranges)
+    # PageRange rejects ranges that end before they start
+    for pages in ranges:
+        PageRange(*pages)
+    jobs = 1 if jobs is None else jobs[0]
+    engine = ENGINE_GS if engine is None else engine[0]
+    tempRoot = None if tempRoot is None else tempRoot[0]
+    # names are only reserved once the arguments are known to be valid
+    reserved = fout is None
+    fout = reserveName("untitled", "pdf") if fout is None else fout[0]
+    return (fin, fout, ranges, jobs, engine, tempRoot, reserved)
+
+
+def runWorkers(commands, jobs):
+    # commands are (arguments, environment) pairs; the first failure stops
+    # the queue and terminates every process that is still running
+    lock = Lock()
+    failed = Event()
+    processes = set()
+
+    def stop():
+        # returns whether this was the first failure
+        with lock:
+            first = not failed.is_set()
+            failed.set()
+            for proc in processes:
+                proc.terminate()
+        return first
+
+    def run(command, env):
+        with lock:
+            if failed.is_set():
+                return
+            proc = subp.Popen(command, env=env)
+            processes.add(proc)
+        code = proc.wait()
+        with lock:
+            processes.discard(proc)
+        # processes terminated by stop are not reported as failures
+        if code != 0 and stop():
+            raise subp.CalledProcessError(code, command)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run, *command) for command in commands]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            stop()
+            for future in futures:
+                future.cancel()
+            raise
 
 
 class FileTakenError(Exception):
@@ -122,28 +235,83 @@ class PageRange:
         return range(self.__start, self.__end + 1)
 
     def __str__(self):
+        if self.__start == self.__end:
+            return f"{self.__start}"
         return f"{self.__start}-{self.__end}"
 
 
 class Params:
-    def __init__(self, infile, outfile, pageRanges):
+    def __init__(
+        self,
+        infile,
+        outfile,
+        pageRanges,
+        jobs=1,
+        engine=ENGINE_GS,
+        tempRoot=None,
+        reserved=False,
+    ):
         self.__infile = infile
         self.__outfile = outfile
         self.__pranges = [PageRange(*pr) for pr in pageRanges]
+        self.__jobs = jobs
+        self.__engine = engine
+        self.__tempRoot = tempRoot
+        self.__reserved = reserved
+
+    def log(self, message):
+        # stdout belongs to the pdf when it is streamed
+        stream = sys.stderr if self.__outfile == STDOUT_NAME else sys.stdout
+        print(message, file=stream)
+
+    def isSinglePass(self):
+        # older versions ignore the page list or print pages in document
+        # order, so only ascending ranges that do not overlap are passed
+        version = getGsVersion()
+        if version is None or version < PAGELIST_VERSION:
+            return False
+        pairs = zip(self.__pranges, self.__pranges[1:])
+        return all(prev.end() < curr.start() for prev, curr in pairs)
+
+    def getPageList(self):
+        return ",".join(str(pages) for pages in self.__pranges)
+
+    def buildPDF(self, allowSinglePass=True):
+        try:
+            self.__build(allowSinglePass)
+        except BaseException:
+            # a reserved name is released when nothing was written to it
+            if self.__reserved:
+                os.remove(self.__outfile)
+            raise
+
+    def __build(self, allowSinglePass):
+        if self.__engine == ENGINE_NATIVE:
+            self.log("\ncreating final pdf...")
+            ranges = [(pages.start(), pages.end()) for pages in self.__pranges]
+            if self.__outfile == STDOUT_NAME:
+                extractPages(self.__infile, ranges, sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+            else:
+                with open(self.__outfile, "wb") as file:
+                    extractPages(self.__infile, ranges, file)
+            return
 
-    def buildPDF(self):
-        GS = lambda start, end, fin, fout: [
+        GS = lambda pageOpts, fin, fout: [
             GS_NAME,
             "-sDEVICE=pdfwrite",
             "-dCompatibilityLevel=1.4",
             "-dNOPAUSE",
             "-dQUIET",
             "-dBATCH",
-            f"-dFirstPage={start}",
-            f"-dLastPage={end}",
-            f'-sOutputFile="{fout}"',
+            *pageOpts,
+            f"-sOutputFile={fout}",
             fin,
         ]
+        RANGE = lambda pages: [
+            f"-dFirstPage={pages.start()}",
+            f"-dLastPage={pages.end()}",
+        ]
         PDFTK = lambda ifiles, fout: [
             PDFTK_NAME,
             *([os.path.abspath(f) for f in ifiles]),
@@ -153,33 +321,41 @@ class Params:
         ]
 
         if len(self.__pranges) == 1:
-            print("\ncreating final pdf...")
+            self.log("\ncreating final pdf...")
             pages = self.__pranges[0]
-            subp.check_call(
-                GS(pages.start(), pages.end(), self.__infile, self.__outfile)
-            )
+            subp.check_call(GS(RANGE(pages), self.__infile, self.__outfile))
+            return
+
+        if allowSinglePass and self.isSinglePass():
+            # the input is parsed once and the output is written once
+            self.log("\ncreating final pdf...")
+            pageList = [f"-sPageList={self.getPageList()}"]
+            subp.check_call(GS(pageList, self.__infile, self.__outfile))
             return
 
+        # every range gets a folder of its own, which is also where its gs
+        # process keeps its temporary files
+        tempdir = tempfile.mkdtemp(prefix="snipdf-", dir=self.__tempRoot)
         midfiles = []
+        commands = []
+        for i, pages in enumerate(self.__pranges):
+            workdir = os.path.join(tempdir, str(i))
+            os.mkdir(workdir)
+            env = {**os.environ, "TMPDIR": workdir, "TEMP": workdir}
+            midfiles.append(os.path.join(workdir, "range.pdf"))
+            commands.append((GS(RANGE(pages), self.__infile, midfiles[-1]), env))
 
         try:
-            print("\ncreating page ranges...")
-            for pages in self.__pranges:
-                fname = findFreeName("temp", "pdf")
-                subp.check_call(GS(pages.start(), pages.end(), self.__infile, fname))
-                print(f"\t{fname} file created")
-                midfiles.append(fname)
+            self.log(f"\ncreating {len(commands)} page ranges...")
+            runWorkers(commands, self.__jobs)
 
             # https://stackoverflow.com/a/8159842
-            print("\ncreating final pdf...")
+            # files are merged in the order of the ranges, not of completion
+            self.log("\ncreating final pdf...")
             subp.check_call(PDFTK(midfiles, self.__outfile))
-        except subp.SubprocessError as err:
-            raise err
         finally:
-            print("\nclearing temp files...")
-            for midfile in midfiles:
-                os.remove(midfile)
-                print(f"\t{midfile} file deleted")
+            self.log("\nclearing temp files...")
+            shutil.rmtree(tempdir, ignore_errors=True)
 
     def __str__(self):
         return f"{self.__infile}\n{self.__outfile}\n{self.__pranges}"
@@ -0,0 +1,680 @@
+import re
+import mmap
+import zlib
+from collections import namedtuple
+
+# page attributes that a page inherits from the nodes of the page tree
+INHERITED_KEYS = ("Resources", "MediaBox", "CropBox", "Rotate")
+# bytes searched from the end of the file for startxref
+TAIL_SIZE = 4096
+
+DELIMITERS = b"()<>[]{}/%"
+
+TOKEN_RE = re.compile(
+    rb"""
+    (?P<num>[+-]?(?:\d+\.?\d*|\.\d+))
+    |(?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+    |(?P<dopen><<)|(?P<dclose>>>)
+    |(?P<aopen>\[)|(?P<aclose>\])
+    |(?P<hex><[^>]*>)
+    |(?P<lit>\()
+    |(?P<kw>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)
+    """,
+    re.VERBOSE,
+)
+SKIP_RE = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*")
+OBJ_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+REF_RE = re.compile(rb"\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+XREF_ENTRY_RE = re.compile(rb"\s*(\d{10})\s(\d{5})\s([nf])")
+NAME_ESCAPE_RE = re.compile(rb"#([0-9A-Fa-f]{2})")
+LITERAL_ESCAPES = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+}
+
+Ref = namedtuple("Ref", ["num", "gen"])
+
+
+class PdfError(Exception):
+    pass
+
+
+class Name(str):
+    pass
+
+
+class Real(bytes):
+    # reals are only copied, so their text is kept as it was written
+    pass
+
+
+class Keyword(bytes):
+    pass
+
+
+class NewRef(int):
+    # a reference to an object that only exists in the output
+    pass
+
+
+class Stream:
+    def __init__(self, info, data):
+        self.info = info
+        self.data = data
+
+
+def decodeName(token):
+    text = NAME_ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 16)]), token[1:])
+    return Name(text.decode("latin-1"))
+
+
+def decodeHex(token):
+    digits = re.sub(rb"[^0-9A-Fa-f]", b"", token[1:-1])
+    if len(digits) % 2:
+        digits += b"0"
+    return bytes.fromhex(digits.decode())
+
+
+def readLiteral(buffer, pos):
+    # pos is right after the opening parenthesis
+    out = bytearray()
+    depth = 1
+    while True:
+        char = buffer[pos]
+        pos += 1
+        if char == 0x5C:  # backslash
+            code = buffer[pos]
+            pos += 1
+            if code in LITERAL_ESCAPES:
+                out += LITERAL_ESCAPES[code]
+            elif 0x30 <= code <= 0x37:
+                digits = bytes([code])
+                while len(digits) < 3 and 0x30 <= buffer[pos] <= 0x37:
+                    digits += bytes([buffer[pos]])
+                    pos += 1
+                out.append(int(digits, 8) & 0xFF)
+            elif code == 0x0D:
+                # a backslash at the end of a line continues the string
+                if buffer[pos] == 0x0A:
+                    pos += 1
+            elif code != 0x0A:
+                out.append(code)
+            continue
+        if char == 0x28:
+            depth += 1
+        elif char == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos
+        out.append(char)
+
+
+class Parser:
+    # parses PDF objects from any bytes-like buffer, the input mmap included
+    def __init__(self, buffer):
+        self.__buffer = buffer
+
+    def token(self, pos):
+        pos = SKIP_RE.match(self.__buffer, pos).end()
+        match = TOKEN_RE.match(self.__buffer, pos)
+        if match is None:
+            raise PdfError(f"unexpected data at offset {pos}")
+        return match, match.end()
+
+    def parse(self, pos):
+        match, pos = self.token(pos)
+        kind = match.lastgroup
+        token = match.group()
+        if kind == "num":
+            if b"." in token:
+                return Real(token), pos
+            # integers followed by a generation and R are references
+            value = int(token)
+            ahead = self.__reference(pos)
+            if ahead is not None:
+                gen, pos = ahead
+                return Ref(value, gen), pos
+            return value, pos
+        if kind == "name":
+            return decodeName(token), pos
+        if kind == "dopen":
+            return self.__dictionary(pos)
+        if kind == "aopen":
+            items = []
+            while True:
+                match, after = self.token(pos)
+                if match.lastgroup == "aclose":
+                    return items, after
+                item, pos = self.parse(pos)
+                items.append(item)
+        if kind == "hex":
+            return decodeHex(token), pos
+        if kind == "lit":
+            return readLiteral(self.__buffer, pos)
+        if token == b"true" or token == b"false":
+            return token == b"true", pos
+        if token == b"null":
+            return None, pos
+        return Keyword(token), pos
+
+    def __reference(self, pos):
+        found = REF_RE.match(self.__buffer, pos)
+        if found is None:
+            return None
+        return int(found.group(1)), found.end()
+
+    def __dictionary(self, pos):
+        entries = {}
+        while True:
+            match, after = self.token(pos)
+            if match.lastgroup == "dclose":
+                return entries, after
+            if match.lastgroup != "name":
+                raise PdfError(f"dictionary key expected at offset {pos}")
+            key = decodeName(match.group())
+            entries[key], pos = self.parse(after)
+
+
+class PdfReader:
+    # objects are parsed on demand straight from the mapped file
+    def __init__(self, path):
+        self.__file = open(path, "rb")
+        try:
+            fileno = self.__file.fileno()
+            self.__buffer = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise PdfError(f"{path} is empty")
+        self.__parser = Parser(self.__buffer)
+        self.__objects = {}
+        self.__streams = {}
+        self.__xref = {}
+        self.__trailer = {}
+        self.__rebuilt = False
+        header = re.match(rb"%PDF-(\d\.\d)", self.__buffer[:1024].lstrip())
+        self.__version = header.group(1).decode() if header else "1.4"
+
+        try:
+            self.__readXref()
+        except (PdfError, ValueError, IndexError, zlib.error):
+            # broken offsets are common, the objects are found by scanning
+            self.__rebuildXref()
+        if "Encrypt" in self.__trailer:
+            raise PdfError("encrypted documents are not supported")
+        if "Root" not in self.__trailer:
+            raise PdfError("the document has no catalog")
+
+    def close(self):
+        self.__objects.clear()
+        self.__streams.clear()
+        self.__buffer.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def trailer(self):
+        return self.__trailer
+
+    def __readXref(self):
+        tail = self.__buffer[-TAIL_SIZE:]
+        found = tail.rfind(b"startxref")
+        if found < 0:
+            raise PdfError("startxref not found")
+        offset = int(tail[found + 9 :].split()[0])
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            offset = self.__readSection(offset)
+
+    def __readSection(self, offset):
+        # newer sections come first, so entries already known are kept
+        pos = SKIP_RE.match(self.__buffer, offset).end()
+        entries = {}
+        if self.__buffer[pos : pos + 4] == b"xref":
+            trailer = self.__readTable(pos + 4, entries)
+            if "XRefStm" in trailer:
+                # hybrid files list compressed objects as free in the table
+                hidden = {}
+                self.__readStreamSection(trailer["XRefStm"], hidden)
+                for num, entry in hidden.items():
+                    if entries.get(num, (0, 0))[0] == 0:
+                        entries[num] = entry
+        else:
+            trailer = self.__readStreamSection(pos, entries)
+        for num, entry in entries.items():
+            self.__xref.setdefault(num, entry)
+        for key, value in trailer.items():
+            self.__trailer.setdefault(key, value)
+        return trailer.get("Prev")
+
+    def __readTable(self, pos, entries):
+        while True:
+            match, after = self.__parser.token(pos)
+            if match.group() == b"trailer":
+                trailer, _ = self.__parser.parse(after)
+                return trailer
+            start = int(match.group())
+            match, pos = self.__parser.token(after)
+            for num in range(start, start + int(match.group())):
+                entry = XREF_ENTRY_RE.match(self.__buffer, pos)
+                if entry is None:
+                    raise PdfError(f"invalid xref entry at offset {pos}")
+                pos = entry.end()
+                if entry.group(3) == b"n":
+                    entries.setdefault(num, (1, int(entry.group(1))))
+                else:
+                    entries.setdefault(num, (0, 0))
+
+    def __readStreamSection(self, pos, entries):
+        _, value = self.__readIndirect(pos)
+        if not isinstance(value, Stream):
+            raise PdfError(f"xref stream expected at offset {pos}")
+        info = value.info
+        data = self.decode(value)
+        widths = info["W"]
+        index = info.get("Index", [0, info["Size"]])
+        rowSize = sum(widths)
+        row = 0
+        for start, count in zip(index[::2], index[1::2]):
+            for num in range(start, start + count):
+                fields = []
+                at = row * rowSize
+                for width in widths:
+                    fields.append(int.from_bytes(data[at : at + width], "big"))
+                    at += width
+                row += 1
+                # a missing type field defaults to 1
+                kind = fields[0] if widths[0] else 1
+                if kind in (1, 2):
+                    entries.setdefault(num, (kind, fields[1], fields[2]))
+                else:
+                    entries.setdefault(num, (0, 0))
+        return {k: v for k, v in info.items() if k not in ("Length", "Filter")}
+
+    def __rebuildXref(self):
+        self.__rebuilt = True
+        self.__xref.clear()
+        self.__trailer.clear()
+        self.__objects.clear()
+        self.__streams.clear()
+        for match in OBJ_RE.finditer(self.__buffer):
+            # later definitions of an object replace earlier ones
+            self.__xref[int(match.group(1))] = (1, match.start())
+        for match in re.finditer(rb"trailer\s*<<", self.__buffer):
+            trailer, _ = self.__parser.parse(match.end() - 2)
+            self.__trailer.update(trailer)
+        hasObjStm = self.__buffer.find(b"/ObjStm") >= 0
+        if "Root" in self.__trailer and not hasObjStm:
+            return
+        for num in list(self.__xref):
+            try:
+                value = self.get(num)
+            except PdfError:
+                continue
+            if isinstance(value, Stream) and value.info.get("Type") == "ObjStm":
+                # objects packed in a stream are only found through it
+                self.__readCompressed(num, 0)
+                _, offsets = self.__streams[num]
+                for index, (inner, _) in enumerate(offsets):
+                    self.__xref.setdefault(inner, (2, num, index))
+            elif isinstance(value, Stream) and value.info.get("Type") == "XRef":
+                for key, item in value.info.items():
+                    self.__trailer.setdefault(key, item)
+            elif isinstance(value, dict) and value.get("Type") == "Catalog":
+                self.__trailer.setdefault("Root", Ref(num, 0))
+
+    def __readIndirect(self, pos):
+        match = OBJ_RE.match(self.__buffer, SKIP_RE.match(self.__buffer, pos).end())
+        if match is None:
+            raise PdfError(f"object expected at offset {pos}")
+        value, pos = self.__parser.parse(match.end())
+        if isinstance(value, dict):
+            keyword, after = self.__parser.token(pos)
+            if keyword.group() == b"stream":
+                value = Stream(value, self.__readStreamData(value, after))
+        return int(match.group(1)), value
+
+    def __readStreamData(self, info, pos):
+        buffer = self.__buffer
+        # the data starts after the end of line that follows the keyword
+        if buffer[pos : pos + 2] == b"\r\n":
+            pos += 2
+        elif buffer[pos : pos + 1] in (b"\n", b"\r"):
+            pos += 1
+        length = self.resolve(info.get("Length"))
+        if isinstance(length, int) and length >= 0:
+            after = SKIP_RE.match(buffer, pos + length).end()
+            if buffer[after : after + 9] == b"endstream":
+                return buffer[pos : pos + length]
+        end = buffer.find(b"endstream", pos)
+        if end < 0:
+            raise PdfError(f"unterminated stream at offset {pos}")
+        data = buffer[pos:end]
+        if data.endswith(b"\r\n"):
+            return data[:-2]
+        return data[:-1] if data[-1:] in (b"\n", b"\r") else data
+
+    def __readCompressed(self, stmnum, index):
+        if stmnum not in self.__streams:
+            stream = self.get(stmnum)
+            if not isinstance(stream, Stream):
+                raise PdfError(f"object stream {stmnum} is missing")
+            data = self.decode(stream)
+            parser = Parser(data)
+            offsets = []
+            pos = 0
+            for _ in range(stream.info["N"]):
+                num, pos = parser.parse(pos)
+                offset, pos = parser.parse(pos)
+                offsets.append((num, stream.info["First"] + offset))
+            self.__streams[stmnum] = (parser, offsets)
+        parser, offsets = self.__streams[stmnum]
+        num, offset = offsets[index]
+        value, _ = parser.parse(offset)
+        return value
+
+    def get(self, num):
+        if num in self.__objects:
+            return self.__objects[num]
+        entry = self.__xref.get(num, (0, 0))
+        value = None
+        try:
+            if entry[0] == 1:
+                found, value = self.__readIndirect(entry[1])
+                if found != num:
+                    raise PdfError(f"object {num} is not at offset {entry[1]}")
+            elif entry[0] == 2:
+                value = self.__readCompressed(entry[1], entry[2])
+        except (PdfError, ValueError, IndexError, zlib.error) as err:
+            if not self.__rebuilt:
+                # the table pointed somewhere else, so the file is scanned
+                self.__rebuildXref()
+                return self.get(num)
+            raise PdfError(f"could not read object {num}: {err}")
+        self.__objects[num] = value
+        return value
+
+    def resolve(self, value):
+        seen = set()
+        while isinstance(value, Ref):
+            if value.num in seen:
+                return None
+            seen.add(value.num)
+            value = self.get(value.num)
+        return value
+
+    def decode(self, stream):
+        filters = self.resolve(stream.info.get("Filter"))
+        params = self.resolve(stream.info.get("DecodeParms"))
+        filters = filters if isinstance(filters, list) else [filters]
+        params = params if isinstance(params, list) else [params]
+        data = bytes(stream.data)
+        for i, name in enumerate(filters):
+            if name is None:
+                continue
+            if name not in ("FlateDecode", "Fl"):
+                raise PdfError(f"{name} streams cannot be decoded")
+            # some writers leave garbage after the end of the deflate data
+            data = zlib.decompressobj().decompress(data)
+            parms = self.resolve(params[i]) if i < len(params) else None
+            if isinstance(parms, dict) and parms.get("Predictor", 1) >= 10:
+                columns = parms.get("Columns", 1)
+                data = unpredict(data, columns, parms.get("Colors", 1))
+        return data
+
+    def iterPages(self, wanted):
+        # yields (number, page, inherited) for the sorted page numbers in
+        # wanted; subtrees that hold none of them are skipped by their count
+        wanted = sorted(set(wanted))
+        catalog = self.resolve(self.__trailer["Root"])
+        if not isinstance(catalog, dict):
+            raise PdfError("the document has no catalog")
+        if not isinstance(self.resolve(catalog.get("Pages")), dict):
+            raise PdfError("the document has no page tree")
+        position = 0
+        target = 0
+        stack = [(iter([catalog["Pages"]]), {})]
+        visited = set()
+
+        while stack and target < len(wanted):
+            kids, inherited = stack[-1]
+            ref = next(kids, None)
+            if ref is None:
+                stack.pop()
+                continue
+            if isinstance(ref, Ref):
+                if ref.num in visited:
+                    raise PdfError("the page tree has a cycle")
+                visited.add(ref.num)
+            node = self.resolve(ref)
+            if not isinstance(node, dict):
+                continue
+
+            if node.get("Type") == "Pages" or "Kids" in node:
+                count = self.resolve(node.get("Count"))
+                if isinstance(count, int) and position + count < wanted[target]:
+                    position += count
+                    continue
+                inner = dict(inherited)
+                inner.update((k, node[k]) for k in INHERITED_KEYS if k in node)
+                stack.append((iter(self.resolve(node.get("Kids")) or []), inner))
+                continue
+
+            position += 1
+            while target < len(wanted) and wanted[target] == position:
+                yield position, ref, inherited
+                target += 1
+
+        if target < len(wanted):
+            missing = wanted[target]
+            raise PdfError(f"page {missing} is out of range ({position} pages)")
+
+
+def unpredict(data, columns, colors=1):
+    # PNG predictors, one filter byte in front of every row
+    width = columns * colors
+    out = bytearray()
+    previous = bytearray(width)
+    for start in range(0, len(data), width + 1):
+        kind = data[start]
+        row = bytearray(data[start + 1 : start + 1 + width])
+        for i in range(len(row)):
+            left = row[i - colors] if i >= colors else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                upLeft = previous[i - colors] if i >= colors else 0
+                p = left + up - upLeft
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upLeft)
+                if pa <= pb and pa <= pc:
+                    row[i] = (row[i] + left) & 0xFF
+                elif pb <= pc:
+                    row[i] = (row[i] + up) & 0xFF
+                else:
+                    row[i] = (row[i] + upLeft) & 0xFF
+        out += row
+        previous = row
+    return bytes(out)
+
+
+def serialize(value, refs):
+    # refs maps old object numbers to new ones; objects left out become null
+    if isinstance(value, Ref):
+        num = refs(value)
+        return b"null" if num is None else f"{num} 0 R".encode()
+    if isinstance(value, NewRef):
+        return f"{int(value)} 0 R".encode()
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int):
+        return str(value).encode()
+    if isinstance(value, (Real, Keyword)):
+        return bytes(value)
+    if isinstance(value, Name):
+        return b"/" + encodeName(value)
+    if isinstance(value, bytes):
+        escaped = value.replace(b"\\", b"\\\\").replace(b"(", b"\\(")
+        escaped = escaped.replace(b")", b"\\)").replace(b"\r", b"\\r")
+        return b"(" + escaped + b")"
+    if isinstance(value, list):
+        return b"[" + b" ".join(serialize(v, refs) for v in value) + b"]"
+    if isinstance(value, dict):
+        items = (
+            b"/" + encodeName(k) + b" " + serialize(v, refs) for k, v in value.items()
+        )
+        return b"<<" + b" ".join(items) + b">>"
+    return b"null"
+
+
+def encodeName(name):
+    out = bytearray()
+    for char in name.encode("latin-1"):
+        if char < 0x21 or char > 0x7E or char in DELIMITERS or char == 0x23:
+            out += f"#{char:02X}".encode()
+        else:
+            out.append(char)
+    return bytes(out)
+
+
+def iterRefs(value):
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from iterRefs(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            # the page tree is rebuilt, so parents are never followed
+            if key != "Parent":
+                yield from iterRefs(item)
+    elif isinstance(value, Stream):
+        # lengths are written directly, so their objects are not copied
+        yield from iterRefs({k: v for k, v in value.info.items() if k != "Length"})
+
+
+class PdfWriter:
+    # copies the selected pages and everything they reference, streams included
+    # byte for byte, into a new document with a fresh cross-reference table
+    def __init__(self, reader):
+        self.__reader = reader
+        self.__numbers = {}
+        self.__order = []
+        self.__pages = []
+        self.__pageNums = set()
+
+    def addPage(self, ref, inherited):
+        page = dict(self.__reader.resolve(ref))
+        for key, value in inherited.items():
+            page.setdefault(key, value)
+        page["Parent"] = NewRef(2)
+        if isinstance(ref, Ref):
+            self.__pageNums.add(ref.num)
+            if ref.num not in self.__numbers:
+                # references to the page (e.g. from its annotations) land on
+                # its first copy
+                self.__numbers[ref.num] = 3 + len(self.__pages)
+        self.__pages.append(page)
+
+    def __collect(self):
+        # pages take object numbers 3 to 3 + pages; the rest follow in the
+        # order they are found
+        nextNum = 3 + len(self.__pages)
+        pending = [r for page in self.__pages for r in iterRefs(page)]
+        info = self.__reader.trailer.get("Info")
+        if isinstance(info, Ref):
+            pending.append(info)
+        while pending:
+            ref = pending.pop()
+            if ref.num in self.__numbers or ref.num in self.__pageNums:
+                continue
+            value = self.__reader.get(ref.num)
+            if value is None or isPageNode(value):
+                # pages that were not selected are dropped
+                self.__numbers[ref.num] = None
+                continue
+            self.__numbers[ref.num] = nextNum
+            self.__order.append(ref.num)
+            nextNum += 1
+            pending.extend(iterRefs(value))
+
+    def write(self, file):
+        self.__collect()
+        refs = lambda ref: self.__numbers.get(ref.num)
+        offsets = []
+        pos = 0
+
+        def emit(data):
+            nonlocal pos
+            file.write(data)
+            pos += len(data)
+
+        def emitObject(num, body):
+            offsets.append(pos)
+            emit(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        kids = " ".join(f"{3 + i} 0 R" for i in range(len(self.__pages)))
+        emit(f"%PDF-{self.__reader.version}\n%\xe2\xe3\xcf\xd3\n".encode("latin-1"))
+        emitObject(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        pageTree = f"<< /Type /Pages /Kids [{kids}] /Count {len(self.__pages)} >>"
+        emitObject(2, pageTree.encode())
+        for i, page in enumerate(self.__pages):
+            emitObject(3 + i, serialize(page, refs))
+
+        for num in self.__order:
+            value = self.__reader.get(num)
+            newNum = self.__numbers[num]
+            if isinstance(value, Stream):
+                info = dict(value.info)
+                info["Length"] = len(value.data)
+                offsets.append(pos)
+                emit(f"{newNum} 0 obj\n".encode() + serialize(info, refs))
+                emit(b"\nstream\n")
+                emit(value.data)
+                emit(b"\nendstream\nendobj\n")
+            else:
+                emitObject(newNum, serialize(value, refs))
+
+        xref = pos
+        size = len(offsets) + 1
+        emit(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        emit(b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets))
+        trailer = f"<< /Size {size} /Root 1 0 R"
+        info = self.__reader.trailer.get("Info")
+        if isinstance(info, Ref) and refs(info) is not None:
+            trailer += f" /Info {refs(info)} 0 R"
+        emit(f"trailer\n{trailer} >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def isPageNode(value):
+    if not isinstance(value, dict):
+        return False
+    return value.get("Type") in ("Page", "Pages")
+
+
+def extractPages(infile, pageRanges, file):
+    # pageRanges is a list of inclusive (start, end) tuples in output order
+    # and file is any binary file, stdout included
+    numbers = [n for start, end in pageRanges for n in range(start, end + 1)]
+    with PdfReader(infile) as reader:
+        pages = {n: (r, inherited) for n, r, inherited in reader.iterPages(numbers)}
+        writer = PdfWriter(reader)
+        for number in numbers:
+            writer.addPage(*pages[number])
+        writer.write(file)
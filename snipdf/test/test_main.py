@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from snipdf.main import main
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="snipdf-test-")
+        self.__cwd = os.getcwd()
+        os.chdir(self.__temp.name)
+
+    def tearDown(self):
+        os.chdir(self.__cwd)
+        self.__temp.cleanup()
+
+    def runMain(self, *args):
+        with mock.patch.object(sys, "argv", ["snipdf", *args]):
+            with mock.patch("sys.stdout"):
+                main()
+
+    def test_missing_input(self):
+        with self.assertRaises(SystemExit) as caught:
+            self.runMain("-e", "native", "-i", "missing.pdf", "-p", "1-2")
+        message = "snipdf: error: missing.pdf: No such file or directory"
+        self.assertEqual(caught.exception.code, message)
+        self.assertEqual(os.listdir(), [])
+
+    def test_reversed_range(self):
+        with open("in.pdf", "wb"):
+            pass
+        with self.assertRaises(SystemExit) as caught:
+            self.runMain("-e", "native", "-i", "in.pdf", "-p", "5-3")
+        message = "snipdf: error: start (5) cannot be greater than end (3)"
+        self.assertEqual(caught.exception.code, message)
+        self.assertEqual(os.listdir(), ["in.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import os
+import re
+import zlib
+import tempfile
+import unittest
+
+from benchmarks.datasets import FONT, getPageContent, writeCompactPdf, writeSyntheticPdf
+from snipdf.pdfengine import PdfError, PdfReader, Stream, extractPages
+
+PAGE_RE = re.compile(rb"\(Page (\d+)\)")
+
+
+def writeHybridPdf(path, pageCount):
+    # a classic table that marks the pages as free, as read by old viewers,
+    # and an /XRefStm that places them in a compressed object stream
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pageCount))
+    plain = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{kids}] /Count {pageCount} >>".encode(),
+        3: FONT,
+    }
+    packed = {}
+    for i in range(pageCount):
+        pageNum, contentNum = 4 + 2 * i, 5 + 2 * i
+        content = getPageContent(i + 1)
+        plain[contentNum] = (
+            f"<< /Length {len(content)} >>\nstream\n".encode()
+            + content
+            + b"\nendstream"
+        )
+        packed[pageNum] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {contentNum} 0 R >>"
+        ).encode()
+
+    stmNum = 4 + 2 * pageCount
+    xrefNum = stmNum + 1
+    offsets, body = [], b""
+    for value in packed.values():
+        offsets.append(len(body))
+        body += value + b"\n"
+    header = " ".join(f"{n} {o}" for n, o in zip(packed, offsets)).encode() + b"\n"
+    data = zlib.compress(header + body)
+    plain[stmNum] = (
+        f"<< /Type /ObjStm /N {len(packed)} /First {len(header)} "
+        f"/Length {len(data)} /Filter /FlateDecode >>\nstream\n"
+    ).encode() + data + b"\nendstream"
+
+    located = {}
+    with open(path, "wb") as file:
+        file.write(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+        for num, value in sorted(plain.items()):
+            located[num] = file.tell()
+            file.write(f"{num} 0 obj\n".encode() + value + b"\nendobj\n")
+
+        rows = b""
+        index = []
+        for i, num in enumerate(packed):
+            rows += bytes([2]) + stmNum.to_bytes(4, "big") + i.to_bytes(2, "big")
+            index += [num, 1]
+        located[xrefNum] = file.tell()
+        file.write(
+            f"{xrefNum} 0 obj\n<< /Type /XRef /Size {xrefNum + 1} /W [1 4 2] "
+            f"/Index [{' '.join(map(str, index))}] /Length {len(rows)} >>\n"
+            "stream\n".encode()
+            + rows
+            + b"\nendstream\nendobj\n"
+        )
+
+        table = file.tell()
+        file.write(f"xref\n0 {xrefNum + 1}\n".encode())
+        file.write(b"0000000000 65535 f \n")
+        for num in range(1, xrefNum + 1):
+            if num in located:
+                file.write(f"{located[num]:010d} 00000 n \n".encode())
+            else:
+                file.write(b"0000000000 00000 f \n")
+        file.write(
+            f"trailer\n<< /Size {xrefNum + 1} /Root 1 0 R "
+            f"/XRefStm {located[xrefNum]} >>\nstartxref\n{table}\n%%EOF\n".encode()
+        )
+    return path
+
+
+def shiftOffsets(path, shift):
+    # every offset of the table points a few bytes past its object
+    with open(path, "rb") as file:
+        data = file.read()
+    table = data.rindex(b"\nxref\n") + 1
+    entry = lambda m: f"{int(m.group(1)) + shift:010d} 00000 n".encode()
+    fixed = re.sub(rb"(\d{10}) 00000 n", entry, data[table:])
+    with open(path, "wb") as file:
+        file.write(data[:table] + fixed)
+    return path
+
+
+def prependJunk(path, junk):
+    # startxref and every offset of the table end up too small
+    with open(path, "rb") as file:
+        data = file.read()
+    newline = data.index(b"\n") + 1
+    with open(path, "wb") as file:
+        file.write(data[:newline] + junk + data[newline:])
+    return path
+
+
+def readXrefOffsets(data):
+    start = int(data[data.rindex(b"startxref") + 9 :].split()[0])
+    lines = data[start:].split(b"\n")
+    first, count = map(int, lines[1].split())
+    entries = {}
+    for num, line in enumerate(lines[2 : 2 + count], first):
+        offset, _, kind = line.split()
+        if kind == b"n":
+            entries[num] = int(offset)
+    return entries
+
+
+class PdfEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp = tempfile.TemporaryDirectory(prefix="snipdf-test-")
+        self.folder = self.__temp.name
+
+    def tearDown(self):
+        self.__temp.cleanup()
+
+    def getPath(self, name):
+        return os.path.join(self.folder, name)
+
+    def extract(self, source, ranges):
+        target = self.getPath("out.pdf")
+        with open(target, "wb") as file:
+            extractPages(source, ranges, file)
+        return target
+
+    def assertPages(self, path, expected):
+        with open(path, "rb") as file:
+            data = file.read()
+        for num, offset in readXrefOffsets(data).items():
+            self.assertTrue(
+                data.startswith(f"{num} 0 obj".encode(), offset),
+                f"object {num} is not at offset {offset}",
+            )
+
+        with PdfReader(path) as reader:
+            pages = list(reader.iterPages(range(1, len(expected) + 1)))
+            self.assertEqual(len(pages), len(expected))
+            found = []
+            for _, ref, _ in pages:
+                page = reader.resolve(ref)
+                content = reader.resolve(page["Contents"])
+                self.assertIsInstance(content, Stream)
+                self.assertIn("Font", reader.resolve(page["Resources"]))
+                match = PAGE_RE.search(reader.decode(content))
+                found.append(int(match.group(1)))
+            with self.assertRaises(PdfError):
+                list(reader.iterPages([len(expected) + 1]))
+        self.assertEqual(found, expected)
+
+    def checkLayout(self, source):
+        ranges = [(7, 9), (2, 3), (8, 8), (1, 1), (2, 3)]
+        self.assertPages(self.extract(source, ranges), [7, 8, 9, 2, 3, 8, 1, 2, 3])
+
+    def test_synthetic(self):
+        self.checkLayout(writeSyntheticPdf(self.getPath("in.pdf"), 12))
+
+    def test_compact(self):
+        self.checkLayout(writeCompactPdf(self.getPath("in.pdf"), 120))
+
+    def test_compact_tree_is_skipped_by_count(self):
+        source = writeCompactPdf(self.getPath("in.pdf"), 1000)
+        self.assertPages(self.extract(source, [(999, 1000), (1, 1)]), [999, 1000, 1])
+
+    def test_hybrid(self):
+        source = writeHybridPdf(self.getPath("in.pdf"), 1)
+        self.assertPages(self.extract(source, [(1, 1), (1, 1)]), [1, 1])
+        source = writeHybridPdf(self.getPath("in.pdf"), 10)
+        self.checkLayout(source)
+
+    def test_shifted_offsets(self):
+        source = shiftOffsets(writeSyntheticPdf(self.getPath("in.pdf"), 12), 3)
+        self.checkLayout(source)
+
+    def test_broken_startxref(self):
+        source = writeSyntheticPdf(self.getPath("in.pdf"), 12)
+        self.checkLayout(prependJunk(source, b"% junk\n" * 3))
+        source = writeCompactPdf(self.getPath("in.pdf"), 40)
+        self.checkLayout(prependJunk(source, b"% junk\n" * 3))
+
+    def test_out_of_range(self):
+        source = writeSyntheticPdf(self.getPath("in.pdf"), 5)
+        with self.assertRaisesRegex(PdfError, "page 6 is out of range"):
+            self.extract(source, [(1, 2), (5, 6)])
+
+
+if __name__ == "__main__":
+    unittest.main()